@@ -2,6 +2,13 @@ import carla
 import cv2
 import numpy as np
 import time
+import os
+import sys
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(BASE_DIR), "raas_func"))
+
+from sensor_hub import attach_camera
 
 def camera_callback(image, data_dict, key):
     # Обработка изображения от камеры
@@ -15,7 +22,6 @@ def main():
     client = carla.Client('localhost', 2000)
     client.set_timeout(5.0)
     world = client.get_world()
-    blueprint_library = world.get_blueprint_library()
 
     # Получаем все машины
     vehicles = world.get_actors().filter('vehicle.lincoln.mkz_2020')
@@ -30,29 +36,13 @@ def main():
         return
     print(f"[+] Vehicle found: {vehicle.type_id} (ID {vehicle.id})")
 
-    # Настройки камеры
-    camera_bp = blueprint_library.find('sensor.camera.rgb')
-    camera_bp.set_attribute('image_size_x', '640')
-    camera_bp.set_attribute('image_size_y', '480')
-    camera_bp.set_attribute('fov', '90')
-
-    # Точки размещения камер (относительно автомобиля)
-    transform_left = carla.Transform(carla.Location(x=0.65, y=-0.9, z=1.1), carla.Rotation(yaw=-150))
-    transform_right = carla.Transform(carla.Location(x=0.65, y=0.9, z=1.1), carla.Rotation(yaw=150))
-    #x=0.8, y=-1.0, z=1.5, -150
-    #x=0.8, y=1.0, z=1.5, =150
-
-
-    # Спавним камеры и крепим к авто
-    left_camera = world.spawn_actor(camera_bp, transform_left, attach_to=vehicle)
-    right_camera = world.spawn_actor(camera_bp, transform_right, attach_to=vehicle)
-
     # Словарь для изображений
     image_data = {'left': None, 'right': None}
 
-    # Подключаем обработку кадров
-    left_camera.listen(lambda image: camera_callback(image, image_data, 'left'))
-    right_camera.listen(lambda image: camera_callback(image, image_data, 'right'))
+    # Камеры mirror_left/mirror_right из sensor_hub.CAMERA_SPECS (640x480, fov 90): те же, что у предупреждений
+    # в зеркалах. Если запущен sensor_hub.py, кадры берутся из шины и симулятор не рендерит их второй раз
+    left_camera = attach_camera(world, vehicle, "mirror_left", lambda image: camera_callback(image, image_data, 'left'))
+    right_camera = attach_camera(world, vehicle, "mirror_right", lambda image: camera_callback(image, image_data, 'right'))
 
     print("[*] Mirror cameras are active. Press Q to exit.")
 
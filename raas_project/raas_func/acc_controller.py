@@ -0,0 +1,67 @@
+# Продольный регулятор ACC без CARLA: внешний контур выбирает желаемое ускорение — по скорости (нет машины
+# впереди) или по дистанции с постоянным временным интервалом, внутренний PI по скорости переводит его в
+# газ/тормоз. Вызывается с фиксированным шагом (тик планировщика), dt — шаг симуляции
+TIME_GAP_S = 1.8           # временной интервал до машины впереди
+MAX_ACCEL = 2.0            # м/с², предел разгона
+MAX_DECEL = 5.0            # м/с², предел торможения ACC (экстренное — дело AEB)
+MAX_JERK = 2.5             # м/с³, рост запроса ускорения (разгон, отпускание тормоза)
+MAX_BRAKE_JERK = 10.0      # м/с³, снижение запроса (торможение нарастает быстрее, чем разгон)
+
+K_SPEED = 0.4              # 1/с: ускорение на 1 м/с ошибки скорости
+K_GAP = 0.2                # 1/с²: ускорение на 1 м ошибки дистанции
+K_REL_SPEED = 0.7          # 1/с: ускорение на 1 м/с разности скоростей с машиной впереди
+
+THROTTLE_ACCEL = 3.5       # м/с² при полном газе (оценка для прямой связи)
+BRAKE_DECEL = 8.0          # м/с² при полном тормозе
+COAST_DECEL = 0.3          # м/с² замедления накатом
+MAX_THROTTLE = 0.8
+KP_SPEED = 0.8             # внутренний контур: ускорение на 1 м/с отставания от опорной скорости
+KI_SPEED = 0.2
+MAX_REF_LEAD = 1.5         # насколько опорная скорость может уйти от фактической, м/с
+MAX_INTEGRAL = 2.0         # м/с·с, ограничение интеграла (anti-windup)
+
+
+class GapController:
+    def __init__(self, time_gap=TIME_GAP_S, standstill=10.0):
+        self.time_gap = time_gap
+        self.standstill = standstill    # дистанция между центрами машин на месте, м
+        self.reset()
+
+    def reset(self, speed=0.0):
+        self.accel = 0.0                # текущий запрос ускорения после ограничения рывка
+        self.v_ref = speed
+        self.integral = 0.0
+        self.mode = "speed"
+        self.gap_error = 0.0
+
+    def desired_gap(self, speed):
+        return self.standstill + self.time_gap * speed
+
+    def target_accel(self, speed, set_speed, gap=None, lead_speed=None):
+        # Меньшее из двух: держать скорость или держать дистанцию
+        accel = K_SPEED * (set_speed - speed)
+        self.mode = "speed"
+        self.gap_error = 0.0
+        if gap is not None:
+            self.gap_error = gap - self.desired_gap(speed)
+            gap_accel = K_GAP * self.gap_error + K_REL_SPEED * (lead_speed - speed)
+            if gap_accel < accel:
+                accel = gap_accel
+                self.mode = "gap"
+        return min(MAX_ACCEL, max(-MAX_DECEL, accel))
+
+    def step(self, dt, speed, set_speed, gap=None, lead_speed=None):
+        # Один шаг: (throttle, brake) в [0, 1]. gap/lead_speed — None, если впереди никого
+        target = self.target_accel(speed, set_speed, gap, lead_speed)
+        self.accel += min(MAX_JERK * dt, max(-MAX_BRAKE_JERK * dt, target - self.accel))
+
+        # Внутренний контур: опорная скорость интегрирует запрос, PI догоняет её газом/тормозом
+        self.v_ref += self.accel * dt
+        self.v_ref = min(speed + MAX_REF_LEAD, max(speed - MAX_REF_LEAD, self.v_ref, 0.0))
+        error = self.v_ref - speed
+        self.integral = min(MAX_INTEGRAL, max(-MAX_INTEGRAL, self.integral + error * dt))
+        command = self.accel + KP_SPEED * error + KI_SPEED * self.integral + COAST_DECEL
+
+        if command >= 0.0:
+            return min(MAX_THROTTLE, command / THROTTLE_ACCEL), 0.0
+        return 0.0, min(1.0, -command / BRAKE_DECEL)
@@ -1,65 +1,128 @@
 import carla
-from database_logger import DatabaseLogger
+import threading
+from database_logger import get_logger
+from acc_controller import GapController
+from tick_scheduler import FIXED_DELTA
+
+
+class AccStatus:
+    # Состояние ACC для GUI. После создания не меняется: поток управления заменяет ссылку целиком,
+    # поэтому панель читает его без блокировок. mode: off, speed, gap, driver (газ водителя)
+    def __init__(self, enabled, target_speed, mode="off", speed=0.0, lead_distance=float('inf'),
+                 throttle=0.0, brake=0.0, sim_time=None):
+        self.enabled = enabled
+        self.target_speed = target_speed
+        self.mode = mode
+        self.speed = speed
+        self.lead_distance = lead_distance
+        self.throttle = throttle
+        self.brake = brake
+        self.sim_time = sim_time
+
+    def with_target_speed(self, target_speed):
+        return AccStatus(self.enabled, target_speed, self.mode, self.speed, self.lead_distance,
+                         self.throttle, self.brake, self.sim_time)
+
 
 class AdaptiveCruiseControl:
-    def __init__(self, vehicle, world):
+    def __init__(self, vehicle, world, traffic=None, telemetry=None):
         self.vehicle = vehicle
         self.world = world
+        self.traffic = traffic    # TrafficSnapshot, обновляемый планировщиком тиков
+        self.telemetry = telemetry    # VehicleTelemetry: управление машины за этот тик без своего get_control()
         self.enabled = False
         self.target_speed = 0.0  # м/с
-        self.min_distance = 10.0  # метры
-        self.db = DatabaseLogger()
+        self.min_distance = 10.0  # метры, между центрами машин на месте; дальше + временной интервал
+        self.controller = GapController(standstill=self.min_distance)
+        self.applied = None       # своё управление прошлого тика: отличить педали водителя от своих
+        self.lead_id = None
+        self.lead_distance = float('inf')
+        self.status = AccStatus(False, self.target_speed)
+        self.db = get_logger()
+        # update() идёт в потоке ControlThread, включение и заданная скорость — из GUI. Шаг целиком под
+        # замком: после disable() нет ни apply_control, ни статуса enabled=True, а reset() регулятора не
+        # совпадает со step(). RLock — disable() вызывается и изнутри шага (тормоз водителя)
+        self.lock = threading.RLock()
 
     def set_target_speed(self, speed_kmh):
-        self.target_speed = max(30.0, min(150.0, speed_kmh)) / 3.6
+        with self.lock:
+            self.target_speed = max(30.0, min(150.0, speed_kmh)) / 3.6
+            self.publish_target_speed()
+
+    def publish_target_speed(self):
+        # Новая заданная скорость видна панели сразу, не дожидаясь следующего тика. Вызывается под self.lock
+        self.status = self.status.with_target_speed(self.target_speed)
 
     def increase_speed(self):
-        self.target_speed = min(self.target_speed + 5.0 / 3.6, 150.0 / 3.6)
+        with self.lock:
+            self.target_speed = min(self.target_speed + 5.0 / 3.6, 150.0 / 3.6)
+            self.publish_target_speed()
 
     def decrease_speed(self):
-        self.target_speed = max(self.target_speed - 5.0 / 3.6, 30.0 / 3.6)
+        with self.lock:
+            self.target_speed = max(self.target_speed - 5.0 / 3.6, 30.0 / 3.6)
+            self.publish_target_speed()
 
     def enable(self):
-        self.enabled = True
-        speed = self.get_speed(self.vehicle) * 3.6
-        self.db.log_cruise_control("enabled", speed)
+        with self.lock:
+            self.enabled = True
+            speed = self.get_speed(self.vehicle)
+            self.controller.reset(speed)
+            self.applied = None
+            self.status = AccStatus(True, self.target_speed, "speed", speed)
+        self.db.log_cruise_control("enabled", speed * 3.6)
         print("[+] Adaptive Cruise Control ENABLED")
 
     def disable(self):
-        self.enabled = False
+        with self.lock:
+            self.enabled = False
+            self.status = AccStatus(False, self.target_speed)
         speed = self.get_speed(self.vehicle) * 3.6
         self.db.log_cruise_control("disabled", speed)
         print("[-] Adaptive Cruise Control DISABLED")
 
-    def update(self):
+    def update(self, tick=None):
+        # Модуль TickScheduler: один шаг регулятора дистанции на тик, скорости — из снимка трафика тика
+        with self.lock:
+            self.control_step(tick)
+
+    def control_step(self, tick):
+        # Под self.lock
         if not self.enabled:
             return
+        dt = tick.delta if tick is not None else FIXED_DELTA
 
-        original_control = self.vehicle.get_control()
+        # Педали водителя видны только в управлении машины; своё управление прошлого тика не считается
+        record = self.telemetry.read("acc") if self.telemetry is not None else None
+        original_control = record.control if record is not None else self.vehicle.get_control()
+        own = self.applied
 
         # Проверка ручного торможения водителем
-        if original_control.brake > 0.1:
+        if original_control.brake > 0.1 and (own is None or abs(original_control.brake - own.brake) > 0.05):
             self.disable()
             return
 
-        current_speed = self.get_speed(self.vehicle)
+        current_speed, gap, lead_speed = None, None, None
+        self.lead_id, self.lead_distance = None, float('inf')
+        if self.traffic is not None:
+            self.lead_id, self.lead_distance, lead_speed, current_speed = self.traffic.lead_state(self.vehicle.id)
+            if self.lead_id is not None:
+                gap = self.lead_distance
+        if current_speed is None:
+            current_speed = record.speed if record is not None else self.get_speed(self.vehicle)
         desired_speed = self.target_speed
 
         # Если водитель нажимает газ и превышает целевую — не мешаем
-        if original_control.throttle > 0.1 and current_speed > desired_speed + 1.0:
+        driver_throttle = original_control.throttle > 0.1 and (
+            own is None or abs(original_control.throttle - own.throttle) > 0.05)
+        if driver_throttle and current_speed > desired_speed + 1.0:
+            self.controller.reset(current_speed)    # после отпускания газа — без накопленного интеграла
+            self.applied = None
+            self.status = AccStatus(True, desired_speed, "driver", current_speed, self.lead_distance,
+                                    sim_time=tick.sim_time if tick is not None else None)
             return
 
-        # Плавное управление скоростью
-        new_throttle = 0.0
-        new_brake = 0.0
-        speed_diff = desired_speed - current_speed
-
-        if abs(speed_diff) < 0.5:
-            new_throttle = 0.2
-        elif speed_diff > 0:
-            new_throttle = min(0.6, 0.3 + 0.1 * speed_diff)
-        else:
-            new_brake = min(0.5, 0.2 + 0.1 * abs(speed_diff))
+        new_throttle, new_brake = self.controller.step(dt, current_speed, desired_speed, gap, lead_speed)
 
         # Применение управления
         new_control = carla.VehicleControl(
@@ -73,13 +136,23 @@ class AdaptiveCruiseControl:
         )
 
         self.vehicle.apply_control(new_control)
+        self.applied = new_control
+        self.status = AccStatus(True, desired_speed, self.controller.mode, current_speed, self.lead_distance,
+                                new_throttle, new_brake, tick.sim_time if tick is not None else None)
 
     def get_speed(self, vehicle):
         v = vehicle.get_velocity()
         return (v.x**2 + v.y**2 + v.z**2) ** 0.5
 
     def get_closest_vehicle_ahead(self):
-        # Оставлено как заглушка, вдруг пригодится позже
+        # Ближайшая машина впереди в коридоре своей полосы по снимку трафика тика (без RPC на каждую машину)
+        if self.traffic is not None:
+            actor_id, distance = self.traffic.lead_vehicle(self.vehicle.id)
+            if actor_id is None:
+                return None, distance
+            return self.world.get_actor(actor_id), distance
+
+        # Без снимка: перебор всех машин с get_location() у каждой, любая полоса
         ego_transform = self.vehicle.get_transform()
         ego_location = ego_transform.location
         ego_forward = ego_transform.get_forward_vector()
@@ -0,0 +1,114 @@
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import cv2
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BASE_DIR))
+
+from bird_eye_compositor import BirdEyeCompositor, CAR_IMG_PATH
+
+CAMERAS = ["front", "back", "left", "right"]
+
+
+def legacy_compose(frames):
+    # Старый Camera360.get_surface без pygame: imread, resize/rotate/warpPerspective и новый канвас на каждый вызов
+    def perspective_warp(image, src_pts, dst_pts, size):
+        M = cv2.getPerspectiveTransform(np.float32(src_pts), np.float32(dst_pts))
+        return cv2.warpPerspective(image, M, size)
+
+    def warp_arc(img, arc_offset, invert=False):
+        h, w = img.shape[:2]
+        src = [(0, 0), (w, 0), (w, h), (0, h)]
+        if not invert:
+            dst = [(arc_offset, 0), (w - arc_offset, 0), (w, h), (0, h)]
+        else:
+            dst = [(0, 0), (w, 0), (w - arc_offset, h), (arc_offset, h)]
+        return perspective_warp(img, src, dst, (w, h))
+
+    def warp_trapezoid(img, shrink_side):
+        h, w = img.shape[:2]
+        src = [(0, 0), (w, 0), (w, h), (0, h)]
+        offset = w // 2
+        if shrink_side == "right":
+            dst = [(0, 0), (w, offset), (w, h - offset), (0, h)]
+        else:
+            dst = [(0, offset), (w, 0), (w, h), (0, h - offset)]
+        return perspective_warp(img, src, dst, (w, h))
+
+    rgb = {k: cv2.cvtColor(v, cv2.COLOR_BGRA2RGB) for k, v in frames.items()}
+    car = cv2.cvtColor(cv2.imread(CAR_IMG_PATH), cv2.COLOR_BGR2RGB)
+    car = cv2.rotate(cv2.resize(car, (300, 150)), cv2.ROTATE_90_COUNTERCLOCKWISE)
+
+    canvas = np.zeros((800, 1000, 3), dtype=np.uint8)
+    cx, cy = 280, 400
+    canvas[cy - car.shape[0] // 2:cy - car.shape[0] // 2 + car.shape[0],
+           cx - car.shape[1] // 2:cx - car.shape[1] // 2 + car.shape[1]] = car
+
+    front = warp_arc(cv2.resize(rgb["front"], (350, 120)), 40, invert=True)
+    back = warp_arc(cv2.flip(cv2.resize(rgb["back"], (350, 120)), -1), 40, invert=False)
+    left = warp_trapezoid(cv2.rotate(cv2.resize(rgb["left"], (400, 120)), cv2.ROTATE_90_COUNTERCLOCKWISE), "right")
+    right = warp_trapezoid(cv2.rotate(cv2.resize(rgb["right"], (400, 120)), cv2.ROTATE_90_CLOCKWISE), "left")
+
+    canvas[cy - 270:cy - 150, cx - 175:cx + 175] = front
+    canvas[cy + 150:cy + 270, cx - 175:cx + 175] = back
+    canvas[cy - 200:cy + 200, cx - 270:cx - 150] = left
+    canvas[cy - 200:cy + 200, cx + 150:cx + 270] = right
+    return canvas
+
+
+def make_frames(rng, width, height):
+    # Плавный градиент + шум: на чистом шуме любая интерполяция выглядит «ошибкой»
+    yy, xx = np.mgrid[0:height, 0:width]
+    frames = {}
+    for i, key in enumerate(CAMERAS):
+        base = np.stack([(xx * 255 // width + 40 * i) % 256,
+                         (yy * 255 // height + 60 * i) % 256,
+                         ((xx + yy) * 255 // (width + height)) % 256], axis=-1)
+        noise = rng.integers(0, 16, base.shape)
+        bgra = np.empty((height, width, 4), dtype=np.uint8)
+        bgra[:, :, :3] = np.clip(base + noise, 0, 255)
+        bgra[:, :, 3] = 255
+        frames[key] = bgra
+    return frames
+
+
+def measure(name, compose, frames, iterations):
+    compose(frames)  # прогрев
+    start = time.perf_counter()
+    for _ in range(iterations):
+        compose(frames)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<10} {iterations / elapsed:8.1f} composites/s | {elapsed / iterations * 1000:.3f} ms each")
+    return iterations / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="360 bird's-eye composite: legacy pipeline vs fused remap")
+    parser.add_argument("--iterations", type=int, default=300)
+    parser.add_argument("--width", type=int, default=320)
+    parser.add_argument("--height", type=int, default=240)
+    args = parser.parse_args()
+
+    frames = make_frames(np.random.default_rng(0), args.width, args.height)
+
+    start = time.perf_counter()
+    compositor = BirdEyeCompositor(src_size=(args.width, args.height))
+    print(f"[*] Maps built in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    # Проверка: совпадение со старым конвейером (разница — только от двойной интерполяции)
+    old = legacy_compose(frames).astype(np.int16)
+    compositor.compose(frames)
+    new = cv2.cvtColor(compositor.canvas, cv2.COLOR_BGRA2RGB).astype(np.int16)
+    diff = np.abs(old - new)
+    print(f"[*] Difference vs legacy: mean {diff.mean():.2f}, p99 {np.percentile(diff, 99):.0f} (0..255)")
+
+    old_rate = measure("legacy", legacy_compose, frames, args.iterations)
+    new_rate = measure("remap", compositor.compose, frames, args.iterations)
+    print(f"[*] Speedup: x{new_rate / old_rate:.1f}")
+
+
+if __name__ == "__main__":
+    main()
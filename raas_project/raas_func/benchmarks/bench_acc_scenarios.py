@@ -0,0 +1,170 @@
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BASE_DIR))
+
+from acc_controller import GapController, TIME_GAP_S
+from traffic_snapshot import MAX_LEAD_DISTANCE_M
+
+DT = 1.0 / 30                # шаг планировщика тиков
+VEHICLE_LENGTH_M = 4.5       # дистанция между центрами меньше длины машины — столкновение
+STANDSTILL_M = 10.0          # AdaptiveCruiseControl.min_distance
+DEFAULT_RECORDINGS = os.path.join(os.path.dirname(os.path.dirname(BASE_DIR)), "world_setup", "path*.json")
+
+
+class LongitudinalModel:
+    # Продольная модель машины вместо CARLA: газ/тормоз через запаздывание привода, качение и воздух.
+    # Коэффициенты нарочно отличаются от оценок в acc_controller.py
+    def __init__(self, position, speed, throttle_accel=3.0, brake_decel=7.5, lag=0.2):
+        self.s = position
+        self.v = speed
+        self.a = 0.0
+        self.throttle_accel = throttle_accel
+        self.brake_decel = brake_decel
+        self.lag = lag
+
+    def step(self, throttle, brake, dt):
+        resist = 0.15 + 0.0006 * self.v * self.v if self.v > 0.0 else 0.0
+        command = self.throttle_accel * throttle - self.brake_decel * brake - resist
+        self.a += (command - self.a) * min(1.0, dt / self.lag)
+        self.v = max(0.0, self.v + self.a * dt)
+        if self.v == 0.0:
+            self.a = max(self.a, 0.0)
+        self.s += self.v * dt
+
+
+def profile(duration, start_speed, phases):
+    # Скорость машины впереди по тикам: phases — (время начала, ускорение, предельная скорость)
+    t = np.arange(0.0, duration, DT)
+    v = np.empty_like(t)
+    speed, accel, limit = start_speed, 0.0, start_speed
+    phases = list(phases)
+    for i, ti in enumerate(t):
+        while phases and ti >= phases[0][0]:
+            _, accel, limit = phases.pop(0)
+        if accel:
+            speed = min(limit, speed + accel * DT) if accel > 0 else max(limit, speed + accel * DT)
+        v[i] = speed
+    return np.cumsum(v) * DT, v
+
+
+def synthetic_scenarios():
+    # (имя, позиции машины впереди, её скорости, начальная дистанция, начальная скорость, заданная скорость)
+    scenarios = []
+    s, v = profile(60.0, 15.0, [])
+    scenarios.append(("approach", s, v, 120.0, 25.0, 25.0))
+    s, v = profile(60.0, 22.0, [(10.0, -2.5, 8.0), (25.0, 1.5, 20.0)])
+    scenarios.append(("slowdown", s, v, 50.0, 22.0, 25.0))
+    phases = []
+    for k in range(6):
+        phases += [(5.0 + k * 15.0, -3.0, 0.0), (10.0 + k * 15.0, 1.5, 12.0)]
+    s, v = profile(95.0, 12.0, phases)
+    scenarios.append(("stop_and_go", s, v, 32.0, 12.0, 20.0))
+    s, v = profile(30.0, 20.0, [(10.0, -6.0, 0.0)])
+    scenarios.append(("hard_brake", s, v, 46.0, 20.0, 25.0))
+    return scenarios
+
+
+def recorded_scenarios(pattern, gap=25.0, set_speed=15.0):
+    # Траектории из записей в формате path*.json: путь по x/y, пересчитанный на шаг тика
+    scenarios = []
+    for path in sorted(glob.glob(pattern)):
+        with open(path, "r") as f:
+            steps = json.load(f)
+        if len(steps) < 2:
+            continue
+        t = np.array([p["timestamp"] for p in steps]) - steps[0]["timestamp"]
+        xy = np.array([(p["x"], p["y"]) for p in steps])
+        dist = np.concatenate(([0.0], np.cumsum(np.linalg.norm(np.diff(xy, axis=0), axis=1))))
+        ticks = np.arange(0.0, t[-1], DT)
+        s = np.interp(ticks, t, dist)
+        v = np.gradient(s, DT)
+        scenarios.append((os.path.basename(path), s, v, gap, 0.0, set_speed))
+    return scenarios
+
+
+def legacy_step(speed, set_speed):
+    # Прежний AdaptiveCruiseControl.update: только скорость, ступени газа/тормоза, машина впереди не учитывается
+    speed_diff = set_speed - speed
+    if abs(speed_diff) < 0.5:
+        return 0.2, 0.0
+    if speed_diff > 0:
+        return min(0.6, 0.3 + 0.1 * speed_diff), 0.0
+    return 0.0, min(0.5, 0.2 + 0.1 * abs(speed_diff))
+
+
+def run(scenario, controller=None):
+    _, lead_s, lead_v, gap0, speed0, set_speed = scenario
+    ego = LongitudinalModel(lead_s[0] - gap0, speed0)
+    if controller is not None:
+        controller.reset(speed0)
+    latencies, accels, gaps, desired, speeds = [], [], [], [], []
+    for s, v in zip(lead_s, lead_v):
+        gap = s - ego.s
+        visible = gap <= MAX_LEAD_DISTANCE_M
+        start = time.perf_counter()
+        if controller is None:
+            throttle, brake = legacy_step(ego.v, set_speed)
+        else:
+            throttle, brake = controller.step(DT, ego.v, set_speed, gap if visible else None,
+                                              float(v) if visible else None)
+        latencies.append(time.perf_counter() - start)
+        ego.step(throttle, brake, DT)
+        accels.append(ego.a)
+        gaps.append(gap)
+        desired.append(STANDSTILL_M + TIME_GAP_S * ego.v)
+        speeds.append(ego.v)
+        if gap < VEHICLE_LENGTH_M:
+            break    # столкновение: дальше метрики не имеют смысла
+
+    accels, gaps, desired, speeds = map(np.asarray, (accels, gaps, desired, speeds))
+    jerk = np.diff(accels) / DT
+    # Ошибка дистанции — там, где машина впереди видна и мешает ехать с заданной скоростью
+    following = (gaps <= MAX_LEAD_DISTANCE_M) & (desired <= MAX_LEAD_DISTANCE_M) & (gaps < desired + 20.0)
+    gap_error = gaps[following] - desired[following]
+    time_gap = (gaps - STANDSTILL_M) / np.maximum(speeds, 0.1)
+    moving = speeds > 1.0
+    return {
+        "latency_us": np.mean(latencies) * 1e6,
+        "latency_max_us": np.max(latencies) * 1e6,
+        "jerk_rms": float(np.sqrt(np.mean(jerk ** 2))),
+        "jerk_max": float(np.abs(jerk).max()),
+        "gap_rms": float(np.sqrt(np.mean(gap_error ** 2))) if len(gap_error) else 0.0,
+        "min_gap": float(gaps.min()),
+        "min_time_gap": float(time_gap[moving].min()) if moving.any() else float("inf"),
+        "collision": bool((gaps < VEHICLE_LENGTH_M).any()),
+    }
+
+
+def print_row(name, mode, r):
+    print(f"{name:>16} {mode:>7} | {r['latency_us']:6.1f} {r['latency_max_us']:7.1f} | "
+          f"{r['jerk_rms']:6.2f} {r['jerk_max']:7.2f} | {r['gap_rms']:6.2f} {r['min_gap']:7.1f} "
+          f"{r['min_time_gap']:6.2f} | {'YES' if r['collision'] else 'no':>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless ACC scenarios: control latency, jerk and gap error")
+    parser.add_argument("--input", default=DEFAULT_RECORDINGS,
+                        help="glob of recorded lead trajectories in path*.json format")
+    parser.add_argument("--no-legacy", action="store_true", help="skip the old speed-only controller")
+    args = parser.parse_args()
+
+    scenarios = synthetic_scenarios() + recorded_scenarios(args.input)
+    print(f"{'scenario':>16} {'ctrl':>7} | {'us/tick':>6} {'max us':>7} | {'jerk':>6} {'max':>7} | "
+          f"{'gap err':>6} {'min gap':>7} {'min tg':>6} | {'collision':>9}")
+    for scenario in scenarios:
+        print_row(scenario[0], "gap", run(scenario, GapController(standstill=STANDSTILL_M)))
+        if not args.no_legacy:
+            print_row(scenario[0], "legacy", run(scenario))
+    print("[*] jerk in m/s^3 (RMS, max), gap error RMS in m while following, min gap centre to centre in m, "
+          "min tg = time gap in s beyond the standstill distance")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import cv2
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BASE_DIR))
+
+from camera_frame import CameraFrame
+
+CAMERAS = ["front", "back", "left", "right"]
+
+
+class FakeImage:
+    # То, что отдаёт sensor.camera.rgb: BGRA-байты + размеры
+    def __init__(self, raw, width, height, frame):
+        self.raw_data = raw
+        self.width = width
+        self.height = height
+        self.frame = frame
+        self.timestamp = frame / 30.0
+
+
+class CopyRecorder:
+    # Как CameraBufferRecorder.add_frame: кадр копируется в буфер
+    def __init__(self):
+        self.last = {}
+
+    def add_frame(self, key, frame):
+        self.last[key] = frame.copy()
+
+
+def legacy_callback(image, store, recorder):
+    # Старый Camera360.camera_callback: BGRA -> RGB -> Surface -> array3d -> BGR
+    import pygame
+    array = np.frombuffer(image.raw_data, dtype=np.uint8)
+    array = np.reshape(array, (image.height, image.width, 4))
+    bgr = array[:, :, :3]
+    rgb = cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB)
+    surface = pygame.surfarray.make_surface(rgb.swapaxes(0, 1))
+    store["surface"] = surface
+    array_rgb = cv2.cvtColor(pygame.surfarray.array3d(surface).swapaxes(0, 1), cv2.COLOR_RGB2BGR)
+    recorder.add_frame("front", array_rgb)
+    # Дисплей и get_surface снова доставали массив из Surface
+    pygame.surfarray.array3d(surface)
+
+
+def frame_callback(image, store, recorder):
+    frame = CameraFrame(image)
+    store["frame"] = frame
+    recorder.add_frame("front", frame.bgr())
+    # Дисплей читает bgra() напрямую, композит один раз просит rgb()
+    frame.bgra()
+    frame.rgb()
+
+
+def measure(name, callback, images):
+    store = {}
+    recorder = CopyRecorder()
+    cpu = []
+    for image in images:
+        start = time.thread_time()
+        callback(image, store, recorder)
+        cpu.append((time.thread_time() - start) * 1000.0)
+    cpu = np.array(cpu)
+    print(f"{name:<12} CPU per callback: mean {cpu.mean():.3f} ms | p95 {np.percentile(cpu, 95):.3f} ms | "
+          f"4 cameras @30 fps: {cpu.mean() * 4 * 30 / 10:.1f}% of one core")
+    return cpu.mean()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CPU time per Camera360.camera_callback")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--width", type=int, default=320)
+    parser.add_argument("--height", type=int, default=240)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    images = [
+        FakeImage(rng.integers(0, 255, args.width * args.height * 4, dtype=np.uint8).tobytes(),
+                  args.width, args.height, i)
+        for i in range(args.frames)
+    ]
+
+    new = measure("CameraFrame", frame_callback, images)
+    try:
+        import pygame  # noqa: F401
+    except ImportError:
+        print("[!] pygame not installed, legacy path skipped")
+        return
+    old = measure("legacy", legacy_callback, images)
+    print(f"[*] Speedup: x{old / new:.1f}")
+
+
+if __name__ == "__main__":
+    main()
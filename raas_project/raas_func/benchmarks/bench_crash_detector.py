@@ -0,0 +1,154 @@
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BASE_DIR))
+
+from crash_detector import CrashDetector, IMPACT_DECEL, wrap_yaw
+
+DT = 1.0 / 30                # шаг планировщика тиков
+DEFAULT_TRACES = os.path.join(os.path.dirname(BASE_DIR), "recordings", "*_crash_trace.json")
+ONSET_YAW_RATE = 90.0        # град/с: начало заноса в записанном следе
+
+
+def trace(duration, speed0, yaw0, phases, rng, impact=None):
+    # Скорость (км/ч) и курс по тикам: phases — (время начала, dv км/ч за секунду, курс град/с)
+    t = np.arange(0.0, duration, DT)
+    speed, yaw = np.empty_like(t), np.empty_like(t)
+    v, y, dv, dy = speed0, yaw0, 0.0, 0.0
+    phases = list(phases)
+    for i, ti in enumerate(t):
+        while phases and ti >= phases[0][0] - 1e-9:
+            _, dv, dy = phases.pop(0)
+        v = max(0.0, v + dv * DT)
+        y += dy * DT
+        speed[i], yaw[i] = v, y
+    speed = np.maximum(0.0, speed + rng.normal(0.0, 0.3, len(t)))
+    yaw = np.array([wrap_yaw(a) for a in yaw + rng.normal(0.0, 0.2, len(t))])
+    return t, speed, yaw, impact
+
+
+def synthetic_traces(rng):
+    # (имя, времена, скорость км/ч, курс, время удара или None — не авария)
+    impact = 5.0
+    traces = [
+        ("barrier_60", *trace(8.0, 60.0, 10.0, [(impact, -600.0, 0.0), (impact + 0.1, 0.0, 0.0)], rng, impact)),
+        ("rear_end_50", *trace(8.0, 50.0, -90.0, [(impact, -540.0, 0.0), (impact + DT, 0.0, 0.0)], rng, impact)),
+        ("side_spin_70", *trace(8.0, 70.0, 150.0, [(impact, -25.0, 220.0), (impact + 0.6, -10.0, 0.0)], rng, impact)),
+        ("glancing_45", *trace(8.0, 45.0, 0.0, [(impact, -12.0, 190.0), (impact + 0.4, 0.0, 0.0)], rng, impact)),
+        ("bounce_40", *trace(8.0, 40.0, 30.0, [(impact, -900.0, 0.0), (impact + DT, 0.0, 0.0),
+                                               (impact + 2 * DT, 450.0, 0.0), (impact + 3 * DT, 0.0, 0.0)],
+                             rng, impact)),
+        ("hard_brake_100", *trace(16.0, 100.0, 0.0, [(3.0, -32.0, 0.0)], rng)),
+        ("turn_across_180", *trace(10.0, 40.0, 170.0, [(3.0, 0.0, 25.0), (6.6, 0.0, 0.0)], rng)),
+        ("roundabout_35", *trace(20.0, 35.0, -175.0, [(2.0, 0.0, 30.0), (14.0, 0.0, 0.0)], rng)),
+        ("lane_change_120", *trace(10.0, 120.0, 179.0, [(3.0, 0.0, 8.0), (4.0, 0.0, -8.0), (5.0, 0.0, 0.0)], rng)),
+    ]
+    return traces
+
+
+def recorded_traces(pattern):
+    # Следы, сохранённые EmergencyCallMonitor при срабатывании: начало удара — первый тик с резким
+    # замедлением или заносом (след кончается на срабатывании)
+    traces = []
+    for path in sorted(glob.glob(pattern)):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        t, speed, yaw = (np.asarray(data[k], dtype=np.float64) for k in ("time", "speed", "yaw"))
+        if len(t) < 3:
+            continue
+        dt = np.diff(t)
+        decel = -np.diff(speed) / 3.6 / dt
+        yaw_rate = np.abs([wrap_yaw(d) for d in np.diff(yaw)]) / dt
+        onset = np.flatnonzero((decel > IMPACT_DECEL / 2) | (yaw_rate > ONSET_YAW_RATE))
+        impact = t[onset[0]] if len(onset) else t[-1]
+        traces.append((os.path.basename(path), t - t[0], speed, yaw, impact - t[0]))
+    return traces
+
+
+def run_detector(t, speed, yaw):
+    detector = CrashDetector(rate_hz=1.0 / DT)
+    fired, latencies = [], []
+    for ti, v, y in zip(t, speed, yaw):
+        start = time.perf_counter()
+        event = detector.add(float(ti), float(v), float(y))
+        latencies.append(time.perf_counter() - start)
+        if event is not None:
+            fired.append(event.sim_time)
+    return fired, latencies
+
+
+def run_legacy(t, speed, yaw, period, phase):
+    # Прежний monitor_vehicle: отсчёт раз в period по таймеру GUI, сравниваются два соседних отсчёта,
+    # разность курса без учёта перехода через ±180°
+    fired = []
+    last_speed, last_yaw = 0.0, yaw[0]
+    for ts in np.arange(phase, t[-1], period):
+        i = min(int(np.searchsorted(t, ts)), len(t) - 1)
+        s, y = speed[i], yaw[i]
+        if (last_speed - s > 30.0 or abs(last_yaw - y) > 60.0) and last_speed > 30:
+            fired.append(t[i])
+        last_speed, last_yaw = s, y
+    return fired
+
+
+def score(fired, impact):
+    # (обнаружено, задержка мс от удара, ложные срабатывания)
+    if impact is None:
+        return False, None, len(fired)
+    hits = [f for f in fired if f >= impact - 1e-9]
+    false = len(fired) - len(hits)
+    if not hits:
+        return False, None, false
+    return True, (hits[0] - impact) * 1000.0, false
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Crash detector replay: detection latency and false alarms")
+    parser.add_argument("--input", default=DEFAULT_TRACES,
+                        help="glob of crash traces saved by EmergencyCallMonitor (*_crash_trace.json)")
+    parser.add_argument("--legacy-period-ms", type=float, default=200.0,
+                        help="old QTimer period; raise it to model a busy GUI thread")
+    parser.add_argument("--phases", type=int, default=8, help="timer phases tried for the old monitor")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    traces = synthetic_traces(rng) + recorded_traces(args.input)
+    period = args.legacy_period_ms / 1000.0
+
+    print(f"{'trace':>20} {'crash':>5} | {'window':>6} {'ms':>6} {'false':>5} {'us/tick':>7} | "
+          f"{'legacy':>6} {'ms':>6} {'false':>5}")
+    all_us = []
+    for name, t, speed, yaw, impact in traces:
+        fired, latencies = run_detector(t, speed, yaw)
+        all_us.extend(latencies)
+        hit, delay, false = score(fired, impact)
+
+        legacy_hits, legacy_delays, legacy_false = 0, [], 0
+        for phase in np.linspace(0.0, period, args.phases, endpoint=False):
+            l_hit, l_delay, l_false = score(run_legacy(t, speed, yaw, period, phase), impact)
+            legacy_hits += l_hit
+            legacy_false += l_false
+            if l_delay is not None:
+                legacy_delays.append(l_delay)
+
+        crash = "yes" if impact is not None else "no"
+        window = ("hit" if hit else "MISS") if impact is not None else "-"
+        legacy = f"{legacy_hits}/{args.phases}" if impact is not None else "-"
+        delay_s = f"{delay:6.0f}" if delay is not None else f"{'-':>6}"
+        legacy_delay = f"{np.mean(legacy_delays):6.0f}" if legacy_delays else f"{'-':>6}"
+        print(f"{name:>20} {crash:>5} | {window:>6} {delay_s} {false:5d} {np.mean(latencies) * 1e6:7.1f} | "
+              f"{legacy:>6} {legacy_delay} {legacy_false / args.phases:5.1f}")
+    print(f"[*] window detector: {np.mean(all_us) * 1e6:.1f} us per tick on average, "
+          f"{np.max(all_us) * 1e6:.1f} us max; ms = delay from impact to detection; "
+          f"legacy = hits over timer phases, false alarms averaged over phases")
+
+
+if __name__ == '__main__':
+    main()
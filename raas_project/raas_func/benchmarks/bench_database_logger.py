@@ -0,0 +1,68 @@
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import threading
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BASE_DIR))
+
+from database_logger import DatabaseLogger
+
+
+def produce(db, events, threads):
+    # Имитация нескольких модулей, которые одновременно пишут события
+    per_thread = events // threads
+
+    def worker(n):
+        for i in range(per_thread):
+            if i % 3 == 0:
+                db.log_mirror_alert("left" if i % 2 else "right")
+            elif i % 3 == 1:
+                db.log_emergency_brake(speed_kmh=40.0 + i % 20, distance_m=5.0)
+            else:
+                db.log_function_state("auto_braking", "ON" if i % 2 else "OFF")
+
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    start = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return per_thread * threads, time.perf_counter() - start
+
+
+def run(mode, events, threads, workdir):
+    path = os.path.join(workdir, f"{mode}.db")
+    db = DatabaseLogger(db_path=path, write_behind=(mode == "write-behind"))
+    start = time.perf_counter()
+    total, caller_time = produce(db, events, threads)
+    db.shutdown()
+    durable_time = time.perf_counter() - start
+    stats = db.get_stats()
+    db.conn.close()
+    print(f"{mode:<13} caller {total / caller_time:10.0f} events/s | on disk {total / durable_time:10.0f} events/s | "
+          f"written {stats['rows_written']} | dropped {stats['rows_dropped']} | batches {stats['batches_written']}")
+    return total / durable_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DatabaseLogger: per-row commit vs write-behind")
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument("--threads", type=int, default=4)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="raas_db_bench_")
+    try:
+        print(f"[*] {args.events} events from {args.threads} threads")
+        sync_rate = run("per-row", args.events, args.threads, workdir)
+        wb_rate = run("write-behind", args.events, args.threads, workdir)
+        print(f"[*] Speedup (events on disk per second): x{wb_rate / sync_rate:.1f}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import multiprocessing
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BASE_DIR))
+
+from database_logger import DatabaseLogger, DatabaseSinkServer, RemoteDatabaseLogger, get_logger
+
+# Сколько модулей панели раньше создавали свой DatabaseLogger
+MODULES = ["panel", "cruise", "braking", "fatigue", "emergency_call", "parking", "mirror_alerts"]
+
+
+def startup_per_module(path):
+    # Как было: своё соединение и свои CREATE TABLE в каждом модуле
+    start = time.perf_counter()
+    loggers = []
+    for _ in MODULES:
+        db = DatabaseLogger(db_path=path, write_behind=False)
+        db.get_last_states()
+        loggers.append(db)
+    elapsed = (time.perf_counter() - start) * 1000.0
+    for db in loggers:
+        db.shutdown()
+        db.conn.close()
+    return elapsed
+
+
+def startup_shared(path):
+    start = time.perf_counter()
+    loggers = [get_logger(path, write_behind=False) for _ in MODULES]
+    loggers[0].get_last_states()
+    elapsed = (time.perf_counter() - start) * 1000.0
+    loggers[0].shutdown()
+    loggers[0].conn.close()
+    return elapsed, len({id(db) for db in loggers})
+
+
+def mirror_process_direct(path, rows):
+    db = DatabaseLogger(db_path=path, write_behind=False)
+    for i in range(rows):
+        db.log_mirror_alert("left" if i % 2 else "right")
+
+
+def mirror_process_remote(address, rows):
+    db = RemoteDatabaseLogger(tuple(address))
+    for i in range(rows):
+        db.log_mirror_alert("left" if i % 2 else "right")
+    db.shutdown()
+
+
+def contention(path, rows, use_sink):
+    db = DatabaseLogger(db_path=path, write_behind=False)
+    sink = None
+    if use_sink:
+        sink = DatabaseSinkServer(db, address=("127.0.0.1", 0))
+        sink.start()
+        child = multiprocessing.Process(target=mirror_process_remote, args=(sink.address, rows))
+    else:
+        child = multiprocessing.Process(target=mirror_process_direct, args=(path, rows))
+
+    child.start()
+    for i in range(rows):
+        db.log_emergency_brake(speed_kmh=40.0, distance_m=5.0)
+    child.join()
+    if sink:
+        time.sleep(0.2)
+        sink.stop()
+
+    stats = db.get_stats()
+    db.shutdown()
+    db.conn.close()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DatabaseLogger startup time and lock waits, per-module vs shared")
+    parser.add_argument("--rows", type=int, default=2000, help="строк на процесс в тесте конкуренции")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="raas_db_startup_")
+    try:
+        before = startup_per_module(os.path.join(workdir, "before.db"))
+        after, connections = startup_shared(os.path.join(workdir, "after.db"))
+        print(f"[*] Startup, {len(MODULES)} modules: per-module {before:.2f} ms | shared {after:.2f} ms ({connections} connection)")
+
+        for use_sink, name in ((False, "direct file"), (True, "socket sink")):
+            stats = contention(os.path.join(workdir, f"contention_{use_sink}.db"), args.rows, use_sink)
+            w, l = stats["write_time"], stats["lock_wait"]
+            print(f"[*] Mirror process via {name:<11}: panel write avg {w['avg_ms']:.3f} ms, max {w['max_ms']:.2f} ms | "
+                  f"lock wait avg {l['avg_ms']:.3f} ms, max {l['max_ms']:.2f} ms")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
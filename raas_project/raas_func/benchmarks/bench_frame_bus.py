@@ -0,0 +1,90 @@
+import os
+import sys
+import time
+import argparse
+import multiprocessing as mp
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BASE_DIR))
+
+from frame_bus import FrameBusWriter, FrameBusReader
+
+CAMERA = "bench"
+
+
+def reader_process(index, frames, results):
+    # Потребитель: читает без копирования, проверяет целостность кадра и задержку от публикации
+    reader = None
+    while reader is None:
+        reader = FrameBusReader.attach(CAMERA)
+        time.sleep(0.01)
+    latencies = []
+    corrupted = 0
+    invalidated = 0
+    last = -1
+    while last < frames - 1:
+        if not reader.has_new():
+            time.sleep(0.0002)
+            continue
+        image = reader.read(copy=False)
+        if image is None:
+            continue
+        data = image.raw_data
+        # Писатель заполняет кадр значением frame % 256: первый и последний байт должны совпасть
+        ok = data[0] == data[-1] == image.frame % 256
+        if not image.still_valid():
+            invalidated += 1
+        elif not ok:
+            corrupted += 1
+        latencies.append((time.perf_counter() - image.timestamp) * 1000.0)
+        last = image.frame
+    results.put((index, len(latencies), float(np.mean(latencies)), float(np.percentile(latencies, 99)),
+                 corrupted, invalidated, reader.torn_reads))
+    reader.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared-memory frame bus: publish cost, read latency, torn reads")
+    parser.add_argument("--frames", type=int, default=600)
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--readers", type=int, default=3)
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    args = parser.parse_args()
+
+    ctx = mp.get_context("spawn")
+    writer = FrameBusWriter(CAMERA, args.width, args.height)
+    results = ctx.Queue()
+    procs = [ctx.Process(target=reader_process, args=(i, args.frames, results)) for i in range(args.readers)]
+    for p in procs:
+        p.start()
+    time.sleep(1.0)  # читатели успевают подключиться
+
+    frame = np.empty(args.width * args.height * 4, dtype=np.uint8)
+    publish_ms = []
+    period = 1.0 / args.fps
+    try:
+        for i in range(args.frames):
+            frame.fill(i % 256)
+            start = time.perf_counter()
+            writer.publish(frame, frame_id=i, timestamp=start)
+            publish_ms.append((time.perf_counter() - start) * 1000.0)
+            time.sleep(period)
+
+        for _ in procs:
+            index, count, avg, p99, corrupted, invalidated, torn = results.get(timeout=30)
+            print(f"reader {index}: {count} frames | latency avg {avg:.3f} ms, p99 {p99:.3f} ms | "
+                  f"corrupted {corrupted} | overwritten while reading {invalidated} | retried torn {torn}")
+        for p in procs:
+            p.join()
+    finally:
+        writer.close()
+
+    mb = args.width * args.height * 4 / 1024 ** 2
+    print(f"[*] Publish {mb:.2f} MB frame: avg {np.mean(publish_ms):.3f} ms, max {np.max(publish_ms):.3f} ms")
+    print(f"[*] {args.readers} readers share one render: simulator load stays at 1 camera instead of {args.readers}")
+
+
+if __name__ == "__main__":
+    main()
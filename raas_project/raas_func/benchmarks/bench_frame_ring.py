@@ -0,0 +1,76 @@
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import cv2
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BASE_DIR))
+
+from frame_ring_buffer import CompressedFrameRing, decode_frame
+
+
+def make_frames(count, width, height):
+    # Плавная «дорога» со сдвигом и немного шума — ближе к кадрам камеры, чем чистый шум
+    rng = np.random.default_rng(0)
+    yy, xx = np.mgrid[0:height, 0:width]
+    base = np.stack([xx * 255 // width, yy * 255 // height, (xx + yy) * 255 // (width + height)], axis=-1)
+    frames = []
+    for i in range(count):
+        frame = (np.roll(base, i * 3, axis=1) + rng.integers(0, 12, base.shape)).clip(0, 255).astype(np.uint8)
+        cv2.rectangle(frame, (40 + i % 200, 100), (100 + i % 200, 160), (30, 30, 200), -1)
+        frames.append(frame)
+    return frames
+
+
+def psnr(a, b):
+    mse = np.mean((a.astype(np.float32) - b.astype(np.float32)) ** 2)
+    return 99.0 if mse == 0 else 10 * np.log10(255.0 ** 2 / mse)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CompressedFrameRing vs raw deque: memory and per-frame cost")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--width", type=int, default=320)
+    parser.add_argument("--height", type=int, default=240)
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--buffer-seconds", type=int, default=60)
+    parser.add_argument("--cameras", type=int, default=4)
+    parser.add_argument("--memory-cap-mb", type=int, default=256)
+    args = parser.parse_args()
+
+    frames = make_frames(args.frames, args.width, args.height)
+    capacity = args.fps * args.buffer_seconds
+    raw_mb = capacity * args.cameras * args.width * args.height * 3 / 1024 ** 2
+    slot_bytes = args.memory_cap_mb * 1024 * 1024 // (args.cameras * capacity)
+
+    # Старый путь: frame.copy() в deque
+    start = time.perf_counter()
+    for frame in frames:
+        frame.copy()
+    copy_ms = (time.perf_counter() - start) * 1000.0 / len(frames)
+    print(f"raw deque      {raw_mb:8.0f} MB for {args.cameras} x {args.buffer_seconds} s | copy {copy_ms:.3f} ms/frame")
+
+    for quality in (50, 70, 80, 90):
+        ring = CompressedFrameRing(capacity, slot_bytes, quality=quality)
+        for i, frame in enumerate(frames):
+            data = ring.encode(frame)
+            if data is not None:
+                ring.store(data, i / args.fps, 0.0)
+
+        snap = ring.snapshot()
+        start = time.perf_counter()
+        decoded = [decode_frame(data) for data, _, _ in snap]
+        decode_ms = (time.perf_counter() - start) * 1000.0 / max(1, len(decoded))
+        quality_db = np.mean([psnr(a, b) for a, b in zip(frames[-len(decoded):], decoded)]) if decoded else 0.0
+
+        stats = ring.get_stats()
+        print(f"jpeg q={quality:<3}     {ring.arena.nbytes * args.cameras / 1024 ** 2:8.0f} MB arena | "
+              f"{stats['avg_frame_bytes'] / 1024:5.1f} KB/frame (x{stats['compression_ratio']:.0f}) | "
+              f"encode {stats['encode']['avg_ms']:.3f} ms | decode {decode_ms:.3f} ms | "
+              f"PSNR {quality_db:.1f} dB | oversize {stats['oversize_dropped']}")
+
+
+if __name__ == "__main__":
+    main()
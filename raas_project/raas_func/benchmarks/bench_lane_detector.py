@@ -0,0 +1,164 @@
+import os
+import sys
+import glob
+import time
+import argparse
+import numpy as np
+import cv2
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BASE_DIR))
+
+from lane_detector import LaneDetector, LaneTracker
+
+
+def legacy_process(image):
+    # Старый process_and_show_lane без imshow: копия кадра, новые буферы, Hough по всей нижней половине, цикл Python
+    roi = image[240:, :]
+    output = image.copy()
+    gray = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY)
+    blur = cv2.GaussianBlur(gray, (5, 5), 0)
+    edges = cv2.Canny(blur, 30, 90)
+    lines = cv2.HoughLinesP(edges, 1, np.pi / 180, 25, np.array([]), minLineLength=30, maxLineGap=150)
+    left_lines, right_lines = [], []
+    width = roi.shape[1]
+    if lines is not None:
+        for line in lines:
+            x1, y1, x2, y2 = line.reshape(4)
+            slope = (y2 - y1) / (x2 - x1 + 1e-6)
+            if abs(slope) < 0.3:
+                continue
+            midpoint = (x1 + x2) // 2
+            if slope < 0 and midpoint < width // 2:
+                left_lines.append((x1, y1, x2, y2))
+                cv2.line(output[240:], (x1, y1), (x2, y2), (0, 0, 255), 2)
+            elif slope > 0 and midpoint > width // 2:
+                right_lines.append((x1, y1, x2, y2))
+                cv2.line(output[240:], (x1, y1), (x2, y2), (0, 255, 0), 2)
+    return left_lines, right_lines
+
+
+def load_frames(path, limit, width, height):
+    # Записанные кадры: ролик из recordings/ (camera_recorder.py) или папка с PNG/JPG
+    frames = []
+    if os.path.isdir(path):
+        files = sorted(glob.glob(os.path.join(path, "*.png")) + glob.glob(os.path.join(path, "*.jpg")))
+        for f in files[:limit]:
+            frames.append(cv2.imread(f))
+    else:
+        cap = cv2.VideoCapture(path)
+        while len(frames) < limit:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            frames.append(frame)
+        cap.release()
+    return [cv2.resize(f, (width, height)) for f in frames if f is not None]
+
+
+def make_frames(count, width, height):
+    # Синтетическая дорога: асфальт с шумом, две сходящиеся линии разметки и пунктир, сдвиг по кадрам
+    rng = np.random.default_rng(0)
+    frames = []
+    horizon = height // 2
+    for i in range(count):
+        frame = np.full((height, width, 3), 90, dtype=np.uint8)
+        frame[:horizon] = (200, 170, 140)
+        frame += rng.integers(0, 20, frame.shape, dtype=np.uint8)
+        shift = int(30 * np.sin(i / 15.0))
+        vx = width // 2 + shift
+        cv2.line(frame, (vx - 10, horizon + 10), (width // 8 + shift, height), (230, 230, 230), 6)
+        cv2.line(frame, (vx + 10, horizon + 10), (width * 7 // 8 + shift, height), (230, 230, 230), 6)
+        for k in range(4):
+            y = horizon + 20 + ((k * 60 + i * 8) % (height - horizon - 20))
+            cv2.rectangle(frame, (vx - 2, y), (vx + 2, y + 20), (210, 210, 210), -1)
+        frames.append(frame)
+    return frames
+
+
+def measure(name, process, frames, repeat):
+    process(frames[0])  # прогрев
+    found = 0
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for frame in frames:
+            left, right = process(frame)
+            found += bool(len(left)) and bool(len(right))
+    ms = (time.perf_counter() - start) * 1000.0 / (repeat * len(frames))
+    share = found / (repeat * len(frames))
+    print(f"{name:34s} {ms:7.2f} ms/frame | both lanes found in {share * 100:5.1f}% of frames")
+    return ms
+
+
+def detect_and_draw(detector):
+    # Как process() с окном, но без imshow: отрисовка в заранее выделенный буфер
+    def process(frame):
+        left, right = detector.detect(frame)
+        detector.draw(frame, left, right)
+        return left, right
+    return process
+
+
+def jitter(centers):
+    # Разброс второй разности центра: плавное движение машины не считается, дрожание — считается
+    c = np.array([x for x in centers if x is not None], dtype=np.float64)
+    return float(np.std(np.diff(c, n=2))) if len(c) > 3 else float("nan")
+
+
+def per_frame_centers(frames, scale):
+    # Центр полосы заново на каждом кадре: Hough + парабола по отрезкам, без памяти между кадрами
+    tracker = LaneTracker(LaneDetector(scale=scale, show=False))
+    centers = []
+    for frame in frames:
+        tracker.left = tracker.right = None
+        tracker.roi_h = None
+        tracker.full_search(frame)
+        centers.append(tracker.center_x())
+    return centers
+
+
+def measure_tracker(frames, scale, repeat, base):
+    tracker = LaneTracker(LaneDetector(scale=scale, show=False))
+    centers = []
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for frame in frames:
+            tracker.update(frame)
+            centers.append(tracker.center_x())
+    ms = (time.perf_counter() - start) * 1000.0 / (repeat * len(frames))
+    stats = tracker.get_stats()
+    print(f"{'LaneTracker scale=' + str(scale):34s} {ms:7.2f} ms/frame | {stats['fits_per_sec']:.0f} fits/s, "
+          f"full search {stats['full_searches']}/{stats['frames']}, fallbacks {stats['fallbacks']}")
+    print(f"{'':34s} speedup x{base / ms:.1f} | centre jitter {jitter(centers[:len(frames)]):.2f} px "
+          f"vs {jitter(per_frame_centers(frames, scale)):.2f} px per-frame")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LaneDetector/LaneTracker vs old process_and_show_lane: ms/frame")
+    parser.add_argument("--input", help="recorded MP4 or a folder of PNG/JPG frames; synthetic road if omitted")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    frames = load_frames(args.input, args.frames, args.width, args.height) if args.input else []
+    if not frames:
+        if args.input:
+            print(f"[!] No frames read from {args.input}, using synthetic road")
+        frames = make_frames(args.frames, args.width, args.height)
+    print(f"[*] {len(frames)} frames {args.width}x{args.height}, repeat {args.repeat}")
+
+    base = measure("legacy (copy + alloc + loop)", legacy_process, frames, args.repeat)
+    for scale in (1.0, 0.5):
+        ms = measure(f"LaneDetector scale={scale} + draw", detect_and_draw(LaneDetector(scale=scale, show=False)),
+                     frames, args.repeat)
+        print(f"{'':34s} speedup x{base / ms:.1f}")
+        headless = LaneDetector(scale=scale, show=False)
+        ms = measure(f"LaneDetector scale={scale} headless", headless.detect, frames, args.repeat)
+        print(f"{'':34s} speedup x{base / ms:.1f}")
+        measure_tracker(frames, scale, args.repeat, base)
+
+
+if __name__ == '__main__':
+    main()
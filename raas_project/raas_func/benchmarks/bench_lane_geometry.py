@@ -0,0 +1,98 @@
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BASE_DIR))
+
+from lane_geometry import LaneGeometryCache
+
+LANE_OFFSET = 1.75   # половина ширины полосы
+
+
+def make_town(roads, length, spacing):
+    # Синтетическая сеть без CARLA: параллельные дороги по 2 полосы через 40 м, каждая слегка изогнута.
+    # Возвращает точки, курсы, (road_id, lane_id), successors и функцию «центр полосы» для эталона
+    def center(road, lane, s):
+        y0 = road * 40.0 + 8.0 * np.sin(s / 60.0)
+        return s, y0 + lane * LANE_OFFSET
+
+    points, yaws, keys, succ = [], [], [], []
+    for road in range(roads):
+        for lane in (-1, 1):
+            s = np.arange(0.0, length, spacing)
+            if lane > 0:
+                s = s[::-1]    # встречная полоса идёт в обратную сторону
+            start = len(points)
+            for k, si in enumerate(s):
+                x, y = center(road, lane, si)
+                dy = 8.0 / 60.0 * np.cos(si / 60.0)
+                yaws.append(np.degrees(np.arctan2(dy * -lane, -lane)))
+                points.append((x, y, 0.0))
+                keys.append((road, lane))
+                succ.append(start + k + 1 if k + 1 < len(s) else -1)
+    return points, yaws, keys, succ, center
+
+
+def brute_project(points, q):
+    # Без индекса: ближайшая точка перебором всех точек карты (как поиск без кеша)
+    d2 = ((points - q) ** 2).sum(axis=1)
+    return int(d2.argmin())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LaneGeometryCache: projection and look-ahead cost and accuracy")
+    parser.add_argument("--roads", type=int, default=20)
+    parser.add_argument("--length", type=float, default=800.0)
+    parser.add_argument("--spacing", type=float, default=1.0)
+    parser.add_argument("--queries", type=int, default=5000)
+    args = parser.parse_args()
+
+    points, yaws, keys, succ, center = make_town(args.roads, args.length, args.spacing)
+    start = time.perf_counter()
+    cache = LaneGeometryCache(points, yaws, keys, succ)
+    print(f"[*] {len(points)} lane points, cache built in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    rng = np.random.default_rng(0)
+    road = rng.integers(0, args.roads, args.queries)
+    lane = rng.choice([-1, 1], args.queries)
+    s = rng.uniform(5.0, args.length - 10.0, args.queries)
+    tx, ty = center(road, lane, s)
+    qx = tx + rng.uniform(-0.3, 0.3, args.queries)
+    qy = ty + rng.uniform(-1.2, 1.2, args.queries)   # смещение поперёк полосы, меньше половины ширины
+
+    start = time.perf_counter()
+    results = [cache.project(x, y, 0.0) for x, y in zip(qx.tolist(), qy.tolist())]
+    project_us = (time.perf_counter() - start) / args.queries * 1e6
+    start = time.perf_counter()
+    ahead = [cache.ahead(p, 2.0) for p in results]
+    ahead_us = (time.perf_counter() - start) / args.queries * 1e6
+
+    pts = np.asarray(points)
+    n_brute = min(args.queries, 500)
+    start = time.perf_counter()
+    for x, y in zip(qx[:n_brute], qy[:n_brute]):
+        brute_project(pts, np.array((x, y, 0.0)))
+    brute_us = (time.perf_counter() - start) / n_brute * 1e6
+
+    # Эталон: точка центра полосы на той же s (x почти совпадает с s), look-ahead — на 2 м дальше по ходу
+    px = np.array([p.x for p in results])
+    py = np.array([p.y for p in results])
+    _, cy = center(road, lane, px)
+    lateral = np.abs(py - cy)
+    wrong_lane = np.mean([(p.road_id, p.lane_id) != (int(r), int(l)) for p, r, l in zip(results, road, lane)])
+    ax = np.array([a.x for a in ahead])
+    travelled = np.abs(ax - px)
+
+    print(f"project        {project_us:8.1f} us/query | lateral error p95 {np.percentile(lateral, 95):.3f} m, "
+          f"other lane {wrong_lane * 100:.2f}%")
+    print(f"ahead(2 m)     {ahead_us:8.1f} us/query | along-lane distance p5..p95 "
+          f"{np.percentile(travelled, 5):.2f}..{np.percentile(travelled, 95):.2f} m")
+    print(f"brute nearest  {brute_us:8.1f} us/query | {len(points)} points, no index")
+    print("[*] Live get_waypoint() needs CARLA: run `python lane_geometry.py` for the check against the server")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+import os
+import sys
+import glob
+import math
+import time
+import argparse
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BASE_DIR))
+
+from lidar_obstacle import find_closest_obstacle
+
+SWEEP_PERIOD_MS = 1000.0 / 20  # rotation_frequency = 20 Гц
+POINTS_PER_SWEEP = 300000 // 20
+
+
+def legacy_closest_obstacle(points):
+    # Старый вариант из lidar_callback: поточечный цикл с math.sqrt
+    min_distance = float('inf')
+    obstacle_detected = False
+    for x, y, z, _ in points.tolist():
+        distance = math.sqrt(x ** 2 + y ** 2 + z ** 2)
+        if x > 0.5 and abs(y) < 2.0 and -0.5 < z < 2.0:
+            obstacle_detected = True
+            if distance < min_distance:
+                min_distance = distance
+    return obstacle_detected, min_distance
+
+
+def synthetic_sweeps(count, seed=0):
+    # Облако точек по кругу радиусом до 50 м + машина впереди на 8-20 м
+    rng = np.random.default_rng(seed)
+    sweeps = []
+    for _ in range(count):
+        angle = rng.uniform(-math.pi, math.pi, POINTS_PER_SWEEP)
+        radius = rng.uniform(1.0, 50.0, POINTS_PER_SWEEP)
+        points = np.empty((POINTS_PER_SWEEP, 4), dtype=np.float32)
+        points[:, 0] = radius * np.cos(angle)
+        points[:, 1] = radius * np.sin(angle)
+        points[:, 2] = rng.uniform(-1.2, 3.0, POINTS_PER_SWEEP)
+        points[:, 3] = rng.uniform(0.0, 1.0, POINTS_PER_SWEEP)
+        car = points[:500]
+        car[:, 0] = rng.uniform(8.0, 20.0)
+        car[:, 1] = rng.uniform(-1.0, 1.0, 500)
+        car[:, 2] = rng.uniform(0.0, 1.5, 500)
+        sweeps.append(points)
+    return sweeps
+
+
+def load_sweeps(sweep_dir):
+    # Каждый файл — np.save(lidar_points(data)), массив (N, 4) float32
+    files = sorted(glob.glob(os.path.join(sweep_dir, "*.npy")))
+    return [np.load(f).astype(np.float32, copy=False).reshape(-1, 4) for f in files]
+
+
+def measure(func, sweeps):
+    latencies = []
+    results = []
+    for points in sweeps:
+        start = time.perf_counter()
+        results.append(func(points))
+        latencies.append((time.perf_counter() - start) * 1000.0)
+    return np.array(latencies), results
+
+
+def report(name, latencies):
+    over = int((latencies > SWEEP_PERIOD_MS).sum())
+    print(f"{name:<12} mean {latencies.mean():8.3f} ms | p50 {np.percentile(latencies, 50):8.3f} ms | "
+          f"p95 {np.percentile(latencies, 95):8.3f} ms | max {latencies.max():8.3f} ms | "
+          f"> {SWEEP_PERIOD_MS:.0f} ms: {over}/{len(latencies)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Decision latency per LiDAR sweep for AutoBrakingSystem")
+    parser.add_argument("--sweeps", default=os.path.join(BASE_DIR, "lidar_sweeps"),
+                        help="папка с сохранёнными свипами *.npy")
+    parser.add_argument("--count", type=int, default=40, help="число синтетических свипов, если папка пуста")
+    parser.add_argument("--skip-legacy", action="store_true", help="не замерять старый поточечный цикл")
+    args = parser.parse_args()
+
+    sweeps = load_sweeps(args.sweeps) if os.path.isdir(args.sweeps) else []
+    if sweeps:
+        print(f"[*] Replaying {len(sweeps)} saved sweeps from {args.sweeps}")
+    else:
+        print(f"[*] No saved sweeps found, generating {args.count} synthetic sweeps")
+        sweeps = synthetic_sweeps(args.count)
+
+    print(f"[*] Points per sweep: {int(np.mean([len(s) for s in sweeps]))}, sweep period {SWEEP_PERIOD_MS:.0f} ms")
+
+    vec_lat, vec_res = measure(find_closest_obstacle, sweeps)
+    report("vectorized", vec_lat)
+
+    if not args.skip_legacy:
+        old_lat, old_res = measure(legacy_closest_obstacle, sweeps)
+        report("legacy loop", old_lat)
+        mismatches = sum(
+            1 for (d1, m1), (d2, m2) in zip(vec_res, old_res)
+            if d1 != d2 or (d1 and abs(m1 - m2) > 1e-3)
+        )
+        print(f"[*] Speedup: x{old_lat.mean() / vec_lat.mean():.1f} | result mismatches: {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+import os
+import sys
+import time
+import argparse
+import threading
+import subprocess
+import numpy as np
+import cv2
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BASE_DIR))
+
+from mirror_alert_toggle import AlertIconOverlay, MirrorAlertSystem
+
+ICON_PATH = os.path.join(os.path.dirname(os.path.dirname(BASE_DIR)), "static", "photos", "alert_icon.png")
+
+
+def legacy_draw_alert_icon(img, icon, position="left"):
+    # Старый draw_alert_icon: resize на каждый кадр и float-смешивание по каналам
+    icon_resized = cv2.resize(icon, (130, 130))
+    h, w, _ = img.shape
+    x, y = (20, 20) if position == "left" else (w - 150, 20)
+    alpha = icon_resized[:, :, 3] / 255.0
+    for c in range(3):
+        img[y:y+130, x:x+130, c] = (
+            icon_resized[:, :, c] * alpha + img[y:y+130, x:x+130, c] * (1 - alpha)
+        )
+
+
+def mirror_frame(left, right, draw):
+    # Один кадр дисплея зеркал, как в цикле mirror_alert_toggle.main (без imshow)
+    left_img = cv2.flip(left, 1)
+    right_img = cv2.flip(right, 1)
+    draw(left_img, "left")
+    draw(right_img, "right")
+    return cv2.hconcat([left_img, right_img])
+
+
+def measure(name, draw, left, right, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        mirror_frame(left, right, draw)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<10} {iterations / elapsed:8.0f} mirror frames/s | {elapsed / iterations * 1000:.3f} ms per frame")
+    return iterations / elapsed
+
+
+class FakeImage:
+    # Кадр sensor.camera.rgb: BGRA-байты + размеры
+    def __init__(self, raw, width, height):
+        self.raw_data = raw
+        self.width = width
+        self.height = height
+
+
+def legacy_toggle_ms():
+    # Старый переключатель: новый интерпретатор с импортом cv2/numpy/carla (подключение к CARLA и сенсоры — не считаем)
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "import cv2, numpy\ntry:\n    import carla\nexcept ImportError:\n    pass"],
+                   check=True)
+    return (time.perf_counter() - start) * 1000.0
+
+
+def inprocess_toggle_ms(toggles):
+    # MirrorAlertSystem без сенсоров: кадры подаются вручную, поток рендера — настоящий
+    mirrors = MirrorAlertSystem(world=None, vehicle=None, icon_path=ICON_PATH)
+    raw = np.random.default_rng(0).integers(0, 255, 640 * 480 * 4, dtype=np.uint8).tobytes()
+    for key in ("left", "right"):
+        mirrors.camera_callback(FakeImage(raw, 640, 480), key)
+    mirrors.radar_states["left"] = True
+    thread = threading.Thread(target=mirrors.loop, daemon=True)
+    thread.start()
+    for i in range(toggles):
+        seq = mirrors.seq
+        mirrors.set_enabled(i % 2 == 1)
+        while mirrors.seq == seq:
+            time.sleep(0.0005)
+    mirrors.stop_event.set()
+    mirrors.wake.set()
+    thread.join()
+    return mirrors.toggle_latency.snapshot()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mirror alert icon: per-frame float blend vs cached integer blend")
+    parser.add_argument("--iterations", type=int, default=500)
+    args = parser.parse_args()
+
+    icon = cv2.imread(ICON_PATH, cv2.IMREAD_UNCHANGED)
+    if icon is None:
+        print(f"[!] Icon not found: {ICON_PATH}")
+        return
+    rng = np.random.default_rng(0)
+    left = rng.integers(0, 255, (480, 640, 3), dtype=np.uint8)
+    right = rng.integers(0, 255, (480, 640, 3), dtype=np.uint8)
+
+    overlay = AlertIconOverlay(icon)
+
+    # Проверка: результат совпадает со старым смешиванием (разница — округление, не больше 1)
+    old = mirror_frame(left, right, lambda img, pos: legacy_draw_alert_icon(img, icon, pos)).astype(np.int16)
+    new = mirror_frame(left, right, overlay.draw).astype(np.int16)
+    print(f"[*] Max difference vs legacy blend: {np.abs(old - new).max()}")
+
+    old_rate = measure("legacy", lambda img, pos: legacy_draw_alert_icon(img, icon, pos), left, right, args.iterations)
+    new_rate = measure("cached", overlay.draw, left, right, args.iterations)
+    measure("no icon", lambda img, pos: None, left, right, args.iterations)
+    print(f"[*] Speedup: x{new_rate / old_rate:.1f}")
+
+    # Задержка переключателя функции: подпроцесс против флага в MirrorAlertSystem
+    legacy = [legacy_toggle_ms() for _ in range(3)]
+    stats = inprocess_toggle_ms(20)
+    print(f"[*] Toggle latency: subprocess launch {np.mean(legacy):.0f} ms (imports only) | "
+          f"in-process avg {stats['avg_ms']:.2f} ms, max {stats['max_ms']:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import threading
+import numpy as np
+import cv2
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BASE_DIR))
+
+from recording_encoder import RecordingEncoder, draw_overlay
+
+CAMERAS = ["front", "back", "left", "right"]
+
+
+def legacy_encode(jobs, lock):
+    # Старый trigger_event_recording: камеры по очереди, в этом же процессе и под self.lock
+    with lock:
+        for out_path, frames, fps in jobs.values():
+            h, w = frames[0][0].shape[:2]
+            writer = cv2.VideoWriter(out_path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (w, h))
+            for frame, ts, speed in frames:
+                frame = frame.copy()
+                draw_overlay(frame, ts, speed)
+                writer.write(frame)
+            writer.release()
+
+
+def live_cameras(lock, stop, waits, fps):
+    # Имитация add_frame для четырёх камер во время кодирования: сколько ждём блокировку
+    period = 1.0 / (fps * len(CAMERAS))
+    while not stop.is_set():
+        start = time.perf_counter()
+        with lock:
+            pass
+        waits.append((time.perf_counter() - start) * 1000.0)
+        time.sleep(period)
+
+
+def run(name, encode, jobs, lock, fps):
+    stop = threading.Event()
+    waits = []
+    camera_thread = threading.Thread(target=live_cameras, args=(lock, stop, waits, fps), daemon=True)
+    camera_thread.start()
+    start = time.perf_counter()
+    result = encode()
+    elapsed = time.perf_counter() - start
+    stop.set()
+    camera_thread.join()
+
+    total = sum(len(frames) for _, frames, _ in jobs.values())
+    waits = np.array(waits)
+    late = int((waits > 1000.0 / fps).sum())
+    print(f"{name:<13} files ready in {elapsed:6.2f} s | {total / elapsed:7.0f} frames/s | "
+          f"add_frame wait max {waits.max():8.1f} ms, {late} calls later than one frame")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Event recording: in-process encode under lock vs worker processes")
+    parser.add_argument("--seconds", type=int, default=20, help="длина ролика на камеру")
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--incidents", type=int, default=2, help="инцидентов после первого на тех же процессах")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    base = rng.integers(0, 255, (240, 320, 3), dtype=np.uint8)
+    now = time.time()
+    frames = [(np.roll(base, i, axis=1), now + i / args.fps, 50.0) for i in range(args.seconds * args.fps)]
+
+    workdir = tempfile.mkdtemp(prefix="raas_rec_bench_")
+    try:
+        lock = threading.Lock()
+        jobs = {key: (os.path.join(workdir, f"legacy_{key}.mp4"), frames, args.fps) for key in CAMERAS}
+        run("legacy", lambda: legacy_encode(jobs, lock), jobs, lock, args.fps)
+
+        # cold — процессы поднимаются на первом инциденте; warm — следующие инциденты (и первый,
+        # если рекордер поднял процессы при запуске): кодирование без запуска интерпретатора
+        encoder = RecordingEncoder()
+        try:
+            for name in ["cold"] + ["warm"] * args.incidents:
+                jobs = {key: (os.path.join(workdir, f"{name}_{key}.mp4"), frames, args.fps) for key in CAMERAS}
+                stats = run(f"workers {name}", lambda: encoder.encode_all(jobs), jobs, lock, args.fps)
+                for key, r in stats.items():
+                    print(f"  {key:<6} {r['frames']} frames | encode {r['fps']:.0f} fps in worker | "
+                          f"total {r['total_sec']:.2f} s")
+        finally:
+            encoder.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
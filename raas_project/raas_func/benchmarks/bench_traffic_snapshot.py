@@ -0,0 +1,189 @@
+import os
+import sys
+import math
+import time
+import argparse
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BASE_DIR))
+
+from lane_geometry import LaneGeometryCache
+from traffic_snapshot import TrafficSnapshot, MAX_LEAD_DISTANCE_M
+from bench_lane_geometry import make_town
+
+
+class Vector:
+    # Минимум carla.Location/Vector3D, нужный прежнему поиску и снимку
+    def __init__(self, x, y, z):
+        self.x, self.y, self.z = x, y, z
+
+    def __sub__(self, other):
+        return Vector(self.x - other.x, self.y - other.y, self.z - other.z)
+
+    def dot(self, other):
+        return self.x * other.x + self.y * other.y + self.z * other.z
+
+    def length(self):
+        return math.sqrt(self.dot(self))
+
+
+class Rotation:
+    def __init__(self, yaw):
+        self.yaw = yaw
+
+
+class Transform:
+    def __init__(self, location, yaw):
+        self.location = location
+        self.rotation = Rotation(yaw)
+
+    def get_forward_vector(self):
+        yaw = math.radians(self.rotation.yaw)
+        return Vector(math.cos(yaw), math.sin(yaw), 0.0)
+
+
+class FakeActor:
+    # Одновременно carla.Actor (get_location — RPC в прежнем поиске) и ActorSnapshot (данные снимка)
+    def __init__(self, actor_id, x, y, yaw, speed):
+        self.id = actor_id
+        self.transform = Transform(Vector(x, y, 0.0), yaw)
+        rad = math.radians(yaw)
+        self.velocity = Vector(speed * math.cos(rad), speed * math.sin(rad), 0.0)
+        self.rpc_calls = 0
+
+    def get_location(self):
+        self.rpc_calls += 1
+        return self.transform.location
+
+    def get_transform(self):
+        return self.transform
+
+    def get_velocity(self):
+        return self.velocity
+
+
+class FakeActorList(list):
+    def filter(self, pattern):
+        return self
+
+
+class FakeSnapshot(list):
+    frame = 0
+
+
+class FakeWorld:
+    def __init__(self, actors):
+        self.actors = FakeActorList(actors)
+        self.get_actors_calls = 0
+
+    def get_actors(self):
+        self.get_actors_calls += 1
+        return self.actors
+
+    def get_snapshot(self):
+        return FakeSnapshot(self.actors)
+
+
+def legacy_closest_vehicle_ahead(world, ego):
+    # Прежний AdaptiveCruiseControl.get_closest_vehicle_ahead: get_actors() и get_location() у каждой машины
+    ego_transform = ego.get_transform()
+    ego_location = ego_transform.location
+    ego_forward = ego_transform.get_forward_vector()
+    min_distance = float('inf')
+    closest_vehicle = None
+    for actor in world.get_actors().filter('vehicle.*'):
+        if actor.id == ego.id:
+            continue
+        location = actor.get_location()
+        direction = location - ego_location
+        if ego_forward.dot(direction) > 0:
+            distance = direction.length()
+            if distance < min_distance:
+                min_distance = distance
+                closest_vehicle = actor
+    return closest_vehicle, min_distance
+
+
+def place_vehicles(count, roads, length, center, rng):
+    # Машины на центрах полос синтетической сети (со смещением до 0.3 м поперёк), id с 100
+    road = rng.integers(0, roads, count)
+    lane = rng.choice([-1, 1], count)
+    s = rng.uniform(0.0, length, count)
+    x, y = center(road, lane, s)
+    y = y + rng.uniform(-0.3, 0.3, count)
+    dy = 8.0 / 60.0 * np.cos(s / 60.0)
+    yaw = np.degrees(np.arctan2(dy * -lane, -lane))
+    actors = [FakeActor(100 + i, float(x[i]), float(y[i]), float(yaw[i]), 10.0) for i in range(count)]
+    return actors, road, lane, s
+
+
+def true_leads(road, lane, s, egos, max_distance):
+    # Эталон: ближайшая машина той же полосы впереди по ходу движения (lane -1 — к большим s)
+    leads = []
+    for e in egos:
+        same = (road == road[e]) & (lane == lane[e])
+        ahead = (s - s[e]) * -lane[e]
+        ok = same & (ahead > 0.0) & (ahead <= max_distance)
+        ok[e] = False
+        leads.append(100 + int(np.where(ok, ahead, np.inf).argmin()) if ok.any() else None)
+    return leads
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TrafficSnapshot vs per-actor scan: lead vehicle search cost")
+    parser.add_argument("--counts", type=int, nargs="+", default=[10, 50, 100, 250, 500, 1000])
+    parser.add_argument("--roads", type=int, default=10)
+    parser.add_argument("--length", type=float, default=800.0)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--rpc-us", type=float, default=0.0,
+                        help="add this round-trip time per RPC to the legacy estimate (measure it on your server)")
+    args = parser.parse_args()
+
+    points, yaws, keys, succ, center = make_town(args.roads, args.length, 1.0)
+    lanes = LaneGeometryCache(points, yaws, keys, succ)
+    rng = np.random.default_rng(0)
+
+    print(f"{'actors':>6} | {'legacy ms':>9} {'RPC/query':>9} | {'update ms':>9} {'lane us':>8} {'straight us':>11} | "
+          f"{'lane ok':>7} {'straight ok':>11} {'legacy ok':>9}")
+    for count in args.counts:
+        actors, road, lane, s = place_vehicles(count, args.roads, args.length, center, rng)
+        world = FakeWorld(actors)
+        egos = rng.integers(0, count, min(args.queries, count * 4)).tolist()
+        truth = true_leads(road, lane, s, egos, MAX_LEAD_DISTANCE_M)
+
+        start = time.perf_counter()
+        legacy = [legacy_closest_vehicle_ahead(world, actors[e]) for e in egos]
+        legacy_ms = (time.perf_counter() - start) / len(egos) * 1000.0
+        rpcs = (world.get_actors_calls + sum(a.rpc_calls for a in actors)) / len(egos) + 1   # +1: ego get_transform
+        legacy_ms += rpcs * args.rpc_us / 1000.0
+
+        traffic = TrafficSnapshot(world, lanes)
+        repeats = 20
+        start = time.perf_counter()
+        for _ in range(repeats):
+            frame = traffic.update()
+        update_ms = (time.perf_counter() - start) / repeats * 1000.0
+
+        ids = [actors[e].id for e in egos]
+        frame.lead_vehicle(ids[0], lanes)    # прогрев
+        start = time.perf_counter()
+        lane_result = [frame.lead_vehicle(i, lanes) for i in ids]
+        lane_us = (time.perf_counter() - start) / len(ids) * 1e6
+        start = time.perf_counter()
+        straight_result = [frame.lead_vehicle(i) for i in ids]
+        straight_us = (time.perf_counter() - start) / len(ids) * 1e6
+
+        def agreement(found):
+            return np.mean([f == t for f, t in zip(found, truth)]) * 100.0
+
+        legacy_ids = [v.id if v is not None and d <= MAX_LEAD_DISTANCE_M else None for v, d in legacy]
+        print(f"{count:6d} | {legacy_ms:9.3f} {rpcs:9.0f} | {update_ms:9.3f} {lane_us:8.1f} {straight_us:11.1f} | "
+              f"{agreement([r[0] for r in lane_result]):6.1f}% {agreement([r[0] for r in straight_result]):10.1f}% "
+              f"{agreement(legacy_ids):8.1f}%")
+    print("[*] update: one pass over the world snapshot per tick (get_actors() only when the actor set changes); "
+          "'ok' = same lead vehicle as the exact same-lane answer")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+import os
+import numpy as np
+import cv2
+
+CAR_IMG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "static", "photos", "car_above.jpg")
+
+# Размеры канваса и центр машины на нём
+CANVAS_H, CANVAS_W = 800, 1000
+CENTER_X, CENTER_Y = 280, 400
+CAR_SIZE = (300, 150)     # до поворота на 90°
+CAR_GAP = 150             # отступ камер от центра машины
+
+# Размеры кадров после resize (ширина, высота) и сужение трапеций
+FRONT_BACK_SIZE = (350, 120)
+SIDE_SIZE = (400, 120)
+ARC_OFFSET = 40
+
+
+def resize_coords(x, y, src_size, dst_size):
+    # Обратное к cv2.resize (INTER_LINEAR): координаты в уменьшенном кадре -> в исходном
+    sw, sh = src_size
+    dw, dh = dst_size
+    return (x + 0.5) * (sw / dw) - 0.5, (y + 0.5) * (sh / dh) - 0.5
+
+
+def perspective_inverse(src_pts, dst_pts):
+    M = cv2.getPerspectiveTransform(np.float32(src_pts), np.float32(dst_pts))
+    return np.linalg.inv(M)
+
+
+def apply_homography(H, x, y):
+    den = H[2, 0] * x + H[2, 1] * y + H[2, 2]
+    return (H[0, 0] * x + H[0, 1] * y + H[0, 2]) / den, (H[1, 0] * x + H[1, 1] * y + H[1, 2]) / den
+
+
+class BirdEyeCompositor:
+    # 360-обзор: машина рисуется на канвасе один раз, а каждая камера
+    # переносится на канвас одним cv2.remap по заранее посчитанным картам
+    # (resize + поворот/отражение + перспектива слиты в одно преобразование).
+    def __init__(self, src_size=(320, 240), car_img_path=CAR_IMG_PATH):
+        self.src_size = src_size
+        # BGRA: кадры CARLA приходят в BGRA, и такой канвас сразу подходит для QImage.Format_RGB32
+        self.canvas = np.zeros((CANVAS_H, CANVAS_W, 4), dtype=np.uint8)
+        self.canvas[:, :, 3] = 255
+        self.draw_car(car_img_path)
+
+        self.maps = {}
+        self.rois = {}
+        self.composed_seq = {}  # номер кадра, который уже нарисован для каждой камеры
+        self.build_maps()
+
+    def draw_car(self, car_img_path):
+        car = cv2.imread(car_img_path)
+        if car is None:
+            print(f"[!] Car sprite not found: {car_img_path}")
+            return
+        car = cv2.resize(car, CAR_SIZE)
+        car = cv2.rotate(car, cv2.ROTATE_90_COUNTERCLOCKWISE)
+        car = cv2.cvtColor(car, cv2.COLOR_BGR2BGRA)
+        h, w = car.shape[:2]
+        x, y = CENTER_X - w // 2, CENTER_Y - h // 2
+        self.canvas[y:y + h, x:x + w] = car
+
+    def build_maps(self):
+        fw, fh = FRONT_BACK_SIZE
+        sw, sh = SIDE_SIZE
+
+        # Передняя/задняя: трапеция, сужение снизу (перед) и сверху (зад)
+        rect = [(0, 0), (fw, 0), (fw, fh), (0, fh)]
+        front_H = perspective_inverse(rect, [(0, 0), (fw, 0), (fw - ARC_OFFSET, fh), (ARC_OFFSET, fh)])
+        back_H = perspective_inverse(rect, [(ARC_OFFSET, 0), (fw - ARC_OFFSET, 0), (fw, fh), (0, fh)])
+
+        # Боковые после поворота имеют размер (sh x sw), сужаются к машине
+        rw, rh = sh, sw
+        offset = rw // 2
+        rect_side = [(0, 0), (rw, 0), (rw, rh), (0, rh)]
+        left_H = perspective_inverse(rect_side, [(0, 0), (rw, offset), (rw, rh - offset), (0, rh)])
+        right_H = perspective_inverse(rect_side, [(0, offset), (rw, 0), (rw, rh), (0, rh - offset)])
+
+        layout = {
+            "front": (CENTER_X - fw // 2, CENTER_Y - CAR_GAP - fh, fw, fh, front_H, FRONT_BACK_SIZE, None),
+            "back": (CENTER_X - fw // 2, CENTER_Y + CAR_GAP, fw, fh, back_H, FRONT_BACK_SIZE, "flip"),
+            "left": (CENTER_X - CAR_GAP - rw, CENTER_Y - rh // 2, rw, rh, left_H, SIDE_SIZE, "ccw"),
+            "right": (CENTER_X + CAR_GAP, CENTER_Y - rh // 2, rw, rh, right_H, SIDE_SIZE, "cw"),
+        }
+
+        for key, (x0, y0, w, h, H, resized, turn) in layout.items():
+            # Обрезка по краям канваса
+            cx0, cy0 = max(x0, 0), max(y0, 0)
+            cx1, cy1 = min(x0 + w, CANVAS_W), min(y0 + h, CANVAS_H)
+            if cx0 >= cx1 or cy0 >= cy1:
+                continue
+
+            xs, ys = np.meshgrid(np.arange(cx0 - x0, cx1 - x0, dtype=np.float64),
+                                 np.arange(cy0 - y0, cy1 - y0, dtype=np.float64))
+            # 1) выход перспективы -> кадр до перспективы
+            u, v = apply_homography(H, xs, ys)
+            outside = (u < -0.5) | (u > w - 0.5) | (v < -0.5) | (v > h - 0.5)
+
+            # 2) отменяем поворот/отражение -> кадр после resize
+            rsw, rsh = resized
+            if turn == "ccw":
+                ax, ay = rsw - 1 - v, u
+            elif turn == "cw":
+                ax, ay = v, rsh - 1 - u
+            elif turn == "flip":
+                ax, ay = rsw - 1 - u, rsh - 1 - v
+            else:
+                ax, ay = u, v
+
+            # 3) отменяем resize -> исходный кадр камеры
+            sx, sy = resize_coords(ax, ay, self.src_size, resized)
+            sx[outside] = -10
+            sy[outside] = -10
+
+            map1, map2 = cv2.convertMaps(sx.astype(np.float32), sy.astype(np.float32), cv2.CV_16SC2)
+            self.maps[key] = (map1, map2)
+            self.rois[key] = (slice(cy0, cy1), slice(cx0, cx1))
+
+    def update(self, key, bgra):
+        # Один remap: кадр камеры сразу в свою область канваса
+        if key not in self.maps:
+            return
+        map1, map2 = self.maps[key]
+        rows, cols = self.rois[key]
+        cv2.remap(bgra, map1, map2, cv2.INTER_LINEAR, dst=self.canvas[rows, cols],
+                  borderMode=cv2.BORDER_CONSTANT, borderValue=(0, 0, 0, 255))
+
+    def compose(self, frames, seqs=None):
+        # frames: {'front': bgra, ...}; seqs: {'front': номер кадра, ...}.
+        # Камеры, чей номер не изменился с прошлого вызова, не перерисовываются.
+        # Возвращает число обновлённых камер; результат — общий BGRA-канвас self.canvas.
+        changed = 0
+        for key, bgra in frames.items():
+            seq = seqs.get(key) if seqs else None
+            if seq is not None and self.composed_seq.get(key) == seq:
+                continue
+            self.update(key, bgra)
+            self.composed_seq[key] = seq
+            changed += 1
+        return changed
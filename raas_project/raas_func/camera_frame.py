@@ -0,0 +1,43 @@
+import numpy as np
+import cv2
+
+
+class CameraFrame:
+    # Кадр камеры CARLA: raw_data оборачивается в NumPy один раз, без копирования.
+    # Дисплей, запись и 360-композит читают один и тот же буфер,
+    # а преобразования форматов делаются лениво и кешируются.
+    def __init__(self, image, seq=None):
+        self.image = image  # держим ссылку, чтобы буфер raw_data жил вместе с кадром
+        self.width = image.width
+        self.height = image.height
+        self.frame = getattr(image, "frame", None)
+        self.timestamp = getattr(image, "timestamp", None)
+        self.seq = seq  # порядковый номер кадра этой камеры (Camera360 считает с 1)
+
+        bgra = np.frombuffer(image.raw_data, dtype=np.uint8).reshape((image.height, image.width, 4))
+        bgra.setflags(write=False)
+        self._bgra = bgra
+        self._rgb = None
+        self._surface = None
+
+    def bgra(self):
+        # Исходный буфер (B, G, R, A) — подходит для QImage.Format_RGB32 без преобразований
+        return self._bgra
+
+    def bgr(self):
+        # Вид без копирования (не непрерывный в памяти)
+        return self._bgra[:, :, :3]
+
+    def rgb(self):
+        if self._rgb is None:
+            rgb = cv2.cvtColor(self._bgra, cv2.COLOR_BGRA2RGB)
+            rgb.setflags(write=False)
+            self._rgb = rgb
+        return self._rgb
+
+    def surface(self):
+        # pygame нужен только тем, кто действительно просит Surface
+        if self._surface is None:
+            import pygame
+            self._surface = pygame.surfarray.make_surface(self.rgb().swapaxes(0, 1))
+        return self._surface
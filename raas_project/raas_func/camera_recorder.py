@@ -1,18 +1,60 @@
 import os
-import cv2
+import json
 import time
-import numpy as np
 import threading
 from datetime import datetime
-from collections import deque
 import carla  # подключаем CARLA
+from recording_encoder import RecordingEncoder
+from frame_ring_buffer import CompressedFrameRing
+
+POST_EVENT_GRACE_SEC = 0.5  # запас на кадры, которые ещё сжимаются в add_frame к концу окна
+
+
+class Incident:
+    # Один инцидент — один ролик на камеру. Послесобытийная часть получает ровно те кадры,
+    # что пришли после снимка буфера (по номеру кадра). Триггеры, пришедшие пока окно открыто,
+    # продлевают его и попадают в индекс событий, а не запускают отдельную запись.
+    # Все методы вызываются под CameraBufferRecorder.lock
+    def __init__(self, after_seq, reason, now, post_seconds, max_post_seconds):
+        self.after_seq = after_seq                     # {key: последний номер кадра в снимке}
+        self.started = now
+        self.until_ts = now + post_seconds
+        self.max_until_ts = now + max_post_seconds
+        self.frames = {key: [] for key in after_seq}
+        self.events = [(now, reason)]
+
+    def extend(self, reason, now, post_seconds):
+        # False — продление вышло бы за max_post_seconds, нужен новый инцидент
+        if now + post_seconds > self.max_until_ts:
+            return False
+        self.until_ts = max(self.until_ts, now + post_seconds)
+        self.events.append((now, reason))
+        return True
+
+    def offer(self, key, seq, data, ts, speed):
+        # Берём всё после снимка; лишнее за until_ts отрезается при закрытии (окно ещё может продлиться)
+        if key in self.frames and seq > self.after_seq[key]:
+            self.frames[key].append((data, ts, speed))
+
+    def close(self):
+        for key, frames in self.frames.items():
+            self.frames[key] = [f for f in frames if f[1] <= self.until_ts]
+
 
 class CameraBufferRecorder:
-    def __init__(self, camera_keys, fps=30, buffer_seconds=60, post_seconds=60, output_dir="recordings"):
+    def __init__(self, camera_keys, fps=30, buffer_seconds=60, post_seconds=60, output_dir="recordings",
+                 memory_cap_mb=256, jpeg_quality=80, max_post_seconds=None, telemetry=None):
         self.fps = fps
+        self.telemetry = telemetry    # VehicleTelemetry панели; без неё скорость спрашивается у машины
         self.buffer_seconds = buffer_seconds
         self.post_seconds = post_seconds
-        self.buffer = {key: deque(maxlen=fps * buffer_seconds) for key in camera_keys}
+        # Насколько повторные триггеры могут продлить один ролик после первого события
+        self.max_post_seconds = max_post_seconds or 3 * post_seconds
+        # Предсобытийная история в JPEG: memory_cap_mb на все камеры, слоты фиксированного размера.
+        # jpeg_quality — компромисс качество/CPU (ниже качество — меньше байт и быстрее encode)
+        capacity = fps * buffer_seconds
+        slot_bytes = memory_cap_mb * 1024 * 1024 // (len(camera_keys) * capacity)
+        self.buffer = {key: CompressedFrameRing(capacity, slot_bytes, quality=jpeg_quality) for key in camera_keys}
         self.last_frame_time = {key: None for key in camera_keys}
 
         # === Подключаемся к CARLA и машине
@@ -25,9 +67,20 @@ class CameraBufferRecorder:
         base_dir = os.path.dirname(os.path.abspath(__file__))
         self.output_dir = os.path.join(base_dir, output_dir)
         self.lock = threading.Lock()
+        self.captures = []       # инциденты, ещё собирающие кадры
+        self.incident = None     # последний открытый инцидент, который можно продлить
+        self.incidents_recorded = 0
+        self.triggers_coalesced = 0
+        # Процессы кодирования поднимаются сразу и живут до выхода панели (daemon): первый инцидент не ждёт spawn
+        self.encoder = RecordingEncoder()
+        self.encoder.start(camera_keys)
+        self.last_recording_stats = None
         os.makedirs(self.output_dir, exist_ok=True)
 
     def get_speed_kmh(self):
+        record = self.telemetry.read("recorder") if self.telemetry is not None else None
+        if record is not None:
+            return int(record.speed_kmh)
         try:
             if self.vehicle:
                 v = self.vehicle.get_velocity()
@@ -38,72 +91,109 @@ class CameraBufferRecorder:
         return 0
 
     def add_frame(self, key, frame):
+        if key not in self.buffer or not self.vehicle:
+            return
+        # Сжатие и запрос скорости — вне блокировки; под ней только копия байтов в слот.
+        # Скорость — из телеметрии тика, если она подключена, а не get_velocity() на каждый кадр каждой камеры
+        speed = self.get_speed_kmh()
+        data = self.buffer[key].encode(frame)
+        if data is None:
+            return
+        now = time.time()
+        with self.lock:
+            seq = self.buffer[key].store(data, now, speed)
+            self.last_frame_time[key] = now
+            for incident in self.captures:
+                incident.offer(key, seq, data, now, speed)
+
+    def get_stats(self):
+        # Память и стоимость кадра по камерам
         with self.lock:
-            if key in self.buffer and self.vehicle:
-                velocity = self.vehicle.get_velocity()
-                speed = (velocity.x**2 + velocity.y**2 + velocity.z**2)**0.5 * 3.6
-                self.buffer[key].append((frame.copy(), time.time(), speed))
-                self.last_frame_time[key] = time.time()
+            stats = {key: ring.get_stats() for key, ring in self.buffer.items()}
+            stats["incidents_recorded"] = self.incidents_recorded
+            stats["triggers_coalesced"] = self.triggers_coalesced
+            return stats
 
 
-    def trigger_event_recording(self):
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    def trigger_event_recording(self, reason="event"):
+        trigger_time = time.perf_counter()
+        now = time.time()
         buffer_snapshots = {}
-        local_sizes = {}
 
         with self.lock:
-            for key, frames in self.buffer.items():
-                if not frames:
+            # Уже идёт запись — продлеваем её вместо второго снимка и второго кодирования
+            if self.incident is not None and self.incident.extend(reason, now, self.post_seconds):
+                self.triggers_coalesced += 1
+                print(f"[*] Recording: '{reason}' merged into the active incident")
+                return
+
+            # Под блокировкой — только копия сжатых байтов; распаковка идёт в процессах кодирования.
+            # В том же критическом участке подписываемся на кадры после снимка — без пропусков и повторов
+            for key, ring in self.buffer.items():
+                if not len(ring):
                     continue
-                buffer_snapshots[key] = list(frames)
-                frame_sample = frames[0][0]  # достаём сам frame из tuple
-                h, w = frame_sample.shape[:2]
-                local_sizes[key] = (w, h)
-
-        def stop_local_recording():
-            post_frames = {k: [] for k in buffer_snapshots}
-            start_time = time.time()
-
-            while time.time() - start_time < self.post_seconds:
-                with self.lock:
-                    for key in post_frames:
-                        if self.buffer[key]:
-                            frame, ts, speed = self.buffer[key][-1]
-                            post_frames[key].append((frame.copy(), ts, speed))
-                time.sleep(1 / self.fps)
-
+                buffer_snapshots[key] = ring.snapshot()
+            incident = Incident({key: self.buffer[key].last_seq for key in buffer_snapshots},
+                                reason, now, self.post_seconds, self.max_post_seconds)
+            self.incident = incident
+            self.captures.append(incident)
+
+        threading.Thread(target=self.finish_incident, args=(incident, buffer_snapshots, trigger_time),
+                         daemon=True).start()
+
+    def finish_incident(self, incident, buffer_snapshots, trigger_time):
+        # Ждём конца окна; если его продлили, ждём дальше
+        while True:
             with self.lock:
-                for key, before_frames in buffer_snapshots.items():
-                    after_frames = post_frames[key]
-                    all_frames = before_frames + after_frames
-                    total_frames = len(all_frames)
-                    forced_fps = max(1, total_frames / (self.buffer_seconds + self.post_seconds))
-
-                    w, h = local_sizes[key]
-                    out_path = os.path.join(self.output_dir, f"{timestamp}_{key}.mp4")
-                    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-                    writer = cv2.VideoWriter(out_path, fourcc, forced_fps, (w, h))
-
-                    for frame, ts, speed in all_frames:
-                        if frame.shape[:2] != (h, w):
-                            frame = cv2.resize(frame, (w, h))
-
-                        dt = datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S")
-                        overlay_text = f"{dt}  |  {int(speed)} km/h"
-
-                        # Мелкий шрифт
-                        font_scale = 0.4
-                        thickness = 1
-                        color = (255, 255, 255)
-
-                        text_size, _ = cv2.getTextSize(overlay_text, cv2.FONT_HERSHEY_SIMPLEX, font_scale, thickness)
-                        text_x = w - text_size[0] - 10
-                        text_y = 15
-
-                        cv2.putText(frame, overlay_text, (text_x, text_y), cv2.FONT_HERSHEY_SIMPLEX, font_scale, color, thickness, cv2.LINE_AA)
-
-                        writer.write(frame)
-
-                    writer.release()
-
-        threading.Thread(target=stop_local_recording, daemon=True).start()
+                remaining = incident.until_ts + POST_EVENT_GRACE_SEC - time.time()
+                if remaining <= 0:
+                    self.captures.remove(incident)
+                    if self.incident is incident:
+                        self.incident = None
+                    incident.close()
+                    self.incidents_recorded += 1
+                    break
+            time.sleep(remaining)
+
+        # Кодирование — без self.lock: add_frame продолжает работать для всех камер.
+        # Кадры несут свои времена: энкодер раскладывает их по сетке fps в реальном времени
+        timestamp = datetime.fromtimestamp(incident.started).strftime("%Y%m%d_%H%M%S")
+        jobs = {}
+        for key, before_frames in buffer_snapshots.items():
+            out_path = os.path.join(self.output_dir, f"{timestamp}_{key}.mp4")
+            jobs[key] = (out_path, before_frames + incident.frames[key], self.fps)
+
+        results = self.encoder.encode_all(jobs)
+        self.write_event_index(incident, jobs, timestamp)
+        self.report_recording(results, trigger_time)
+
+    def write_event_index(self, incident, jobs, timestamp):
+        # Индекс событий инцидента: время каждого триггера и смещение от начала роликов
+        starts = [frames[0][1] for _, frames, _ in jobs.values() if frames]
+        clip_start = min(starts) if starts else incident.started
+        index = {
+            "clip_start": datetime.fromtimestamp(clip_start).isoformat(timespec="milliseconds"),
+            "files": {key: os.path.basename(out_path) for key, (out_path, _, _) in jobs.items()},
+            "events": [
+                {
+                    "time": datetime.fromtimestamp(ts).isoformat(timespec="milliseconds"),
+                    "offset_sec": round(ts - clip_start, 3),
+                    "reason": reason,
+                }
+                for ts, reason in incident.events
+            ],
+        }
+        path = os.path.join(self.output_dir, f"{timestamp}_events.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(index, f, ensure_ascii=False, indent=2)
+
+    def report_recording(self, results, trigger_time):
+        # Скорость кодирования и время от триггера до готового файла
+        end_to_end = time.perf_counter() - trigger_time
+        self.last_recording_stats = {"end_to_end_sec": end_to_end, "cameras": results,
+                                     "incidents_recorded": self.incidents_recorded,
+                                     "triggers_coalesced": self.triggers_coalesced}
+        for key, r in results.items():
+            print(f"[*] Recording {key}: {r['frames']} frames ({r['duplicated']} repeated, {r['dropped']} dropped for real timing), "
+                  f"encode {r['fps']:.0f} fps, "
+                  f"file ready in {r['total_sec']:.1f} s (trigger to file {end_to_end:.1f} s)")
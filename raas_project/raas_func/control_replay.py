@@ -0,0 +1,105 @@
+import json
+import threading
+import carla
+
+# Запись и воспроизведение управления по тикам TickScheduler. Формат — как у world_setup/record_controls.py
+# (path1.json, path2.json): список шагов с timestamp (с от начала, время симуляции), позой и полями
+# VehicleControl. При том же fixed_delta и старте с той же позы воспроизведение повторяет запись тик в тик
+
+
+def make_control(step):
+    control = carla.VehicleControl(
+        throttle=step["throttle"],
+        steer=step["steer"],
+        brake=step["brake"],
+        reverse=step["reverse"],
+        hand_brake=step.get("hand_brake", False)
+    )
+    if step.get("manual_gear", False):
+        control.manual_gear_shift = True
+        control.gear = step.get("gear", 0)
+    else:
+        control.manual_gear_shift = False
+    return control
+
+
+class ControlRecorder:
+    # Модуль планировщика: после остальных модулей записывает позу и итоговое управление машины
+    def __init__(self, vehicle):
+        self.vehicle = vehicle
+        self.steps = []
+        self.start_time = None
+
+    def on_tick(self, tick):
+        self.record(tick, self.vehicle.get_control())
+
+    def record(self, tick, control):
+        # Запись с управлением, которое модуль только что применил: get_control() отдаёт управление
+        # прошлого тика, и запись разошлась бы с воспроизведением на тик
+        if self.start_time is None:
+            self.start_time = tick.sim_time
+        transform = self.vehicle.get_transform()
+        loc, rot = transform.location, transform.rotation
+        self.steps.append({
+            "timestamp": round(tick.sim_time - self.start_time, 4),
+            "x": round(loc.x, 3),
+            "y": round(loc.y, 3),
+            "z": round(loc.z, 3),
+            "yaw": round(rot.yaw, 2),
+            "pitch": round(rot.pitch, 2),
+            "roll": round(rot.roll, 2),
+            # Управление — без округления: иначе воспроизведение расходится с записью
+            "steer": control.steer,
+            "throttle": control.throttle,
+            "brake": control.brake,
+            "reverse": control.reverse,
+            "gear": control.gear,
+            "manual_gear": control.manual_gear_shift,
+            "hand_brake": control.hand_brake
+        })
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump(self.steps, f, indent=2)
+        print(f"[+] Controls saved to {path} ({len(self.steps)} ticks)")
+
+
+class ControlReplay:
+    # Модуль планировщика: шаг записи применяется на тике, ближайшем к его timestamp
+    # (время симуляции с начала воспроизведения). teleport=True ставит машину в записанную начальную позу
+    def __init__(self, vehicle, steps, teleport=False):
+        self.vehicle = vehicle
+        start_ts = steps[0]["timestamp"] if steps else 0.0
+        self.steps = [dict(step, timestamp=step["timestamp"] - start_ts) for step in steps]
+        self.teleport = teleport
+        self.index = 0
+        self.start_time = None
+        self.done = threading.Event()
+        if not self.steps:
+            self.done.set()
+
+    @classmethod
+    def load(cls, vehicle, path, teleport=False):
+        with open(path, "r") as f:
+            return cls(vehicle, json.load(f), teleport)
+
+    def on_tick(self, tick):
+        if self.done.is_set():
+            return
+        if self.start_time is None:
+            self.start_time = tick.sim_time
+            if self.teleport:
+                first = self.steps[0]
+                self.vehicle.set_transform(carla.Transform(
+                    carla.Location(x=first["x"], y=first["y"], z=first["z"]),
+                    carla.Rotation(yaw=first["yaw"], pitch=first["pitch"], roll=first["roll"])))
+        # Полшага запаса: timestamp в записи округлён, шаг должен попасть на свой тик, а не на следующий
+        elapsed = tick.sim_time - self.start_time + tick.delta / 2
+        step = None
+        while self.index < len(self.steps) and self.steps[self.index]["timestamp"] <= elapsed:
+            step = self.steps[self.index]
+            self.index += 1
+        if step is not None:
+            self.vehicle.apply_control(make_control(step))
+        if self.index >= len(self.steps):
+            self.done.set()
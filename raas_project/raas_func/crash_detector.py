@@ -0,0 +1,134 @@
+import math
+import numpy as np
+
+# Детектор ДТП без CARLA и Qt: скорость и курс своей машины на каждый тик складываются в кольцевой буфер,
+# признаки считаются по окну последних WINDOW_S секунд — падение скорости, пиковое замедление и поворот
+# курса (курс разворачивается, переход через ±180° не даёт ложного скачка). Вызывается с частотой тиков
+WINDOW_S = 0.5               # окно признаков
+HISTORY_S = 4.0              # сколько движения хранится для записи следа аварии
+MIN_SPEED_KMH = 30.0         # до удара машина ехала быстрее (как в прежнем мониторе)
+SPEED_DROP_KMH = 30.0        # потеря скорости в окне: торможением за WINDOW_S столько не сбросить
+IMPACT_DECEL = 30.0          # м/с², пиковое замедление между соседними тиками (~3g) — удар
+IMPACT_DROP_KMH = 10.0       # и при этом потеря хотя бы такой скорости: короткий удар, не шум
+YAW_CHANGE_DEG = 60.0        # поворот курса в окне: разворот/занос, а не поворот на перекрёстке
+YAW_RATE_WINDOW_S = 0.15     # короткое окно для скорости поворота
+YAW_RATE_DEG_S = 120.0       # град/с: выше MIN_SPEED_KMH это больше 1.5g поперёк — шинам не удержать, занос
+
+
+def wrap_yaw(yaw):
+    # Курс в [-180, 180)
+    return ((float(yaw) + 180.0) % 360.0) - 180.0
+
+
+class CrashEvent:
+    # Срабатывание детектора. После создания не меняется: передаётся в поток GUI как есть
+    def __init__(self, reason, sim_time, speed_before, speed_after, yaw_before, yaw_after, yaw_change, peak_decel,
+                 yaw_rate, trace):
+        self.reason = reason              # speed_drop, impact или yaw
+        self.sim_time = sim_time          # время тика, на котором сработал детектор
+        self.speed_before = speed_before  # км/ч, наибольшая в окне
+        self.speed_after = speed_after    # км/ч, на этом тике
+        self.speed_drop = speed_before - speed_after
+        self.yaw_before = yaw_before      # градусы, в начале окна
+        self.yaw_after = yaw_after
+        self.yaw_change = yaw_change      # градусы, размах развёрнутого курса в окне (занос на 360° тоже виден)
+        self.peak_decel = peak_decel      # м/с²
+        self.yaw_rate = yaw_rate          # град/с, в коротком окне YAW_RATE_WINDOW_S
+        self.trace = trace                # {"time", "speed", "yaw"}: движение за HISTORY_S до срабатывания
+
+
+class MotionRing:
+    # Кольцевой буфер фиксированного размера. Каждый отсчёт пишется дважды (в i и i + capacity),
+    # поэтому последние count отсчётов всегда лежат подряд и окно берётся срезом без копирования
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.times = np.zeros(2 * capacity, dtype=np.float64)
+        self.speeds = np.zeros(2 * capacity, dtype=np.float64)
+        self.yaws = np.zeros(2 * capacity, dtype=np.float64)    # развёрнутый курс
+        self.head = 0
+        self.count = 0
+
+    def clear(self):
+        self.head = 0
+        self.count = 0
+
+    def append(self, t, speed, yaw):
+        for i in (self.head, self.head + self.capacity):
+            self.times[i] = t
+            self.speeds[i] = speed
+            self.yaws[i] = yaw
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def last(self, n):
+        # (времена, скорости, курсы) последних n отсчётов от старых к новым — срезы, не копии
+        n = min(n, self.count)
+        end = self.head + self.capacity
+        return self.times[end - n:end], self.speeds[end - n:end], self.yaws[end - n:end]
+
+    def since(self, t):
+        # Отсчёты со временем >= t
+        times, speeds, yaws = self.last(self.count)
+        start = int(np.searchsorted(times, t))
+        return times[start:], speeds[start:], yaws[start:]
+
+
+class CrashDetector:
+    def __init__(self, rate_hz=30.0, window=WINDOW_S):
+        self.window = window
+        self.ring = MotionRing(max(8, int(math.ceil(HISTORY_S * rate_hz)) + 1))
+        self.raw_yaw = None
+        self.yaw = 0.0
+        self.samples = 0
+        self.events = 0
+
+    def reset(self):
+        # После срабатывания окно начинается заново, иначе тот же удар сработает на следующих тиках
+        self.ring.clear()
+        self.raw_yaw = None
+
+    def add(self, t, speed_kmh, yaw_deg):
+        # Один отсчёт (время симуляции, скорость км/ч, курс в градусах). Возвращает CrashEvent или None
+        if self.raw_yaw is None:
+            self.yaw = yaw_deg
+        else:
+            self.yaw += wrap_yaw(yaw_deg - self.raw_yaw)
+        self.raw_yaw = yaw_deg
+        if self.ring.count and t <= self.ring.last(1)[0][0]:
+            return None    # повтор того же тика
+        self.ring.append(t, speed_kmh, self.yaw)
+        self.samples += 1
+
+        times, speeds, yaws = self.ring.since(t - self.window)
+        if len(times) < 2:
+            return None
+        peak = int(speeds.argmax())
+        speed_before = speeds[peak]
+        if speed_before < MIN_SPEED_KMH:
+            return None
+
+        drop = speed_before - speed_kmh
+        dt = np.diff(times)
+        peak_decel = float((-np.diff(speeds) / 3.6 / dt).max())
+        yaw_range = float(yaws.max() - yaws.min())
+        recent = int(np.searchsorted(times, t - YAW_RATE_WINDOW_S))
+        span = times[-1] - times[recent]
+        yaw_rate = abs(float(yaws[-1] - yaws[recent])) / span if span > 0.0 else 0.0
+
+        if drop > SPEED_DROP_KMH:
+            reason = "speed_drop"
+        elif peak_decel > IMPACT_DECEL and drop > IMPACT_DROP_KMH:
+            reason = "impact"
+        elif yaw_range > YAW_CHANGE_DEG or yaw_rate > YAW_RATE_DEG_S:
+            reason = "yaw"
+        else:
+            return None
+
+        trace_times, trace_speeds, trace_yaws = self.ring.since(t - HISTORY_S)
+        trace = {"time": trace_times.tolist(), "speed": trace_speeds.tolist(),
+                 "yaw": [wrap_yaw(y) for y in trace_yaws.tolist()]}
+        event = CrashEvent(reason, t, float(speed_before), float(speed_kmh), wrap_yaw(yaws[0]), yaw_deg,
+                           yaw_range, peak_decel, yaw_rate, trace)
+        self.events += 1
+        self.reset()
+        return event
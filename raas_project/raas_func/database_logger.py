@@ -1,12 +1,108 @@
+import os
 import sqlite3
+import queue
+import time
+import json
+import socket
+import atexit
 from datetime import datetime
 import threading
+from perf_stats import LatencyStats
+
+# База лежит рядом с модулем, независимо от текущей директории процесса
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "system_data.db")
+
+# Сколько SQLite ждёт чужую блокировку записи: больше самой длинной транзакции обслуживания
+# (порция архивации DatabaseMaintenance), иначе запись падает с "database is locked"
+DB_BUSY_TIMEOUT_MS = 30000
+
+# Пауза между повторами неудачного сброса очереди: растёт вдвое до этого предела
+MAX_FLUSH_BACKOFF_S = 2.0
+
+# Сколько shutdown() ждёт, пока фоновый поток допишет очередь; сам он в SQLite не ждёт
+SHUTDOWN_FLUSH_TIMEOUT_S = 2.0
+
+# Версия схемы в PRAGMA user_version
+SCHEMA_VERSION = 3
+
+# Таблицы событий и колонки для индекса (..., ts)
+EVENT_TABLES = {
+    "function_states": "function_name",
+    "system_sessions": "event",
+    "mirror_alerts": "side",
+    "emergency_brakes": None,
+    "cruise_control": "action",
+    "smart_parking": "action",
+    "emergency_calls": None,
+    "fatigue_warnings": "category",
+}
+
+# Локальный сокет, через который подпроцессы RAAS пишут в базу панели
+DB_SINK_ADDRESS = ("127.0.0.1", 50555)
 
 class DatabaseLogger:
-    def __init__(self, db_path="system_data.db"):
+    # Все живые логгеры процесса — чтобы панель могла сбросить их при выходе
+    _instances = []
+
+    def __init__(self, db_path=DEFAULT_DB_PATH, write_behind=True,
+                 flush_interval_ms=200, flush_batch_size=100, max_queue_size=10000):
+        start = time.perf_counter()
+        self.db_path = db_path
         self.lock = threading.Lock()
-        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn = sqlite3.connect(db_path, timeout=DB_BUSY_TIMEOUT_MS / 1000.0, check_same_thread=False)
+        self.conn.execute(f"PRAGMA busy_timeout = {DB_BUSY_TIMEOUT_MS}")
+        # WAL: читатели не блокируют писателя, а commit не требует fsync на каждую строку
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        # Схема создаётся лениво, при первом обращении к базе
+        self.schema_ready = False
+
+        # === Режим отложенной записи (write-behind)
+        self.write_behind = write_behind
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.flush_batch_size = flush_batch_size
+        self.pending = queue.Queue(maxsize=max_queue_size)
+        self.max_queue_size = max_queue_size
+        self.retry_batch = []     # строки неудачного сброса: пишутся первыми в следующий раз
+        self.flush_lock = threading.Lock()
+        self.wake = threading.Event()
+        self.closing = threading.Event()    # прерывает паузу между повторами при shutdown()
+        self.closed = False
+
+        self.rows_written = 0
+        self.rows_dropped = 0
+        self.batches_written = 0
+        self.last_flush_ms = 0.0
+        self.flush_failures = 0
+        self.consecutive_failures = 0
+
+        # Ожидание self.lock и время записи (включая ожидание файловой блокировки SQLite)
+        self.lock_wait = LatencyStats("db lock wait")
+        self.write_time = LatencyStats("db write")
+
+        self.flusher = None
+        if self.write_behind:
+            self.flusher = threading.Thread(target=self.flush_loop, daemon=True)
+            self.flusher.start()
+            atexit.register(self.shutdown)
+        DatabaseLogger._instances.append(self)
+        self.init_ms = (time.perf_counter() - start) * 1000.0
+        self.schema_ms = 0.0
+
+    def acquire(self):
+        start = time.perf_counter()
+        self.lock.acquire()
+        self.lock_wait.add((time.perf_counter() - start) * 1000.0)
+
+    def ensure_schema(self):
+        # Вызывается под self.lock
+        if self.schema_ready:
+            return
+        start = time.perf_counter()
         self.create_tables()
+        self.migrate()
+        self.schema_ready = True
+        self.schema_ms = (time.perf_counter() - start) * 1000.0
 
     def create_tables(self):
         cursor = self.conn.cursor()
@@ -100,96 +196,441 @@ class DatabaseLogger:
 
         self.conn.commit()
 
+    def migrate(self):
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version >= SCHEMA_VERSION:
+            return
+
+        print(f"[*] Migrating {self.db_path} schema v{version} -> v{SCHEMA_VERSION}...")
+        with self.conn:
+            if version < 1:
+                self.migrate_v1()
+            if version < 2:
+                self.migrate_v2()
+            if version < 3:
+                self.migrate_v3()
+            self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def migrate_v1(self):
+        # Время в микросекундах эпохи (INTEGER) + индексы + таблица текущих состояний
+        for table, key in EVENT_TABLES.items():
+            columns = [row[1] for row in self.conn.execute(f"PRAGMA table_info({table})")]
+            if "ts" not in columns:
+                self.conn.execute(f"ALTER TABLE {table} ADD COLUMN ts INTEGER")
+            # Старые строки: ISO-текст в локальном времени -> микросекунды эпохи
+            self.conn.execute(f'''
+                UPDATE {table}
+                SET ts = CAST(ROUND((julianday(timestamp, 'utc') - 2440587.5) * 86400000000.0) AS INTEGER)
+                WHERE ts IS NULL
+            ''')
+            index_cols = f"{key}, ts" if key else "ts"
+            self.conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_ts ON {table} ({index_cols})")
+
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS function_current_state (
+                function_name TEXT PRIMARY KEY,
+                state TEXT NOT NULL,
+                ts INTEGER NOT NULL
+            )
+        ''')
+        # Последнее состояние каждой функции из накопленной истории
+        self.conn.execute('''
+            INSERT OR REPLACE INTO function_current_state (function_name, state, ts)
+            SELECT f.function_name, f.state, f.ts
+            FROM function_states f
+            JOIN (SELECT function_name, MAX(id) AS last_id FROM function_states GROUP BY function_name) last
+              ON f.id = last.last_id
+        ''')
+
+    def migrate_v2(self):
+        # Агрегаты по часам/суткам и отметки, до какого момента данные уже свёрнуты
+        for period in ("hourly", "daily"):
+            self.conn.execute(f'''
+                CREATE TABLE IF NOT EXISTS rollup_{period} (
+                    table_name TEXT NOT NULL,
+                    bucket_ts INTEGER NOT NULL,   -- начало часа/суток, микросекунды эпохи
+                    key TEXT NOT NULL,            -- side / action / category ... или ''
+                    count INTEGER NOT NULL,
+                    min_value REAL,               -- скорость и т.п., если есть в таблице
+                    max_value REAL,
+                    sum_value REAL,
+                    PRIMARY KEY (table_name, bucket_ts, key)
+                )
+            ''')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS maintenance_state (
+                table_name TEXT PRIMARY KEY,
+                rolled_up_to_ts INTEGER NOT NULL
+            )
+        ''')
+
+    def migrate_v3(self):
+        # Отметка свёртки по id: строки отложенной записи приходят с ts в прошлом, а id (AUTOINCREMENT)
+        # растёт в порядке вставки. NULL — свёртка ещё по ts, первый проход доберёт строки от rolled_up_to_ts
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(maintenance_state)")]
+        if "rolled_up_to_id" not in columns:
+            self.conn.execute("ALTER TABLE maintenance_state ADD COLUMN rolled_up_to_id INTEGER")
+
+    def _write(self, sql, params, *extra):
+        # extra — дополнительные пары (sql, params), которые пишутся вместе с основной строкой
+        statements = ((sql, params),) + extra
+        if not self.write_behind or self.closed:
+            self.acquire()
+            try:
+                start = time.perf_counter()
+                self.ensure_schema()
+                for stmt_sql, stmt_params in statements:
+                    self.conn.execute(stmt_sql, stmt_params)
+                self.conn.commit()
+                self.rows_written += 1
+                self.write_time.add((time.perf_counter() - start) * 1000.0)
+            finally:
+                self.lock.release()
+            return
+
+        try:
+            self.pending.put_nowait(statements)
+        except queue.Full:
+            self.rows_dropped += 1
+            return
+        if self.closed:
+            # Логгер закрылся, пока мы клали строку — дописываем сами
+            self.flush()
+        elif self.pending.qsize() >= self.flush_batch_size:
+            self.wake.set()
+
+    def flush_loop(self):
+        # Поток не должен умирать: любая ошибка сброса — пауза и повтор, строки остаются в retry_batch.
+        # После закрытия — последний сброс здесь же, а не в потоке, который вызвал shutdown()
+        while not self.closed:
+            if self.consecutive_failures:
+                self.closing.wait(min(MAX_FLUSH_BACKOFF_S, self.flush_interval * 2 ** self.consecutive_failures))
+            else:
+                self.wake.wait(self.flush_interval)
+            self.wake.clear()
+            self.flush_safe()
+        self.flush_safe()
+
+    def flush_safe(self):
+        try:
+            self.flush()
+        except Exception as e:
+            self.flush_failures += 1
+            self.consecutive_failures += 1
+            print(f"[!] Database flush error: {e}")
+
+    def flush(self):
+        # Забираем всё накопленное и пишем одной транзакцией
+        with self.flush_lock:
+            batch, self.retry_batch = self.retry_batch, []
+            while True:
+                try:
+                    batch.append(self.pending.get_nowait())
+                except queue.Empty:
+                    break
+            if not batch:
+                self.consecutive_failures = 0
+                return 0
+
+            grouped = {}
+            for statements in batch:
+                for sql, params in statements:
+                    grouped.setdefault(sql, []).append(params)
+
+            self.acquire()
+            try:
+                start = time.perf_counter()
+                self.ensure_schema()
+                with self.conn:
+                    for sql, rows in grouped.items():
+                        self.conn.executemany(sql, rows)
+                self.last_flush_ms = (time.perf_counter() - start) * 1000.0
+                self.write_time.add(self.last_flush_ms)
+            except sqlite3.Error as e:
+                # Транзакция откатилась целиком — возвращаем порцию, лишнее сверх размера очереди отбрасываем
+                overflow = max(0, len(batch) - self.max_queue_size)
+                self.retry_batch = batch[overflow:]
+                self.rows_dropped += overflow
+                self.flush_failures += 1
+                self.consecutive_failures += 1
+                print(f"[!] Database flush failed ({e}), {len(self.retry_batch)} rows kept for retry")
+                return 0
+            finally:
+                self.lock.release()
+            self.consecutive_failures = 0
+            self.rows_written += len(batch)
+            self.batches_written += 1
+            return len(batch)
+
+    def shutdown(self):
+        # Хук завершения: фоновый поток дописывает очередь сам, ждём его не дольше SHUTDOWN_FLUSH_TIMEOUT_S.
+        # Вызывающий (поток GUI) в SQLite не ждёт: если база занята, строки теряются, а не вешают выход
+        if self.closed:
+            return
+        self.closed = True
+        self.forget()
+        self.closing.set()
+        self.wake.set()
+        if self.flusher is None or self.flusher is threading.current_thread():
+            return
+        self.flusher.join(timeout=SHUTDOWN_FLUSH_TIMEOUT_S)
+        if self.flusher.is_alive():
+            # Поток дописывает дальше сам, пока жив процесс (база занята другим соединением)
+            print(f"[!] Database logger: flush still waiting for the database after {SHUTDOWN_FLUSH_TIMEOUT_S:.0f} s, "
+                  f"left to finish in the background")
+            return
+        unwritten = self.pending.qsize() + len(self.retry_batch)
+        if unwritten:
+            print(f"[!] Database logger closed with {unwritten} unwritten rows")
+            self.rows_dropped += unwritten
+            self.retry_batch = []
+
+    def forget(self):
+        # Закрытый логгер больше не отдаётся get_logger() и не держится списками процесса
+        if self in DatabaseLogger._instances:
+            DatabaseLogger._instances.remove(self)
+        with _registry_lock:
+            key = os.path.abspath(self.db_path)
+            if _registry.get(key) is self:
+                del _registry[key]
+        if self.write_behind:
+            atexit.unregister(self.shutdown)
+
+    @classmethod
+    def shutdown_all(cls):
+        for logger in list(cls._instances):
+            logger.shutdown()
+
+    def get_stats(self):
+        return {
+            "queue_depth": self.pending.qsize(),
+            "rows_written": self.rows_written,
+            "rows_dropped": self.rows_dropped,
+            "batches_written": self.batches_written,
+            "flush_failures": self.flush_failures,
+            "retry_rows": len(self.retry_batch),
+            "last_flush_ms": self.last_flush_ms,
+            "init_ms": self.init_ms,
+            "schema_ms": self.schema_ms,
+            "lock_wait": self.lock_wait.snapshot(),
+            "write_time": self.write_time.snapshot(),
+        }
+
     def log_function_state(self, function_name, state):
-        cursor = self.conn.cursor()
-        cursor.execute(
-            'INSERT INTO function_states (function_name, state, timestamp) VALUES (?, ?, ?)',
-            (function_name, state, datetime.now().isoformat())
+        stamp, ts = now_stamp()
+        self._write(
+            'INSERT INTO function_states (function_name, state, timestamp, ts) VALUES (?, ?, ?, ?)',
+            (function_name, state, stamp, ts),
+            ('''INSERT INTO function_current_state (function_name, state, ts) VALUES (?, ?, ?)
+               ON CONFLICT(function_name) DO UPDATE SET state = excluded.state, ts = excluded.ts
+               WHERE excluded.ts >= function_current_state.ts''',
+             (function_name, state, ts))
         )
-        self.conn.commit()
 
     def log_system_event(self, event):
-        cursor = self.conn.cursor()
-        cursor.execute(
-            'INSERT INTO system_sessions (event, timestamp) VALUES (?, ?)',
-            (event, datetime.now().isoformat())
+        stamp, ts = now_stamp()
+        self._write(
+            'INSERT INTO system_sessions (event, timestamp, ts) VALUES (?, ?, ?)',
+            (event, stamp, ts)
         )
-        self.conn.commit()
 
     def log_mirror_alert(self, side):
-        cursor = self.conn.cursor()
-        cursor.execute(
-            'INSERT INTO mirror_alerts (side, timestamp) VALUES (?, ?)',
-            (side, datetime.now().isoformat())
+        stamp, ts = now_stamp()
+        self._write(
+            'INSERT INTO mirror_alerts (side, timestamp, ts) VALUES (?, ?, ?)',
+            (side, stamp, ts)
         )
-        self.conn.commit()
 
     def log_emergency_brake(self, speed_kmh, distance_m):
-        with self.lock:
-            cursor = self.conn.cursor()
-            cursor.execute(
-                'INSERT INTO emergency_brakes (timestamp, speed_kmh, distance_m) VALUES (?, ?, ?)',
-                (datetime.now().isoformat(), speed_kmh, distance_m)
-            )
-            self.conn.commit()
+        stamp, ts = now_stamp()
+        self._write(
+            'INSERT INTO emergency_brakes (timestamp, speed_kmh, distance_m, ts) VALUES (?, ?, ?, ?)',
+            (stamp, speed_kmh, distance_m, ts)
+        )
 
     def log_cruise_control(self, action, speed_kmh):
-        with self.lock:
-            cursor = self.conn.cursor()
-            cursor.execute(
-                'INSERT INTO cruise_control (action, timestamp, speed_kmh) VALUES (?, ?, ?)',
-                (action, datetime.now().isoformat(), speed_kmh)
-            )
-            self.conn.commit()
+        stamp, ts = now_stamp()
+        self._write(
+            'INSERT INTO cruise_control (action, timestamp, speed_kmh, ts) VALUES (?, ?, ?, ?)',
+            (action, stamp, speed_kmh, ts)
+        )
 
     def log_smart_parking(self, action, side=None):
-        with self.lock:
-            cursor = self.conn.cursor()
-            cursor.execute(
-                'INSERT INTO smart_parking (action, timestamp, side) VALUES (?, ?, ?)',
-                (action, datetime.now().isoformat(), side)
-            )
-            self.conn.commit()
+        stamp, ts = now_stamp()
+        self._write(
+            'INSERT INTO smart_parking (action, timestamp, side, ts) VALUES (?, ?, ?, ?)',
+            (action, stamp, side, ts)
+        )
 
     def log_emergency_call(self, speed_before, speed_after, speed_drop,
                         yaw_before, yaw_after, yaw_change,
                         duration_sec, location, call_made):
-        with self.lock:
-            cursor = self.conn.cursor()
-            cursor.execute(
-                '''INSERT INTO emergency_calls (
-                    timestamp, speed_before, speed_after, speed_drop,
-                    yaw_before, yaw_after, yaw_change,
-                    duration_sec, location_x, location_y, location_z, call_made
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
-                (
-                    datetime.now().isoformat(),
-                    speed_before, speed_after, speed_drop,
-                    yaw_before, yaw_after, yaw_change,
-                    duration_sec,
-                    location.x, location.y, location.z,
-                    1 if call_made else 0
-                )
+        stamp, ts = now_stamp()
+        self._write(
+            '''INSERT INTO emergency_calls (
+                timestamp, speed_before, speed_after, speed_drop,
+                yaw_before, yaw_after, yaw_change,
+                duration_sec, location_x, location_y, location_z, call_made, ts
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+            (
+                stamp,
+                speed_before, speed_after, speed_drop,
+                yaw_before, yaw_after, yaw_change,
+                duration_sec,
+                location.x, location.y, location.z,
+                1 if call_made else 0,
+                ts
             )
-            self.conn.commit()
+        )
 
     def log_fatigue_warning(self, reason, category):
-        with self.lock:
-            cursor = self.conn.cursor()
-            cursor.execute(
-                'INSERT INTO fatigue_warnings (timestamp, reason, category) VALUES (?, ?, ?)',
-                (datetime.now().isoformat(), reason, category)
-            )
-            self.conn.commit()
+        stamp, ts = now_stamp()
+        self._write(
+            'INSERT INTO fatigue_warnings (timestamp, reason, category, ts) VALUES (?, ?, ?, ?)',
+            (stamp, reason, category, ts)
+        )
 
 
     def get_last_states(self):
-        cursor = self.conn.cursor()
-        cursor.execute('''
-            SELECT function_name, state FROM (
-                SELECT function_name, state, MAX(timestamp) as max_time
-                FROM function_states
-                GROUP BY function_name
-            )
-        ''')
-        return {row[0]: row[1] for row in cursor.fetchall()}
+        # Сначала дописываем очередь, чтобы прочитать свои же последние записи
+        self.flush()
+        self.acquire()
+        try:
+            self.ensure_schema()
+            cursor = self.conn.cursor()
+            # O(число функций): читаем таблицу текущих состояний, а не всю историю
+            cursor.execute('SELECT function_name, state FROM function_current_state')
+            return {row[0]: row[1] for row in cursor.fetchall()}
+        finally:
+            self.lock.release()
+
+
+# === Общий логгер процесса ===
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def now_stamp():
+    # ISO-строка для старой колонки timestamp и микросекунды эпохи для ts
+    now = datetime.now()
+    return now.isoformat(), int(now.timestamp() * 1000000)
+
+
+def get_logger(db_path=DEFAULT_DB_PATH, **kwargs):
+    # Один DatabaseLogger (одно соединение, одна инициализация схемы) на файл базы
+    key = os.path.abspath(db_path)
+    with _registry_lock:
+        logger = _registry.get(key)
+        if logger is None or logger.closed:
+            logger = DatabaseLogger(key, **kwargs)
+            _registry[key] = logger
+        return logger
+
+
+# === Межпроцессная запись через локальный сокет ===
+class DatabaseSinkServer:
+    # Принимает строки JSON {"method": "log_...", "args": [...]} и пишет их через логгер панели
+    def __init__(self, logger, address=DB_SINK_ADDRESS):
+        self.logger = logger
+        self.address = address
+        self.sock = None
+        self.running = False
+        self.rows_received = 0
+
+    def start(self):
+        # Порт должен принадлежать только панели: на Windows SO_REUSEADDR разрешает второму процессу
+        # занять тот же адрес и перехватить строки, поэтому там — SO_EXCLUSIVEADDRUSE. На POSIX
+        # SO_REUSEADDR второго слушателя не пускает и лишь позволяет перезапуск при TIME_WAIT
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        try:
+            if hasattr(socket, "SO_EXCLUSIVEADDRUSE"):
+                self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_EXCLUSIVEADDRUSE, 1)
+            else:
+                self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            self.sock.bind(self.address)
+            self.sock.listen()
+            self.address = self.sock.getsockname()
+        except OSError as e:
+            self.sock.close()
+            self.sock = None
+            # Подпроцессы подключились бы к чужому процессу на этом порту — продолжать нельзя
+            raise RuntimeError(f"Database sink port {self.address[0]}:{self.address[1]} is unavailable "
+                               f"(another RAAS panel or process is using it): {e}") from e
+        self.running = True
+        threading.Thread(target=self.accept_loop, daemon=True).start()
+        print(f"[*] Database sink listening on {self.address[0]}:{self.address[1]}")
+        return True
+
+    def accept_loop(self):
+        while self.running:
+            try:
+                conn, _ = self.sock.accept()
+            except OSError:
+                break
+            threading.Thread(target=self.client_loop, args=(conn,), daemon=True).start()
+
+    def client_loop(self, conn):
+        with conn, conn.makefile("r", encoding="utf-8") as stream:
+            for line in stream:
+                try:
+                    msg = json.loads(line)
+                    method = msg["method"]
+                    if not method.startswith("log_"):
+                        continue
+                    getattr(self.logger, method)(*msg.get("args", []), **msg.get("kwargs", {}))
+                    self.rows_received += 1
+                except Exception as e:
+                    print(f"[!] Database sink: bad message: {e}")
+
+    def stop(self):
+        self.running = False
+        if self.sock:
+            self.sock.close()
+            self.sock = None
+
+
+class RemoteDatabaseLogger:
+    # Клиент для подпроцессов: те же log_* методы, но строки уходят в панель через сокет
+    def __init__(self, address=DB_SINK_ADDRESS):
+        self.address = address
+        self.lock = threading.Lock()
+        self.sock = socket.create_connection(address, timeout=1.0)
+        self.fallback = None
+
+    def send(self, method, *args, **kwargs):
+        line = (json.dumps({"method": method, "args": args, "kwargs": kwargs}) + "\n").encode("utf-8")
+        with self.lock:
+            if self.fallback is None:
+                try:
+                    self.sock.sendall(line)
+                    return
+                except OSError as e:
+                    print(f"[!] Database sink unavailable ({e}), writing directly.")
+                    self.fallback = DatabaseLogger(write_behind=False)
+        getattr(self.fallback, method)(*args, **kwargs)
+
+    def __getattr__(self, name):
+        if name.startswith("log_"):
+            return lambda *args, **kwargs: self.send(name, *args, **kwargs)
+        raise AttributeError(name)
+
+    def shutdown(self):
+        with self.lock:
+            self.sock.close()
+
+
+def connect_logger(address=DB_SINK_ADDRESS):
+    # Подпроцесс: пишем через панель, а если её сокета нет — напрямую в файл
+    try:
+        return RemoteDatabaseLogger(address)
+    except OSError:
+        print("[!] Database sink not found, writing to the database directly.")
+        return DatabaseLogger(write_behind=False)
+
+
+if __name__ == "__main__":
+    # Ручная миграция существующей базы: python database_logger.py [путь к system_data.db]
+    import sys
+    path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_DB_PATH
+    logger = DatabaseLogger(path, write_behind=False)
+    print(f"[+] {path}: {len(logger.get_last_states())} function states, schema v{SCHEMA_VERSION}")
@@ -0,0 +1,288 @@
+import os
+import sqlite3
+import time
+import threading
+from datetime import datetime, timezone
+from database_logger import EVENT_TABLES, DEFAULT_DB_PATH, DB_BUSY_TIMEOUT_MS
+
+HOUR_US = 3600 * 1000000
+DAY_US = 24 * HOUR_US
+
+# Сколько дней хранить сырые строки в основной базе (None — не переносить)
+DEFAULT_TTL_DAYS = {
+    "function_states": 30,
+    "system_sessions": 180,
+    "mirror_alerts": 30,
+    "emergency_brakes": 365,
+    "cruise_control": 90,
+    "smart_parking": 180,
+    "emergency_calls": None,   # отчёты о ДТП храним целиком
+    "fatigue_warnings": 90,
+}
+
+# Числовая колонка для min/max/sum в агрегатах
+ROLLUP_VALUE_COLUMNS = {
+    "emergency_brakes": "speed_kmh",
+    "cruise_control": "speed_kmh",
+    "emergency_calls": "speed_before",
+}
+
+
+class DatabaseMaintenance:
+    # Фоновое обслуживание system_data.db: агрегаты, перенос старых строк в помесячные архивы, incremental VACUUM
+    def __init__(self, logger, ttl_days=None, interval_sec=3600, first_run_delay_sec=60,
+                 archive_dir=None, chunk_rows=5000, vacuum_pages=2000):
+        self.logger = logger
+        self.db_path = logger.db_path
+        self.ttl_days = dict(DEFAULT_TTL_DAYS, **(ttl_days or {}))
+        self.interval = interval_sec
+        self.first_run_delay = first_run_delay_sec
+        self.archive_dir = archive_dir or os.path.join(os.path.dirname(os.path.abspath(self.db_path)), "archive")
+        self.chunk_rows = chunk_rows
+        self.vacuum_pages = vacuum_pages
+
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.last_report = {}
+        self.vacuum_hint_shown = False
+
+    def start(self):
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.loop, daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=5.0):
+        # Ждём конца текущей порции архивации: цикл проверяет stop_event между порциями
+        self.stop_event.set()
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout=timeout)
+            if self.thread.is_alive():
+                print("[!] Database maintenance did not stop in time")
+        self.thread = None
+
+    def loop(self):
+        if self.stop_event.wait(self.first_run_delay):
+            return
+        while not self.stop_event.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"[!] Database maintenance failed: {e}")
+            if self.stop_event.wait(self.interval):
+                return
+
+    def connect(self):
+        # Отдельное соединение: WAL позволяет панели писать параллельно, длинных блокировок не держим
+        conn = sqlite3.connect(self.db_path, timeout=DB_BUSY_TIMEOUT_MS / 1000.0, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def run_once(self, now_ts=None):
+        # Схема должна быть актуальной (ts, rollup-таблицы)
+        self.logger.acquire()
+        try:
+            self.logger.ensure_schema()
+        finally:
+            self.logger.lock.release()
+
+        now_ts = now_ts if now_ts is not None else int(time.time() * 1000000)
+        start = time.perf_counter()
+        report = {"rolled_up": 0, "archived": 0, "vacuumed_pages": 0}
+
+        conn = self.connect()
+        try:
+            for table in EVENT_TABLES:
+                report["rolled_up"] += self.rollup(conn, table, now_ts)
+            for table in EVENT_TABLES:
+                report["archived"] += self.archive(conn, table, now_ts)
+            report["vacuumed_pages"] = self.incremental_vacuum(conn)
+        finally:
+            conn.close()
+
+        report["duration_ms"] = (time.perf_counter() - start) * 1000.0
+        self.last_report = report
+        print(f"[*] Database maintenance: rolled up {report['rolled_up']}, archived {report['archived']}, "
+              f"freed {report['vacuumed_pages']} pages in {report['duration_ms']:.0f} ms")
+        return report
+
+    # === Агрегаты по часам и суткам ===
+    def rollup(self, conn, table, now_ts):
+        # Сворачиваем строки, вставленные после прошлой отметки. Отметка — id, а не ts: отложенная запись
+        # (очередь логгера, повтор после "database is locked") вставляет строки с ts в прошлом, и отметка
+        # по времени пропустила бы их навсегда. Незавершённый час тоже сворачивается — агрегаты суммируются
+        row = conn.execute("SELECT rolled_up_to_ts, rolled_up_to_id FROM maintenance_state WHERE table_name = ?",
+                           (table,)).fetchone()
+        until_id = conn.execute(f"SELECT MAX(id) FROM {table}").fetchone()[0]
+        if until_id is None:
+            return 0
+        if row is None:
+            where, since = "id <= ?", ()
+        elif row[1] is None:
+            # База с отметкой по времени (схема v2): всё, что от неё и позже, ещё не свёрнуто
+            where, since = "ts >= ? AND id <= ?", (row[0],)
+        elif row[1] >= until_id:
+            return 0
+        else:
+            where, since = "id > ? AND id <= ?", (row[1],)
+        params = since + (until_id,)
+
+        key_col = EVENT_TABLES[table]
+        key_expr = f"COALESCE({key_col}, '')" if key_col else "''"
+        value_col = ROLLUP_VALUE_COLUMNS.get(table)
+        value_expr = value_col if value_col else "NULL"
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(f'''
+                SELECT COUNT(*) FROM {table} WHERE {where}
+            ''', params).fetchone()[0]
+
+            for period, size in (("hourly", HOUR_US), ("daily", DAY_US)):
+                conn.execute(f'''
+                    INSERT INTO rollup_{period} (table_name, bucket_ts, key, count, min_value, max_value, sum_value)
+                    SELECT ?, (ts / {size}) * {size} AS bucket, {key_expr} AS k,
+                           COUNT(*), MIN({value_expr}), MAX({value_expr}), SUM({value_expr})
+                    FROM {table}
+                    WHERE {where}
+                    GROUP BY bucket, k
+                    ON CONFLICT(table_name, bucket_ts, key) DO UPDATE SET
+                        count = count + excluded.count,
+                        min_value = MIN(COALESCE(min_value, excluded.min_value), COALESCE(excluded.min_value, min_value)),
+                        max_value = MAX(COALESCE(max_value, excluded.max_value), COALESCE(excluded.max_value, max_value)),
+                        sum_value = COALESCE(sum_value, 0) + COALESCE(excluded.sum_value, 0)
+                ''', (table,) + params)
+
+            conn.execute('''
+                INSERT INTO maintenance_state (table_name, rolled_up_to_ts, rolled_up_to_id) VALUES (?, ?, ?)
+                ON CONFLICT(table_name) DO UPDATE SET
+                    rolled_up_to_ts = excluded.rolled_up_to_ts,
+                    rolled_up_to_id = excluded.rolled_up_to_id
+            ''', (table, now_ts, until_id))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return rows
+
+    # === Перенос старых строк в помесячные архивы ===
+    def archive_path(self, month_start):
+        return os.path.join(self.archive_dir, f"system_data_{month_start.strftime('%Y_%m')}.db")
+
+    def archive(self, conn, table, now_ts):
+        ttl = self.ttl_days.get(table)
+        if ttl is None:
+            return 0
+
+        # Не трогаем то, что ещё не попало в агрегаты (id после отметки свёртки)
+        row = conn.execute("SELECT rolled_up_to_id FROM maintenance_state WHERE table_name = ?", (table,)).fetchone()
+        if row is None or row[0] is None:
+            return 0
+        cutoff, max_id = now_ts - ttl * DAY_US, row[0]
+
+        moved = 0
+        while not self.stop_event.is_set():
+            oldest = conn.execute(f"SELECT MIN(ts) FROM {table} WHERE ts < ? AND id <= ?",
+                                  (cutoff, max_id)).fetchone()[0]
+            if oldest is None:
+                break
+
+            month_start = datetime.fromtimestamp(oldest / 1000000, tz=timezone.utc).replace(
+                day=1, hour=0, minute=0, second=0, microsecond=0)
+            if month_start.month == 12:
+                next_month = month_start.replace(year=month_start.year + 1, month=1)
+            else:
+                next_month = month_start.replace(month=month_start.month + 1)
+            month_end_ts = min(int(next_month.timestamp() * 1000000), cutoff)
+
+            os.makedirs(self.archive_dir, exist_ok=True)
+            conn.execute("ATTACH DATABASE ? AS archive", (self.archive_path(month_start),))
+            try:
+                conn.execute(f"CREATE TABLE IF NOT EXISTS archive.{table} AS SELECT * FROM main.{table} WHERE 0")
+                self.ensure_archive_index(conn, table)
+                # Маленькими порциями, чтобы не держать блокировку записи надолго
+                while not self.stop_event.is_set():
+                    chunk = f"SELECT id FROM main.{table} WHERE ts < ? AND id <= ? ORDER BY ts LIMIT ?"
+                    conn.execute("BEGIN IMMEDIATE")
+                    try:
+                        # В WAL транзакция через ATTACH не атомарна между файлами: если упасть между
+                        # их фиксациями, порция останется и в основной базе, и в архиве. Повтор её
+                        # не задвоит — id в архиве уникален
+                        conn.execute(f"INSERT OR IGNORE INTO archive.{table} "
+                                     f"SELECT * FROM main.{table} WHERE id IN ({chunk})",
+                                     (month_end_ts, max_id, self.chunk_rows))
+                        count = conn.execute(f"DELETE FROM main.{table} WHERE id IN ({chunk})",
+                                             (month_end_ts, max_id, self.chunk_rows)).rowcount
+                        conn.execute("COMMIT")
+                    except Exception:
+                        conn.execute("ROLLBACK")
+                        raise
+                    moved += count
+                    if count < self.chunk_rows:
+                        break
+            finally:
+                conn.execute("DETACH DATABASE archive")
+        return moved
+
+    def ensure_archive_index(self, conn, table):
+        # Уникальный id в архиве; в архивах прежних версий сначала убираем уже задвоенные строки
+        name = f"ux_{table}_id"
+        if conn.execute("SELECT 1 FROM archive.sqlite_master WHERE type = 'index' AND name = ?", (name,)).fetchone():
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(f"DELETE FROM archive.{table} WHERE rowid NOT IN "
+                         f"(SELECT MIN(rowid) FROM archive.{table} GROUP BY id)")
+            conn.execute(f"CREATE UNIQUE INDEX archive.{name} ON {table} (id)")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    # === Освобождение места ===
+    def incremental_vacuum(self, conn):
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            # Режим INCREMENTAL включается только без работающих модулей (enable_incremental_vacuum):
+            # полный VACUUM держит монопольную блокировку, запись панели встала бы на всё это время
+            if not self.vacuum_hint_shown:
+                print(f"[!] {self.db_path}: incremental auto_vacuum is off, "
+                      f"run 'python database_maintenance.py' with RAAS stopped")
+                self.vacuum_hint_shown = True
+            return 0
+
+        free_before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        conn.execute(f"PRAGMA incremental_vacuum({self.vacuum_pages})").fetchall()
+        free_after = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        return free_before - free_after
+
+
+def enable_incremental_vacuum(db_path=DEFAULT_DB_PATH, max_bytes=None):
+    # Один раз переводит базу в auto_vacuum=INCREMENTAL. Нужен полный VACUUM под монопольной
+    # блокировкой, поэтому запускается отдельным шагом, пока RAAS не работает (start_raas.bat,
+    # python database_maintenance.py [путь]); базы больше max_bytes пропускаются
+    conn = sqlite3.connect(db_path, timeout=1.0, isolation_level=None)
+    try:
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+            return True
+        size = os.path.getsize(db_path)
+        if max_bytes is not None and size > max_bytes:
+            print(f"[!] {db_path} is {size / 1e6:.0f} MB: incremental auto_vacuum not enabled")
+            return False
+        print(f"[*] Enabling incremental auto_vacuum on {db_path} (one-time full VACUUM, {size / 1e6:.1f} MB)...")
+        start = time.perf_counter()
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+        print(f"[+] Incremental auto_vacuum enabled in {(time.perf_counter() - start) * 1000.0:.0f} ms")
+        return True
+    except sqlite3.OperationalError as e:
+        # База занята другим процессом RAAS — попробуем при следующем запуске
+        print(f"[!] Incremental auto_vacuum not enabled: {e}")
+        return False
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    # Перевод базы в incremental auto_vacuum: python database_maintenance.py [путь]
+    import sys
+    path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_DB_PATH
+    enable_incremental_vacuum(path)
@@ -1,18 +1,22 @@
 import carla
 import time
 import sys
-from database_logger import DatabaseLogger
+from database_logger import get_logger
 
 class DriverFatigueMonitor:
-    def __init__(self, vehicle, window=None):
+    def __init__(self, vehicle, window=None, clock=time.time, notify=None):
 
-        self.db = DatabaseLogger()
+        self.db = get_logger()
 
         self.vehicle = vehicle
         self.window = window  # GUI окно для вывода предупреждений
+        # clock — источник «сейчас» (под TickScheduler — время симуляции);
+        # notify(message) — вывод предупреждения из чужого потока вместо прямого вызова окна
+        self.clock = clock
+        self.notify = notify
 
-        self.trip_start_time = time.time()
-        self.last_driver_input_time = time.time()
+        self.trip_start_time = self.clock()
+        self.last_driver_input_time = self.clock()
         self.last_steer = 0.0
 
         self.rapid_steering_events = 0
@@ -26,7 +30,7 @@ class DriverFatigueMonitor:
         self.max_rapid_steering = 200
 
     def update_driver_input(self, throttle, brake, steer, lane_keeping_enabled, cruise_enabled):
-        now = time.time()
+        now = self.clock()
 
         if throttle > 0 or brake > 0 or abs(steer) > 0.05:
             self.last_driver_input_time = now
@@ -71,14 +75,16 @@ class DriverFatigueMonitor:
 
     def _warn(self, message, category):
         self.db.log_fatigue_warning(message, category)
-        if self.window:
+        if self.notify:
+            self.notify(message)
+        elif self.window:
             self.window.show_fatigue_warning(message)
         else:
             print("[!] Усталость: " + message)
 
     def reset(self):
-        self.trip_start_time = time.time()
-        self.last_driver_input_time = time.time()
+        self.trip_start_time = self.clock()
+        self.last_driver_input_time = self.clock()
         self.last_steer = 0.0
         self.rapid_steering_events = 0
         self.lane_departure_count = 0
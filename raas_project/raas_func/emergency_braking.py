@@ -1,19 +1,83 @@
 import carla
 import math
 import time
+import queue
 import threading
-from database_logger import DatabaseLogger
+from database_logger import get_logger
+from lidar_obstacle import lidar_points, find_closest_obstacle
+from perf_stats import LatencyStats
+from tick_scheduler import ControlThread
+
+SWEEP_PERIOD_MS = 1000.0 / 20  # rotation_frequency лидара = 20 Гц
+TICK_SWEEP_WAIT_SEC = 0.01     # под планировщиком: сколько поток AEB ждёт свип текущего тика
+
+
+class SweepMailbox:
+    # Ячейка на один свип: новый свип вытесняет необработанный, очереди нет
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.item = None
+        self.dropped = 0
+        self.closed = False
+
+    def publish(self, item):
+        with self.cond:
+            if self.item is not None:
+                self.dropped += 1
+            self.item = item
+            self.cond.notify()
+
+    def take(self, timeout=None):
+        with self.cond:
+            if self.item is None and not self.closed:
+                self.cond.wait(timeout)
+            item, self.item = self.item, None
+            return item
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.item = None
+            self.cond.notify_all()
+
+    def reopen(self):
+        with self.cond:
+            self.closed = False
+            self.item = None
+
 
 class AutoBrakingSystem:
-    def __init__(self, world, vehicle, panel=None):
+    def __init__(self, world, vehicle, panel=None, telemetry=None):
         self.vehicle = vehicle
         self.world = world
+        self.panel = panel
+        self.telemetry = telemetry    # VehicleTelemetry: скорость за последний тик вместо get_velocity() на свип
         self.lidar_sensor = None
         self.braking = False
-        self.db = DatabaseLogger()
+        self.db = get_logger()
         self.stop_time = None
         self.running = False
 
+        # Свипы из колбэка сенсора -> поток принятия решений
+        self.mailbox = SweepMailbox()
+        self.decision_thread = None
+        self.control_thread = None    # ControlThread на тиках общего планировщика
+
+        # Логирование и запись видео -> отдельный поток, чтобы не задерживать торможение
+        self.events = queue.Queue(maxsize=64)
+        self.events_thread = None
+        self.events_stop = threading.Event()
+        self.events_dropped = 0
+
+        # Счётчики задержек по этапам (мс)
+        self.stats = {
+            "queue_wait": LatencyStats("sensor -> worker", SWEEP_PERIOD_MS),
+            "detection": LatencyStats("detection", SWEEP_PERIOD_MS),
+            "decision": LatencyStats("speed + decision", SWEEP_PERIOD_MS),
+            "sensor_to_decision": LatencyStats("sensor -> decision", SWEEP_PERIOD_MS),
+            "sensor_to_brake": LatencyStats("sensor -> brake", SWEEP_PERIOD_MS),
+        }
+
     def apply_emergency_brake(self):
         control = carla.VehicleControl()
         control.throttle = 0.0
@@ -26,25 +90,52 @@ class AutoBrakingSystem:
         self.vehicle.apply_control(control)
 
     def get_speed(self):
+        record = self.telemetry.read("aeb") if self.telemetry is not None else None
+        if record is not None:
+            return record.speed_kmh
         v = self.vehicle.get_velocity()
         return math.sqrt(v.x**2 + v.y**2 + v.z**2) * 3.6
 
     def lidar_callback(self, data):
+        # Поток сенсора CARLA: только кладём свежий свип в ячейку
+        if not self.running:
+            return
+        self.mailbox.publish((data, time.perf_counter()))
+
+    def decision_loop(self):
+        while self.running:
+            item = self.mailbox.take(timeout=0.5)
+            if item is not None:
+                self.handle_sweep(item)
+
+    def on_tick(self, tick):
+        # Под TickScheduler, в своём ControlThread: таймер отпускания тормоза идёт по времени симуляции.
+        # Свип приходит из потока сенсора сразу после тика — ждём недолго; ждёт только поток AEB,
+        # планировщик его лишь будит и идёт к следующим модулям и следующему world.tick()
         if not self.running:
             return
+        item = self.mailbox.take(timeout=TICK_SWEEP_WAIT_SEC)
+        if item is not None:
+            self.handle_sweep(item, tick.sim_time)
 
-        min_distance = float('inf')
-        obstacle_detected = False
+    def handle_sweep(self, item, now=None):
+        data, arrived = item
+        picked = time.perf_counter()
+        self.stats["queue_wait"].add((picked - arrived) * 1000.0)
 
-        for point in data:
-            x, y, z = point.point.x, point.point.y, point.point.z
-            distance = math.sqrt(x ** 2 + y ** 2 + z ** 2)
+        obstacle_detected, min_distance = find_closest_obstacle(lidar_points(data))
+        detected = time.perf_counter()
+        self.stats["detection"].add((detected - picked) * 1000.0)
 
-            if x > 0.5 and abs(y) < 2.0 and -0.5 < z < 2.0:
-                obstacle_detected = True
-                if distance < min_distance:
-                    min_distance = distance
+        self.process_sweep(obstacle_detected, min_distance, arrived, now)
+        decided = time.perf_counter()
+        self.stats["decision"].add((decided - detected) * 1000.0)
+        self.stats["sensor_to_decision"].add((decided - arrived) * 1000.0)
 
+    def process_sweep(self, obstacle_detected, min_distance, arrived, now=None):
+        # now — время симуляции от планировщика; без него (свой поток) — настенные часы
+        if now is None:
+            now = time.time()
         speed = self.get_speed()
 
         if speed <= 60:
@@ -53,32 +144,69 @@ class AutoBrakingSystem:
             if obstacle_detected and min_distance <= critical_distance and not self.braking:
                 self.braking = True
                 self.stop_time = None
-                print(f"[!] Obstacle detected at {min_distance:.2f}m | Speed: {speed:.1f} km/h | BRAKING!")
                 self.apply_emergency_brake()
-                self.db.log_emergency_brake(speed_kmh=speed, distance_m=min_distance)
-
-                # === ЗАПУСК ЗАПИСИ ===
-                if hasattr(self, "panel") and hasattr(self.panel, "modules"):
-                    mod = self.panel.modules.get("360 View", {})
-                    if mod.get("object") and hasattr(mod["object"], "recorder"):
-                        mod["object"].recorder.trigger_event_recording()
-                        print("[*] Video recording triggered due to emergency braking.")
+                self.stats["sensor_to_brake"].add((time.perf_counter() - arrived) * 1000.0)
+                self.post_event(("brake", speed, min_distance))
 
             elif self.braking and speed < 0.5:
                 if self.stop_time is None:
-                    self.stop_time = time.time()
-                elif time.time() - self.stop_time > 1.0:
-                    print("[*] Vehicle fully stopped. Releasing brake.")
+                    self.stop_time = now
+                elif now - self.stop_time > 1.0:
                     self.braking = False
                     self.release_brake()
+                    self.post_event(("released", "[*] Vehicle fully stopped. Releasing brake."))
 
         elif self.braking:
-            print("[*] Speed too high, emergency braking disengaged.")
             self.braking = False
             self.release_brake()
             self.stop_time = None
+            self.post_event(("released", "[*] Speed too high, emergency braking disengaged."))
+
+    def post_event(self, event):
+        try:
+            self.events.put_nowait(event)
+        except queue.Full:
+            self.events_dropped += 1
+
+    def events_loop(self, stop):
+        # stop — событие своего запуска: при переполненной очереди стоп-маркер может не влезть
+        while True:
+            try:
+                event = self.events.get(timeout=0.2)
+            except queue.Empty:
+                if stop.is_set():
+                    break
+                continue
+            if event is None:
+                break
+            if event[0] == "brake":
+                _, speed, min_distance = event
+                print(f"[!] Obstacle detected at {min_distance:.2f}m | Speed: {speed:.1f} km/h | BRAKING!")
+                self.db.log_emergency_brake(speed_kmh=speed, distance_m=min_distance)
 
-    def start(self):
+                # === ЗАПУСК ЗАПИСИ ===
+                if self.panel is not None and hasattr(self.panel, "modules"):
+                    mod = self.panel.modules.get("360 View", {})
+                    if mod.get("object") and hasattr(mod["object"], "recorder"):
+                        mod["object"].recorder.trigger_event_recording("emergency_brake")
+                        print("[*] Video recording triggered due to emergency braking.")
+            else:
+                print(event[1])
+
+    def get_stats(self):
+        stats = {name: s.snapshot() for name, s in self.stats.items()}
+        stats["sweeps_dropped"] = self.mailbox.dropped
+        stats["events_dropped"] = self.events_dropped
+        return stats
+
+    def print_stats(self):
+        for s in self.stats.values():
+            print(f"[*] AEB {s}")
+        print(f"[*] AEB sweeps dropped: {self.mailbox.dropped} | events dropped: {self.events_dropped}")
+
+    def start(self, scheduler=None):
+        # scheduler — общий TickScheduler панели: решения принимаются на его тиках в ControlThread,
+        # без него — в своём потоке по приходу свипа
         if self.running:
             return
         blueprint_library = self.world.get_blueprint_library()
@@ -87,16 +215,43 @@ class AutoBrakingSystem:
         lidar_bp.set_attribute('rotation_frequency', '20')
         lidar_bp.set_attribute('points_per_second', '300000')
 
+        self.running = True
+        self.mailbox.reopen()
+        if scheduler is not None:
+            self.control_thread = ControlThread("aeb", self.on_tick, scheduler, budget_ms=SWEEP_PERIOD_MS / 2)
+            self.control_thread.start()
+        else:
+            self.decision_thread = threading.Thread(target=self.decision_loop, daemon=True)
+            self.decision_thread.start()
+        self.events_stop = threading.Event()
+        self.events_thread = threading.Thread(target=self.events_loop, args=(self.events_stop,), daemon=True)
+        self.events_thread.start()
+
         transform = carla.Transform(carla.Location(x=2.5, z=1.2))
         self.lidar_sensor = self.world.spawn_actor(lidar_bp, transform, attach_to=self.vehicle)
         self.lidar_sensor.listen(self.lidar_callback)
-        self.running = True
         print("[*] Auto braking system enabled.")
 
     def stop(self):
         if self.lidar_sensor:
+            self.running = False
             self.lidar_sensor.stop()
             self.lidar_sensor.destroy()
+            self.lidar_sensor = None
+            self.mailbox.close()
+            if self.control_thread is not None:
+                self.control_thread.stop()
+                self.control_thread = None
+            if self.decision_thread:
+                self.decision_thread.join(timeout=1.0)
+                self.decision_thread = None
+            # Поток GUI не ждёт очередь событий: маркер — если есть место, иначе поток выйдет по events_stop
+            self.events_stop.set()
+            try:
+                self.events.put_nowait(None)
+            except queue.Full:
+                pass
             self.release_brake()
-            self.running = False
+            self.braking = False
+            self.print_stats()
             print("[*] Auto braking system disabled.")
@@ -1,15 +1,22 @@
 import carla
+import os
+import json
 import time
 import threading
+from datetime import datetime
 from PyQt5.QtWidgets import QLabel, QPushButton, QWidget, QVBoxLayout, QHBoxLayout
-from PyQt5.QtCore import QTimer, Qt
-from database_logger import DatabaseLogger
+from PyQt5.QtCore import QTimer, Qt, pyqtSignal
+from database_logger import get_logger
+from crash_detector import CrashDetector
 
 class EmergencyCallMonitor(QWidget):
-    def __init__(self, world, vehicle, multimedia_panel):
+    # Срабатывание детектора приходит из потока планировщика, окно вызова показывается в потоке GUI
+    accident = pyqtSignal(object, object)
+
+    def __init__(self, world, vehicle, multimedia_panel, telemetry=None):
         super().__init__()
 
-        self.db = DatabaseLogger()
+        self.db = get_logger()
         self.trigger_time = None  # Время срабатывания аварии
         self.trigger_info = {}    # Храним параметры
 
@@ -17,20 +24,21 @@ class EmergencyCallMonitor(QWidget):
         self.world = world
         self.vehicle = vehicle
         self.panel = multimedia_panel
+        self.telemetry = telemetry    # VehicleTelemetry: скорость и курс за последний тик без своих запросов
         self.monitor_active = True
         self.accident_detected = False
 
-        # Настройки порогов
-        self.speed_drop_threshold = 30.0  # резкое падение скорости (км/ч)
-        self.angle_change_threshold = 60.0  # резкое изменение курса (градусы)
-
-        self.last_speed = 0.0
-        self.last_yaw = vehicle.get_transform().rotation.yaw
+        # Признаки по окну скорости и курса на каждом тике; пороги — в crash_detector.py
+        self.detector = CrashDetector()
+        self.accident.connect(self.on_accident)
+        base_dir = os.path.dirname(os.path.abspath(__file__))
+        self.trace_dir = os.path.join(base_dir, "recordings")
 
-        # Таймер проверки состояния машины
+        # С телеметрией панель вызывает on_tick из планировщика тиков; без неё — опрос таймером, как раньше
         self.check_timer = QTimer()
         self.check_timer.timeout.connect(self.monitor_vehicle)
-        self.check_timer.start(200)  # каждые 0.2 секунды
+        if telemetry is None:
+            self.check_timer.start(200)  # каждые 0.2 секунды
 
         # Окно аварийного вызова
         self.init_emergency_window()
@@ -76,35 +84,56 @@ class EmergencyCallMonitor(QWidget):
         self.call_duration_timer.timeout.connect(self.update_call_timer)
         self.call_seconds = 0
 
-    def monitor_vehicle(self):
-        if not self.monitor_active:
+    def on_tick(self, tick):
+        # Модуль TickScheduler: один отсчёт детектора на тик симуляции
+        if not self.monitor_active or self.accident_detected:
             return
+        record = self.telemetry.read("emergency_call", calls=2)
+        if record is not None:
+            self.check(record.sim_time, record.speed_kmh, record.yaw, record.location)
 
+    def monitor_vehicle(self):
+        # Без телеметрии: опрос машины по таймеру GUI, время — настенное
+        if not self.monitor_active or self.accident_detected:
+            return
         velocity = self.vehicle.get_velocity()
         speed = (velocity.x**2 + velocity.y**2 + velocity.z**2)**0.5 * 3.6  # в км/ч
-        yaw = self.vehicle.get_transform().rotation.yaw
-
-        speed_drop = self.last_speed - speed
-        yaw_change = abs(self.last_yaw - yaw)
-
-        if (speed_drop > self.speed_drop_threshold or yaw_change > self.angle_change_threshold) and self.last_speed > 30:
-            if not self.accident_detected:
-                print("[!] Accident detected. Showing emergency call window.")
-                self.trigger_time = time.time()
-                self.trigger_info = {
-                    "speed_before": self.last_speed,
-                    "speed_after": speed,
-                    "speed_drop": self.last_speed - speed,
-                    "yaw_before": self.last_yaw,
-                    "yaw_after": yaw,
-                    "yaw_change": abs(self.last_yaw - yaw),
-                    "location": self.vehicle.get_location()
-                }
-                self.show_emergency_window()
-
-
-        self.last_speed = speed
-        self.last_yaw = yaw
+        transform = self.vehicle.get_transform()
+        self.check(time.time(), speed, transform.rotation.yaw, transform.location)
+
+    def check(self, t, speed, yaw, location):
+        event = self.detector.add(t, speed, yaw)
+        if event is not None:
+            self.accident.emit(event, location)
+
+    def on_accident(self, event, location):
+        if self.accident_detected:
+            return
+        print(f"[!] Accident detected ({event.reason}: -{event.speed_drop:.0f} km/h, {event.peak_decel:.0f} m/s^2, "
+              f"yaw {event.yaw_change:.0f} deg). Showing emergency call window.")
+        self.trigger_time = time.time()
+        self.trigger_info = {
+            "speed_before": event.speed_before,
+            "speed_after": event.speed_after,
+            "speed_drop": event.speed_drop,
+            "yaw_before": event.yaw_before,
+            "yaw_after": event.yaw_after,
+            "yaw_change": event.yaw_change,
+            "location": location
+        }
+        self.save_trace(event)
+        self.show_emergency_window()
+
+    def save_trace(self, event):
+        # Скорость и курс за секунды до срабатывания — для разбора и для benchmarks/bench_crash_detector.py
+        try:
+            os.makedirs(self.trace_dir, exist_ok=True)
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            path = os.path.join(self.trace_dir, f"{timestamp}_crash_trace.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"reason": event.reason, "sim_time": event.sim_time, **event.trace}, f)
+        except OSError as e:
+            print(f"[!] Failed to save crash trace: {e}")
 
     def show_emergency_window(self):
         self.accident_detected = True
@@ -117,7 +146,7 @@ class EmergencyCallMonitor(QWidget):
         if hasattr(self.panel, "modules") and self.panel.modules["360 View"]["object"]:
             cam360 = self.panel.modules["360 View"]["object"]
             if hasattr(cam360, "recorder"):
-                cam360.recorder.trigger_event_recording()
+                cam360.recorder.trigger_event_recording("accident")
                 print("[*] Video recording triggered due to accident event.")
 
     def update_auto_call_timer(self):
@@ -0,0 +1,247 @@
+import os
+import sys
+import time
+import threading
+import multiprocessing as mp
+import numpy as np
+from multiprocessing import shared_memory
+
+# Шина кадров между процессами RAAS: у каждой камеры свой сегмент shared memory
+# с кольцом слотов. Каждый слот защищён seqlock-счётчиком: писатель делает его нечётным
+# на время копирования и чётным после, читатель сверяет счётчик до и после чтения.
+# Писатель один (SensorHub), читателей сколько угодно; блокировок между процессами нет.
+# Читатели раз в READER_TOUCH_SEC отмечают в заголовке время последнего обращения — по нему
+# SensorHub держит сенсор камеры только пока её кто-то читает.
+
+BUS_PREFIX = "raas_bus_"
+BUS_MAGIC = 0x52414153   # "RAAS"
+DEFAULT_SLOTS = 4
+HEADER_BYTES = 4096      # заголовок сегмента; данные кадров начинаются с выровненного смещения
+READER_TOUCH_SEC = 0.5   # как часто читатель обновляет отметку H_READER_SEEN
+
+# Сегменты, созданные писателями этого процесса (их трекер должен удалить при выходе)
+owned_segments = set()
+
+# Глобальный заголовок: int64[8]; H_READER_SEEN — микросекунды эпохи последнего обращения читателя
+H_MAGIC, H_WIDTH, H_HEIGHT, H_CHANNELS, H_SLOTS, H_SLOT_BYTES, H_WRITE_COUNT, H_READER_SEEN = range(8)
+
+
+def segment_name(camera):
+    return BUS_PREFIX + camera
+
+
+class FrameBusSegment:
+    # Разметка сегмента: заголовок, по слоту — seq/frame/timestamp, затем кадры подряд
+    def __init__(self, shm):
+        self.shm = shm
+        buf = shm.buf
+        self.header = np.ndarray((8,), dtype=np.int64, buffer=buf, offset=0)
+        n = int(self.header[H_SLOTS])
+        self.n_slots = n
+        self.width = int(self.header[H_WIDTH])
+        self.height = int(self.header[H_HEIGHT])
+        self.channels = int(self.header[H_CHANNELS])
+        self.slot_bytes = int(self.header[H_SLOT_BYTES])
+        self.seq = np.ndarray((n,), dtype=np.int64, buffer=buf, offset=64)
+        self.frame_ids = np.ndarray((n,), dtype=np.int64, buffer=buf, offset=64 + 8 * n)
+        self.timestamps = np.ndarray((n,), dtype=np.float64, buffer=buf, offset=64 + 16 * n)
+        self.data = np.ndarray((n, self.slot_bytes), dtype=np.uint8, buffer=buf, offset=HEADER_BYTES)
+
+    def release(self):
+        # Все виды на shm.buf должны исчезнуть до close()
+        self.header = self.seq = self.frame_ids = self.timestamps = self.data = None
+        self.shm.close()
+
+
+class FrameBusWriter:
+    # Сторона продюсера: создаёт сегмент камеры и публикует кадры (одна копия raw_data в слот)
+    def __init__(self, camera, width, height, channels=4, slots=DEFAULT_SLOTS):
+        self.camera = camera
+        slot_bytes = width * height * channels
+        size = HEADER_BYTES + slots * slot_bytes
+        name = segment_name(camera)
+        try:
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            # Остался от упавшего продюсера — пересоздаём
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+
+        owned_segments.add(name)
+        header = np.ndarray((8,), dtype=np.int64, buffer=shm.buf, offset=0)
+        header[:] = 0
+        header[H_WIDTH], header[H_HEIGHT], header[H_CHANNELS] = width, height, channels
+        header[H_SLOTS], header[H_SLOT_BYTES] = slots, slot_bytes
+        header[H_MAGIC] = BUS_MAGIC   # последним: читатель не подключится к недоинициализированному сегменту
+        del header
+        self.segment = FrameBusSegment(shm)
+        self.segment.seq[:] = 0
+        self.published = 0
+
+    def publish(self, raw, frame_id=0, timestamp=0.0):
+        seg = self.segment
+        count = int(seg.header[H_WRITE_COUNT])
+        i = count % seg.n_slots
+        seg.seq[i] += 1                       # нечётный: слот пишется
+        seg.data[i] = np.frombuffer(raw, dtype=np.uint8)
+        seg.frame_ids[i] = frame_id
+        seg.timestamps[i] = timestamp
+        seg.seq[i] += 1                       # чётный: слот готов
+        seg.header[H_WRITE_COUNT] = count + 1
+        self.published += 1
+
+    def reader_idle_sec(self):
+        # Сколько секунд камеру никто не читал (inf — ещё ни разу)
+        seen = int(self.segment.header[H_READER_SEEN])
+        return time.time() - seen / 1000000.0 if seen else float("inf")
+
+    def close(self):
+        shm = self.segment.shm
+        self.segment.release()
+        try:
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+        owned_segments.discard(shm.name)
+
+
+class BusImage:
+    # Кадр из шины с теми же полями, что carla.Image (raw_data, width, height, frame, timestamp),
+    # поэтому существующие колбэки и CameraFrame работают без изменений
+    def __init__(self, raw_data, width, height, frame, timestamp, reader=None, slot=None, seq=None):
+        self.raw_data = raw_data
+        self.width = width
+        self.height = height
+        self.frame = frame
+        self.timestamp = timestamp
+        self.reader = reader
+        self.slot = slot
+        self.seq = seq
+
+    def still_valid(self):
+        # Для кадров без копирования: слот не перезаписан с момента чтения
+        if self.reader is None:
+            return True
+        return int(self.reader.segment.seq[self.slot]) == self.seq
+
+
+class FrameBusReader:
+    # Сторона потребителя: подключается к камере по имени и читает последний кадр
+    def __init__(self, camera):
+        self.camera = camera
+        shm = open_segment(segment_name(camera))
+        self.segment = FrameBusSegment(shm)
+        if int(self.segment.header[H_MAGIC]) != BUS_MAGIC:
+            self.segment.release()
+            raise FileNotFoundError(f"frame bus segment for '{camera}' is not initialised")
+        self.last_count = 0
+        self.torn_reads = 0
+        self.touched = 0.0
+        self.touch()
+
+    @classmethod
+    def attach(cls, camera):
+        # None — шины нет (продюсер не запущен)
+        try:
+            return cls(camera)
+        except FileNotFoundError:
+            return None
+
+    def write_count(self):
+        return int(self.segment.header[H_WRITE_COUNT])
+
+    def touch(self):
+        # Отметка «камеру читают»: одно запись int64, последний писатель выигрывает — гонок нет
+        now = time.monotonic()
+        if now - self.touched >= READER_TOUCH_SEC:
+            self.touched = now
+            self.segment.header[H_READER_SEEN] = int(time.time() * 1000000)
+
+    def has_new(self):
+        self.touch()
+        return self.write_count() != self.last_count
+
+    def read(self, copy=True, retries=3):
+        # copy=False — вид прямо в слот (zero-copy); проверяйте still_valid() после использования
+        seg = self.segment
+        for _ in range(retries):
+            count = self.write_count()
+            if count == 0:
+                return None
+            i = (count - 1) % seg.n_slots
+            s1 = int(seg.seq[i])
+            if s1 & 1:
+                self.torn_reads += 1
+                continue
+            data = seg.data[i].copy() if copy else seg.data[i]
+            frame_id = int(seg.frame_ids[i])
+            timestamp = float(seg.timestamps[i])
+            if int(seg.seq[i]) != s1:
+                self.torn_reads += 1
+                continue
+            self.last_count = count
+            return BusImage(data, seg.width, seg.height, frame_id, timestamp,
+                            reader=None if copy else self, slot=i, seq=s1)
+        return None
+
+    def close(self):
+        self.segment.release()
+
+
+class BusSubscriber:
+    # Поток, который раздаёт новые кадры из шины в колбэк, как sensor.listen().
+    # Методы stop()/destroy() — как у сенсора CARLA, чтобы модули могли не различать источники
+    def __init__(self, reader, callback, poll_sec=0.005):
+        self.reader = reader
+        self.callback = callback
+        self.poll_sec = poll_sec
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.loop, daemon=True)
+        self.thread.start()
+
+    def loop(self):
+        while not self.stop_event.is_set():
+            if self.reader.has_new():
+                image = self.reader.read(copy=True)
+                if image is not None:
+                    self.callback(image)
+                    continue
+            self.stop_event.wait(self.poll_sec)
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not threading.current_thread():
+            self.thread.join(timeout=1.0)
+
+    def destroy(self):
+        self.stop()
+        self.reader.close()
+
+
+def open_segment(name):
+    # Подключение читателя без передачи сегмента во владение: на POSIX resource_tracker иначе
+    # удалит сегмент при выходе любого процесса, который к нему подключился
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    shm = shared_memory.SharedMemory(name=name)
+    # Дочерние процессы multiprocessing делят трекер с родителем, а свой сегмент процесс удаляет сам —
+    # в этих случаях снимать с учёта нельзя
+    if os.name == "posix" and mp.parent_process() is None and name not in owned_segments:
+        try:
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, "shared_memory")
+        except Exception:
+            pass
+    return shm
+
+
+def wait_for_camera(camera, timeout=5.0):
+    # Подключение к камере, которую продюсер ещё поднимает
+    deadline = time.time() + timeout
+    while True:
+        reader = FrameBusReader.attach(camera)
+        if reader is not None or time.time() >= deadline:
+            return reader
+        time.sleep(0.1)
@@ -0,0 +1,89 @@
+import time
+import numpy as np
+import cv2
+from perf_stats import LatencyStats
+
+
+class CompressedFrameRing:
+    # Кольцевой буфер кадров в JPEG: одна заранее выделенная арена фиксированных слотов,
+    # без аллокаций на кадр. Сжатие (encode) делается вне блокировки вызывающего,
+    # store()/snapshot() — быстрые копирования байтов. Сам по себе не потокобезопасен:
+    # CameraBufferRecorder вызывает store/snapshot/latest под своим self.lock.
+    def __init__(self, capacity, slot_bytes, quality=80):
+        self.capacity = capacity
+        self.slot_bytes = slot_bytes
+        self.quality = quality
+
+        self.arena = np.zeros((capacity, slot_bytes), dtype=np.uint8)
+        self.lengths = np.zeros(capacity, dtype=np.int32)
+        self.timestamps = np.zeros(capacity, dtype=np.float64)
+        self.speeds = np.zeros(capacity, dtype=np.float32)
+        self.last_seq = 0  # номер последнего сохранённого кадра (растёт с 1, не сбрасывается при перезаписи)
+        self.head = 0    # следующий слот для записи
+        self.count = 0
+        self.shape = None
+
+        self.encode_time = LatencyStats("jpeg_encode")
+        self.stored_bytes = 0
+        self.stored_frames = 0
+        self.oversize = 0
+
+    def __len__(self):
+        return self.count
+
+    def encode(self, frame):
+        # JPEG с заданным качеством; если кадр не влезает в слот — одна попытка похуже
+        start = time.perf_counter()
+        quality = self.quality
+        ok, data = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        if ok and len(data) > self.slot_bytes:
+            quality = max(10, quality // 2)
+            ok, data = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        self.encode_time.add((time.perf_counter() - start) * 1000.0)
+        if not ok or len(data) > self.slot_bytes:
+            self.oversize += 1
+            return None
+        if self.shape is None:
+            self.shape = frame.shape
+        return data
+
+    def store(self, data, ts, speed):
+        # Возвращает порядковый номер кадра
+        n = len(data)
+        slot = self.head
+        self.arena[slot, :n] = data
+        self.lengths[slot] = n
+        self.timestamps[slot] = ts
+        self.speeds[slot] = speed
+        self.head = (slot + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+        self.stored_bytes += n
+        self.stored_frames += 1
+        self.last_seq += 1
+        return self.last_seq
+
+    def slot_order(self):
+        start = (self.head - self.count) % self.capacity
+        return [(start + i) % self.capacity for i in range(self.count)]
+
+    def snapshot(self):
+        # [(jpeg_bytes, ts, speed), ...] от старых к новым; байты копируются, арену можно перезаписывать
+        return [(self.arena[i, :self.lengths[i]].tobytes(), float(self.timestamps[i]), float(self.speeds[i]))
+                for i in self.slot_order()]
+
+    def get_stats(self):
+        avg = self.stored_bytes / self.stored_frames if self.stored_frames else 0.0
+        raw = int(np.prod(self.shape)) if self.shape is not None else 0
+        return {
+            "frames": self.count,
+            "memory_bytes": self.arena.nbytes,
+            "avg_frame_bytes": avg,
+            "compression_ratio": raw / avg if avg else 0.0,
+            "oversize_dropped": self.oversize,
+            "encode": self.encode_time.snapshot(),
+        }
+
+
+def decode_frame(data):
+    # Обратно в BGR; data — bytes или массив uint8
+    return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
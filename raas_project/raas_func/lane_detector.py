@@ -0,0 +1,331 @@
+import time
+import numpy as np
+import cv2
+from perf_stats import LatencyStats
+
+# Трапеция области интереса в долях нижней половины кадра: (x, y), по часовой стрелке от левого нижнего угла.
+# Сверху (у горизонта) полосы сходятся к центру, по краям верхней части — обочины и встречка
+TRAPEZOID = ((0.0, 1.0), (0.3, 0.0), (0.7, 0.0), (1.0, 1.0))
+MIN_SLOPE = 0.3          # почти горизонтальные отрезки (стоп-линии, тени) не считаются разметкой
+LEFT_COLOR = (0, 0, 255)     # красная
+RIGHT_COLOR = (0, 255, 0)    # зелёная
+CENTER_COLOR = (255, 0, 0)   # синяя — центр камеры
+LANE_COLOR = (0, 255, 255)   # жёлтая — центр полосы (трекер или waypoint)
+TRACK_ROWS = (0.0, 0.5, 1.0)     # строки состояния LaneSide в долях высоты ROI
+EMPTY_SEGMENTS = np.empty((0, 4), dtype=np.int32)
+
+
+def fit_parabola(ys, xs):
+    # x = a*y^2 + b*y + c методом наименьших квадратов через нормальные уравнения 3x3:
+    # на сотнях точек в разы быстрее np.polyfit (там SVD и проверки на каждый вызов)
+    y2 = ys * ys
+    s1, s2 = ys.sum(), y2.sum()
+    s3, s4 = np.dot(y2, ys), np.dot(y2, y2)
+    a = np.array([[s4, s3, s2], [s3, s2, s1], [s2, s1, len(ys)]])
+    b = np.array([np.dot(y2, xs), np.dot(ys, xs), xs.sum()])
+    return np.linalg.solve(a, b)
+
+
+class LaneDetector:
+    # Поиск разметки в нижней половине кадра: серый -> (уменьшение) -> размытие -> Canny -> маска -> Hough.
+    # Рабочие буферы и маска создаются один раз под размер кадра, дальше OpenCV пишет в них через dst.
+    # scale < 1 уменьшает ROI перед Canny; отрезки возвращаются в координатах исходного кадра.
+    # show=False — режим без окна: ни отрисовки, ни imshow, только detect()
+    def __init__(self, scale=0.5, show=True, canny_low=30, canny_high=90, window="Lane View"):
+        self.scale = scale
+        self.show = show
+        self.canny_low = canny_low
+        self.canny_high = canny_high
+        self.window = window
+        self.shape = None
+        self.detect_time = LatencyStats("lane_detect")
+        self.frames = 0
+        self.both_sides = 0
+
+    def allocate(self, shape):
+        # Буферы под размер кадра; вызывается только при первом кадре или смене разрешения
+        height, width = shape[:2]
+        self.shape = shape
+        self.roi_top = height // 2
+        roi_h, roi_w = height - self.roi_top, width
+        small_w, small_h = max(1, int(roi_w * self.scale)), max(1, int(roi_h * self.scale))
+        self.small_size = (small_w, small_h)
+
+        self.gray = np.empty((roi_h, roi_w), dtype=np.uint8)
+        self.small = np.empty((small_h, small_w), dtype=np.uint8) if self.scale != 1.0 else self.gray
+        self.blur = np.empty((small_h, small_w), dtype=np.uint8)
+        self.edges = np.empty((small_h, small_w), dtype=np.uint8)
+        self.output = np.empty((height, width, 3), dtype=np.uint8)
+
+        self.mask = np.zeros((small_h, small_w), dtype=np.uint8)
+        pts = np.array([(x * (small_w - 1), y * (small_h - 1)) for x, y in TRAPEZOID], dtype=np.int32)
+        cv2.fillPoly(self.mask, [pts], 255)
+
+        # Параметры Hough — в пикселях уменьшенного изображения
+        self.min_line_length = max(5, int(30 * self.scale))
+        self.max_line_gap = max(5, int(150 * self.scale))
+        self.hough_threshold = max(10, int(25 * self.scale))
+
+    def detect(self, image):
+        # image — BGR или BGRA (h, w, 3|4). Возвращает (left, right): массивы (N, 4) int32
+        # с отрезками x1, y1, x2, y2 в координатах ROI (строка 0 = середина кадра)
+        start = time.perf_counter()
+        self.find_edges(image)
+        lines = cv2.HoughLinesP(self.edges, 1, np.pi / 180, self.hough_threshold,
+                                minLineLength=self.min_line_length, maxLineGap=self.max_line_gap)
+
+        left, right = self.classify(lines)
+        self.frames += 1
+        if len(left) and len(right):
+            self.both_sides += 1
+        self.detect_time.add((time.perf_counter() - start) * 1000.0)
+        return left, right
+
+    def find_edges(self, image):
+        # Границы в маске ROI -> self.edges (в пикселях уменьшенного изображения)
+        if image.shape != self.shape:
+            self.allocate(image.shape)
+        roi = image[self.roi_top:]
+        code = cv2.COLOR_BGRA2GRAY if image.shape[2] == 4 else cv2.COLOR_BGR2GRAY
+        cv2.cvtColor(roi, code, dst=self.gray)
+        if self.scale != 1.0:
+            cv2.resize(self.gray, self.small_size, dst=self.small, interpolation=cv2.INTER_AREA)
+        cv2.GaussianBlur(self.small, (5, 5), 0, dst=self.blur)
+        cv2.Canny(self.blur, self.canny_low, self.canny_high, edges=self.edges)
+        cv2.bitwise_and(self.edges, self.mask, dst=self.edges)
+        return self.edges
+
+    def classify(self, lines):
+        # Разметка слева — отрицательный наклон в левой половине, справа — положительный в правой
+        if lines is None:
+            return EMPTY_SEGMENTS, EMPTY_SEGMENTS
+        segs = lines.reshape(-1, 4)
+        if self.scale != 1.0:
+            segs = (segs / self.scale).astype(np.int32)
+        x1, y1, x2, y2 = segs.T
+        slope = (y2 - y1) / (x2 - x1 + 1e-6)
+        half = self.shape[1] // 2
+        midpoint = (x1 + x2) // 2
+        steep = np.abs(slope) >= MIN_SLOPE
+        left = segs[steep & (slope < 0) & (midpoint < half)]
+        right = segs[steep & (slope > 0) & (midpoint > half)]
+        return left, right
+
+    def draw(self, image, left, right, lane_center_x=None):
+        # Кадр с разметкой в self.output (тот же буфер каждый раз — копируйте, если нужно сохранить)
+        if image.shape[2] == 4:
+            cv2.cvtColor(image, cv2.COLOR_BGRA2BGR, dst=self.output)
+        else:
+            np.copyto(self.output, image)
+        roi = self.output[self.roi_top:]
+        for x1, y1, x2, y2 in left:
+            cv2.line(roi, (int(x1), int(y1)), (int(x2), int(y2)), LEFT_COLOR, 2)
+        for x1, y1, x2, y2 in right:
+            cv2.line(roi, (int(x1), int(y1)), (int(x2), int(y2)), RIGHT_COLOR, 2)
+
+        height, width = self.output.shape[:2]
+        cam_center = width // 2
+        cv2.line(self.output, (cam_center, self.roi_top), (cam_center, height), CENTER_COLOR, 2)
+        if lane_center_x is not None:
+            cv2.line(self.output, (lane_center_x, self.roi_top), (lane_center_x, height), LANE_COLOR, 2)
+        return self.output
+
+    def process(self, image, lane_center_x=None):
+        # Замена process_and_show_lane: поиск разметки и, если show, отрисовка в окно
+        left, right = self.detect(image)
+        if self.show:
+            cv2.imshow(self.window, self.draw(image, left, right, lane_center_x))
+        return left, right
+
+    def get_stats(self):
+        return {
+            "frames": self.frames,
+            "both_sides": self.both_sides,
+            "scale": self.scale,
+            "detect": self.detect_time.snapshot(),
+        }
+
+
+class LaneSide:
+    # Фильтр одной линии разметки. Состояние — x линии в трёх строках ROI (TRACK_ROWS): все компоненты
+    # в пикселях, поэтому шумы задаются прямо в px, а парабола x(y) через три точки однозначна.
+    # Скалярный фильтр Калмана на каждую компоненту с моделью «линия стоит на месте»
+    def __init__(self, rows, process_noise, measurement_noise):
+        self.rows = rows
+        self.v_inv = np.linalg.inv(np.vander(rows, 3))
+        self.q = process_noise ** 2
+        self.r = measurement_noise ** 2
+        self.x = None
+        self.p = None
+        self.c = None
+        self.misses = 0
+
+    def locked(self):
+        return self.x is not None
+
+    def predict(self):
+        if self.x is not None:
+            self.p += self.q
+
+    def update(self, xs, weight=1.0):
+        # weight > 1 — измерение надёжнее (больше точек), R уменьшается
+        if self.x is None:
+            self.x = np.asarray(xs, dtype=np.float64).copy()
+            self.p = np.full(3, self.r)
+        else:
+            k = self.p / (self.p + self.r / weight)
+            self.x += k * (xs - self.x)
+            self.p *= 1.0 - k
+        self.c = self.v_inv @ self.x
+        self.misses = 0
+
+    def x_at(self, ys):
+        a, b, c = self.c
+        return (a * ys + b) * ys + c
+
+
+class LaneTracker:
+    # Разметка с памятью между кадрами. Полный поиск (Hough в LaneDetector) — для захвата и когда
+    # уверенность падает; на остальных кадрах точки границ берутся только в полосе ±band_px вокруг
+    # прошлой параболы, а новая аппроксимация сглаживается фильтром Калмана (LaneSide).
+    # Координаты — пиксели исходного кадра внутри ROI (строка 0 = середина кадра)
+    def __init__(self, detector, band_px=40, min_points=40, max_misses=3,
+                 process_noise=4.0, measurement_noise=6.0):
+        self.detector = detector
+        self.band_px = band_px
+        self.min_points = min_points
+        self.max_misses = max_misses
+        self.process_noise = process_noise
+        self.measurement_noise = measurement_noise
+        self.left = self.right = None
+        self.roi_h = None
+
+        self.track_time = LatencyStats("lane_track")
+        self.busy_sec = 0.0
+        self.frames = 0
+        self.tracked = 0
+        self.full_searches = 0
+        self.fallbacks = 0    # полный поиск после потери уверенности (без первого захвата и повторов при потере)
+        self.searching = True
+
+    def ensure_sides(self):
+        roi_h = self.detector.shape[0] - self.detector.roi_top
+        if roi_h != self.roi_h:
+            self.roi_h = roi_h
+            rows = np.array(TRACK_ROWS) * (roi_h - 1)
+            self.left = LaneSide(rows, self.process_noise, self.measurement_noise)
+            self.right = LaneSide(rows, self.process_noise, self.measurement_noise)
+
+    def confident(self):
+        return (self.left is not None and self.left.locked() and self.right.locked()
+                and self.left.misses <= self.max_misses and self.right.misses <= self.max_misses)
+
+    def update(self, image):
+        # Возвращает True, если обе линии захвачены
+        start = time.perf_counter()
+        if self.confident():
+            self.track(image)
+            self.tracked += 1
+            self.searching = False
+        else:
+            if not self.searching:
+                self.fallbacks += 1
+            self.full_search(image)
+            self.full_searches += 1
+            self.searching = not self.confident()
+        self.frames += 1
+        elapsed = time.perf_counter() - start
+        self.busy_sec += elapsed
+        self.track_time.add(elapsed * 1000.0)
+        return self.confident()
+
+    def full_search(self, image):
+        left, right = self.detector.detect(image)
+        self.ensure_sides()
+        for side, segs in ((self.left, left), (self.right, right)):
+            side.predict()
+            fit = self.fit_segments(segs)
+            if fit is None:
+                side.misses += 1
+            else:
+                side.update(np.polyval(fit, side.rows))
+
+    def fit_segments(self, segs):
+        # Парабола по точкам вдоль отрезков Hough; None, если по высоте не хватает охвата
+        if not len(segs):
+            return None
+        t = np.linspace(0.0, 1.0, 5)
+        x1, y1, x2, y2 = segs.T.astype(np.float64)
+        xs = (x1[:, None] + t * (x2 - x1)[:, None]).ravel()
+        ys = (y1[:, None] + t * (y2 - y1)[:, None]).ravel()
+        if np.ptp(ys) < 0.25 * self.roi_h:
+            return None
+        return fit_parabola(ys, xs)
+
+    def track(self, image):
+        # Без Hough: точки границ в полосе вокруг предсказания, каждая точка — ближайшей линии
+        edges = self.detector.find_edges(image)
+        pts = cv2.findNonZero(edges)    # заметно быстрее np.nonzero на разреженной карте границ
+        pts = np.empty((0, 2), dtype=np.int32) if pts is None else pts.reshape(-1, 2)
+        inv = 1.0 / self.detector.scale
+        xs = pts[:, 0] * inv
+        ys = pts[:, 1] * inv
+        self.left.predict()
+        self.right.predict()
+        dl = np.abs(xs - self.left.x_at(ys))
+        dr = np.abs(xs - self.right.x_at(ys))
+        for side, near in ((self.left, (dl < self.band_px) & (dl < dr)),
+                           (self.right, (dr < self.band_px) & (dr <= dl))):
+            n = int(np.count_nonzero(near))
+            if n < self.min_points or np.ptp(ys[near]) < 0.25 * self.roi_h:
+                side.misses += 1
+                continue
+            fit = fit_parabola(ys[near], xs[near])
+            side.update(np.polyval(fit, side.rows), weight=min(4.0, n / self.min_points))
+
+    def center_x(self):
+        # Центр полосы у нижнего края кадра (x в пикселях кадра) или None без захвата
+        if not self.confident():
+            return None
+        y = self.roi_h - 1
+        return int(round((self.left.x_at(y) + self.right.x_at(y)) / 2.0))
+
+    def draw(self, image, lane_center_x=None):
+        # Параболы линий и центр полосы по трекеру; без захвата — центр по waypoint, как раньше
+        locked = self.confident()
+        output = self.detector.draw(image, EMPTY_SEGMENTS, EMPTY_SEGMENTS, None if locked else lane_center_x)
+        if self.left is None:
+            return output
+        roi = output[self.detector.roi_top:]
+        ys = np.arange(0, self.roi_h, 8, dtype=np.float64)
+        for side, color in ((self.left, LEFT_COLOR), (self.right, RIGHT_COLOR)):
+            if side.locked():
+                pts = np.stack([side.x_at(ys), ys], axis=1).astype(np.int32)
+                cv2.polylines(roi, [pts], False, color, 2)
+        if locked:
+            mid = (self.left.x_at(ys) + self.right.x_at(ys)) / 2.0
+            pts = np.stack([mid, ys], axis=1).astype(np.int32)
+            cv2.polylines(roi, [pts], False, LANE_COLOR, 2)
+        return output
+
+    def process(self, image, lane_center_x=None):
+        locked = self.update(image)
+        if self.detector.show:
+            cv2.imshow(self.detector.window, self.draw(image, lane_center_x))
+        return locked
+
+    def get_stats(self):
+        return {
+            "frames": self.frames,
+            "tracked": self.tracked,
+            "full_searches": self.full_searches,
+            "fallbacks": self.fallbacks,
+            "full_search_rate": self.full_searches / self.frames if self.frames else 0.0,
+            "fits_per_sec": self.frames / self.busy_sec if self.busy_sec else 0.0,
+            "track": self.track_time.snapshot(),
+        }
+
+    def __str__(self):
+        s = self.get_stats()
+        return (f"lane tracker: {s['fits_per_sec']:.0f} fits/s, full search on {s['full_searches']}/{s['frames']} "
+                f"frames ({s['fallbacks']} fallbacks after losing the lane)")
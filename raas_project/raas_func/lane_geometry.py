@@ -0,0 +1,285 @@
+import sys
+import time
+import random
+import numpy as np
+
+# Локальный кеш геометрии полос: точки центров полос из carla.Map.generate_waypoints(), связи «следующая
+# точка» и равномерная сетка для поиска ближайшей. Проекция и взгляд вперёд считаются в процессе,
+# без get_waypoint()/next() на каждой итерации цикла управления
+SPACING_M = 1.0          # шаг выборки точек вдоль полосы
+CELL_SIZE_M = 4.0        # размер ячейки сетки поиска
+MAX_POSITION_ERROR_M = 0.3   # допуск проверки против живого get_waypoint (95-й перцентиль)
+MAX_LANE_MISMATCH = 0.05     # допустимая доля точек, спроецированных на другую полосу
+
+
+class LanePoint:
+    # Точка на центре полосы: координаты, курс и полоса; index/t — отрезок index -> successor и доля на нём
+    # (у LiveLaneGeometry вместо них — сам waypoint)
+    def __init__(self, x, y, z, yaw, road_id, lane_id, index=-1, t=0.0, waypoint=None):
+        self.x, self.y, self.z = x, y, z
+        self.yaw = yaw
+        self.road_id = road_id
+        self.lane_id = lane_id
+        self.index = index
+        self.t = t
+        self.waypoint = waypoint
+
+
+class LaneGeometryCache:
+    def __init__(self, points, yaws, lane_keys, successors, cell_size=CELL_SIZE_M):
+        self.points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        self.yaws = np.asarray(yaws, dtype=np.float64)
+        self.lane_keys = np.asarray(lane_keys, dtype=np.int64).reshape(-1, 2)   # (road_id, lane_id)
+        yaw = np.radians(self.yaws)
+        self.directions = np.stack((np.cos(yaw), np.sin(yaw)), axis=1)          # единичный вектор по курсу
+        self.cell_size = cell_size
+        self.set_successors(successors)
+        self.build_grid()
+        # Для коротких скалярных вычислений списки Python быстрее, чем индексация NumPy
+        self.xyz = self.points.tolist()
+        self.keys = self.lane_keys.tolist()
+        self.yaw_list = self.yaws.tolist()
+
+    @classmethod
+    def from_map(cls, carla_map, spacing=SPACING_M, cell_size=CELL_SIZE_M):
+        # Однократная выборка топологии: точки, затем для каждой wp.next(spacing)[0] -> индекс ближайшей точки
+        import carla
+        start = time.perf_counter()
+        waypoints = [wp for wp in carla_map.generate_waypoints(spacing) if wp.lane_type == carla.LaneType.Driving]
+        points = [(wp.transform.location.x, wp.transform.location.y, wp.transform.location.z) for wp in waypoints]
+        yaws = [wp.transform.rotation.yaw for wp in waypoints]
+        keys = [(wp.road_id, wp.lane_id) for wp in waypoints]
+        cache = cls(points, yaws, keys, np.full(len(points), -1), cell_size)
+
+        successors = np.full(len(points), -1, dtype=np.int64)
+        for i, wp in enumerate(waypoints):
+            nxt = wp.next(spacing)
+            if not nxt:
+                continue
+            loc = nxt[0].transform.location
+            j, d2 = cache.nearest(loc.x, loc.y, loc.z)
+            if j != i and d2 <= spacing * spacing:
+                successors[i] = j
+        cache.set_successors(successors)
+        print(f"[*] Lane geometry: {len(points)} points cached in {time.perf_counter() - start:.1f} s")
+        return cache
+
+    def set_successors(self, successors):
+        self.succ = np.asarray(successors, dtype=np.int64)
+        n = len(self.succ)
+        self.pred = np.full(n, -1, dtype=np.int64)
+        has = self.succ >= 0
+        self.pred[self.succ[has]] = np.nonzero(has)[0]
+        seg = np.zeros(n)
+        seg[has] = np.linalg.norm(self.points[self.succ[has]] - self.points[has], axis=1)
+        self.seg_len = seg.tolist()
+        self.succ_list = self.succ.tolist()
+        self.pred_list = self.pred.tolist()
+
+    def build_grid(self):
+        # Сетка в формате CSR: точки отсортированы по номеру ячейки cx * ny + cy, cell_start — начало ячейки.
+        # Три ячейки с одинаковым cx и соседними cy идут подряд, поэтому блок 3x3 — это три среза
+        cs = self.cell_size
+        xy = self.points[:, :2]
+        self.origin = xy.min(axis=0) - cs
+        cells = np.floor((xy - self.origin) / cs).astype(np.int64)
+        self.nx, self.ny = int(cells[:, 0].max()) + 2, int(cells[:, 1].max()) + 2
+        ids = cells[:, 0] * self.ny + cells[:, 1]
+        order = np.argsort(ids, kind="stable")
+        self.grid_index = order
+        self.grid_points = self.points[order]
+        self.cell_start = np.searchsorted(ids[order], np.arange(self.nx * self.ny + 1))
+
+    def nearest(self, x, y, z):
+        # Индекс ближайшей точки и квадрат расстояния. Кольцо ячеек расширяется, пока найденная точка
+        # может быть дальше границы просмотренного блока; за пределами сетки — полный перебор
+        cs = self.cell_size
+        cx = int((x - self.origin[0]) // cs)
+        cy = int((y - self.origin[1]) // cs)
+        q = np.array((x, y, z))
+        ring = 1
+        while ring <= max(self.nx, self.ny):
+            best, best_d2 = -1, np.inf
+            y0, y1 = max(cy - ring, 0), min(cy + ring, self.ny - 1)
+            if y0 <= y1:
+                for gx in range(max(cx - ring, 0), min(cx + ring, self.nx - 1) + 1):
+                    a = self.cell_start[gx * self.ny + y0]
+                    b = self.cell_start[gx * self.ny + y1 + 1]
+                    if a == b:
+                        continue
+                    d2 = ((self.grid_points[a:b] - q) ** 2).sum(axis=1)
+                    k = int(d2.argmin())
+                    if d2[k] < best_d2:
+                        best, best_d2 = int(self.grid_index[a + k]), float(d2[k])
+            if best >= 0 and best_d2 <= (ring * cs) ** 2:
+                return best, best_d2
+            ring *= 2
+        d2 = ((self.points - q) ** 2).sum(axis=1)
+        k = int(d2.argmin())
+        return k, float(d2[k])
+
+    def project(self, x, y, z=0.0):
+        # Аналог get_waypoint(location, project_to_road=True): основание перпендикуляра на центр ближайшей
+        # полосы (по отрезкам к соседним точкам), а не просто ближайшая точка выборки
+        i, _ = self.nearest(x, y, z)
+        best = (i, 0.0, self.xyz[i], np.inf)
+        for a in (self.pred_list[i], i):
+            if a < 0 or self.succ_list[a] < 0:
+                continue
+            ax, ay, az = self.xyz[a]
+            bx, by, bz = self.xyz[self.succ_list[a]]
+            dx, dy, dz = bx - ax, by - ay, bz - az
+            length2 = dx * dx + dy * dy + dz * dz
+            if length2 == 0.0:
+                continue
+            t = min(1.0, max(0.0, ((x - ax) * dx + (y - ay) * dy + (z - az) * dz) / length2))
+            foot = (ax + t * dx, ay + t * dy, az + t * dz)
+            d2 = (x - foot[0]) ** 2 + (y - foot[1]) ** 2 + (z - foot[2]) ** 2
+            if d2 < best[3]:
+                best = (a, t, foot, d2)
+        a, t, foot, _ = best
+        return self.make_point(a, t, foot)
+
+    def ahead(self, point, distance):
+        # Аналог waypoint.next(distance)[0]: проход по цепочке successor на distance метров
+        i, t = point.index, point.t
+        remaining = distance + t * self.seg_len[i]
+        for _ in range(len(self.succ_list)):
+            j = self.succ_list[i]
+            if j < 0:
+                return self.make_point(i, 0.0, self.xyz[i])    # конец полосы без продолжения
+            length = self.seg_len[i]
+            if remaining <= length:
+                t = remaining / length if length else 0.0
+                ax, ay, az = self.xyz[i]
+                bx, by, bz = self.xyz[j]
+                return self.make_point(i, t, (ax + t * (bx - ax), ay + t * (by - ay), az + t * (bz - az)))
+            remaining -= length
+            i = j
+        return self.make_point(i, 0.0, self.xyz[i])
+
+    def path_ahead(self, point, distance):
+        # Цепочка точек полосы от отрезка point вперёд на distance метров: индексы точек и расстояние
+        # вдоль полосы от point до каждой (первая точка — начало отрезка, её расстояние <= 0)
+        i = point.index
+        indices = [i]
+        s = [-point.t * self.seg_len[i]]
+        while s[-1] < distance and len(indices) < len(self.succ_list):
+            j = self.succ_list[i]
+            if j < 0:
+                break
+            s.append(s[-1] + self.seg_len[i])
+            indices.append(j)
+            i = j
+        return indices, s
+
+    def make_point(self, i, t, xyz):
+        road_id, lane_id = self.keys[i]
+        return LanePoint(xyz[0], xyz[1], xyz[2], self.yaw_list[i], road_id, lane_id, i, t)
+
+    def verify(self, carla_map, locations, lookahead=2.0):
+        # Сверка с живыми get_waypoint()/next() на заданных точках: ошибка проекции и взгляда вперёд,
+        # доля несовпавших полос и время одного запроса в обоих вариантах
+        import carla
+        proj_err, ahead_err = [], []
+        mismatched = 0
+        live_sec = cache_sec = 0.0
+        for loc in locations:
+            start = time.perf_counter()
+            wp = carla_map.get_waypoint(loc, project_to_road=True, lane_type=carla.LaneType.Driving)
+            nxt = wp.next(lookahead) if wp is not None else []
+            live_sec += time.perf_counter() - start
+            if wp is None or not nxt:
+                continue
+
+            start = time.perf_counter()
+            point = self.project(loc.x, loc.y, loc.z)
+            ahead = self.ahead(point, lookahead)
+            cache_sec += time.perf_counter() - start
+
+            live = wp.transform.location
+            proj_err.append(((live.x - point.x) ** 2 + (live.y - point.y) ** 2) ** 0.5)
+            live = nxt[0].transform.location
+            ahead_err.append(((live.x - ahead.x) ** 2 + (live.y - ahead.y) ** 2) ** 0.5)
+            if (wp.road_id, wp.lane_id) != (point.road_id, point.lane_id):
+                mismatched += 1
+
+        n = len(proj_err)
+        report = {
+            "checked": n,
+            "projection_p95_m": float(np.percentile(proj_err, 95)) if n else 0.0,
+            "ahead_p95_m": float(np.percentile(ahead_err, 95)) if n else 0.0,
+            "lane_mismatch": mismatched / n if n else 0.0,
+            "live_us": live_sec / max(len(locations), 1) * 1e6,
+            "cache_us": cache_sec / n * 1e6 if n else 0.0,
+        }
+        report["ok"] = (n > 0 and report["projection_p95_m"] <= MAX_POSITION_ERROR_M
+                        and report["lane_mismatch"] <= MAX_LANE_MISMATCH)
+        return report
+
+
+class LiveLaneGeometry:
+    # Тот же интерфейс поверх живых get_waypoint()/next() — запасной вариант, если кеш не прошёл проверку
+    def __init__(self, carla_map):
+        self.map = carla_map
+
+    def project(self, x, y, z=0.0):
+        import carla
+        wp = self.map.get_waypoint(carla.Location(x=x, y=y, z=z), project_to_road=True,
+                                   lane_type=carla.LaneType.Driving)
+        return self.make_point(wp)
+
+    def ahead(self, point, distance):
+        nxt = point.waypoint.next(distance)
+        return self.make_point(nxt[0]) if nxt else point
+
+    def make_point(self, wp):
+        loc = wp.transform.location
+        return LanePoint(loc.x, loc.y, loc.z, wp.transform.rotation.yaw, wp.road_id, wp.lane_id, waypoint=wp)
+
+
+def load_lane_geometry(carla_map, check_points=200):
+    # Кеш с проверкой против живого get_waypoint; при расхождении — LiveLaneGeometry
+    cache = LaneGeometryCache.from_map(carla_map)
+    report = cache.verify(carla_map, sample_locations(carla_map, check_points))
+    print_report(report)
+    if report["ok"]:
+        return cache
+    print("[!] Lane geometry cache disagrees with the map, using live get_waypoint()")
+    return LiveLaneGeometry(carla_map)
+
+
+def sample_locations(carla_map, count=200, jitter=1.5, seed=0):
+    # Точки для проверки: точки появления со случайным смещением (в т.ч. поперёк полосы)
+    import carla
+    rng = random.Random(seed)
+    spawns = carla_map.get_spawn_points()
+    locations = []
+    for _ in range(count):
+        loc = rng.choice(spawns).location
+        locations.append(carla.Location(x=loc.x + rng.uniform(-jitter, jitter),
+                                        y=loc.y + rng.uniform(-jitter, jitter), z=loc.z))
+    return locations
+
+
+def print_report(report):
+    status = "OK" if report["ok"] else "MISMATCH"
+    print(f"[*] Lane geometry check {status}: {report['checked']} points, projection p95 "
+          f"{report['projection_p95_m']:.2f} m, look-ahead p95 {report['ahead_p95_m']:.2f} m, "
+          f"other lane {report['lane_mismatch'] * 100:.1f}% | live {report['live_us']:.0f} us, "
+          f"cache {report['cache_us']:.0f} us per lookup")
+
+
+def main():
+    # python lane_geometry.py [число точек] — построить кеш для текущей карты и сверить с get_waypoint
+    import carla
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    client = carla.Client('localhost', 2000)
+    client.set_timeout(10.0)
+    carla_map = client.get_world().get_map()
+    cache = LaneGeometryCache.from_map(carla_map)
+    print_report(cache.verify(carla_map, sample_locations(carla_map, count)))
+
+
+if __name__ == '__main__':
+    main()
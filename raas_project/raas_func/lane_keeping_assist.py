@@ -6,6 +6,10 @@ import numpy as np
 import cv2
 import sys
 import signal
+from sensor_hub import attach_camera
+from lane_detector import LaneDetector, LaneTracker
+from lane_geometry import load_lane_geometry
+from tick_scheduler import TickScheduler
 
 class PIDController:
     def __init__(self, Kp, Ki, Kd):
@@ -28,52 +32,18 @@ def signal_handler(sig, frame):
     print("\n[!] Exiting...")
     running = False
 
-def process_and_show_lane(image, lane_center_x=None):
-    roi = image[240:, :]
-    output = image.copy()
-    gray = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY)
-    blur = cv2.GaussianBlur(gray, (5, 5), 0)
-    edges = cv2.Canny(blur, 30, 90)
-    lines = cv2.HoughLinesP(edges, 1, np.pi / 180, 25, np.array([]), minLineLength=30, maxLineGap=150)
-
-    left_lines = []
-    right_lines = []
-
-    height, width = roi.shape[:2]
-    cam_center = image.shape[1] // 2
-
-    if lines is not None:
-        for line in lines:
-            x1, y1, x2, y2 = line.reshape(4)
-            slope = (y2 - y1) / (x2 - x1 + 1e-6)
-            if abs(slope) < 0.3:
-                continue
-            midpoint = (x1 + x2) // 2
-            if slope < 0 and midpoint < width // 2:
-                left_lines.append((x1, y1, x2, y2))
-                cv2.line(output[240:], (x1, y1), (x2, y2), (0, 0, 255), 2)  # красная
-            elif slope > 0 and midpoint > width // 2:
-                right_lines.append((x1, y1, x2, y2))
-                cv2.line(output[240:], (x1, y1), (x2, y2), (0, 255, 0), 2)  # зелёная
-
-    # Центр камеры (синий)
-    cv2.line(output, (cam_center, 240), (cam_center, 480), (255, 0, 0), 2)
-
-    # Центр полосы (жёлтая линия)
-    if lane_center_x is not None:
-        cv2.line(output, (lane_center_x, 240), (lane_center_x, 480), (0, 255, 255), 2)
-
-    cv2.imshow("Lane View", output)
-
 def camera_callback(image, data_dict):
     array = np.frombuffer(image.raw_data, dtype=np.uint8)
-    array = np.reshape(array, (image.height, image.width, 4))
-    image_rgb = array[:, :, :3]
-    data_dict['image'] = image_rgb
+    # BGRA как есть: LaneDetector сам переводит в серый; несмежный срез [:, :, :3] OpenCV копировал бы на каждом кадре
+    data_dict['image'] = np.reshape(array, (image.height, image.width, 4))
 
 def main():
     global running
     signal.signal(signal.SIGINT, signal_handler)
+    # --headless: разметка ищется, но окно "Lane View" не открывается
+    headless = "--headless" in sys.argv
+    # Трекер держит линии между кадрами; полный поиск Hough — только при захвате и потере полосы
+    tracker = LaneTracker(LaneDetector(show=not headless))
 
     pygame.init()
     pygame.display.set_caption("RAAS Lane Assist Visualizer")
@@ -92,17 +62,12 @@ def main():
     vehicle = vehicles[0]
     print(f"[+] Connected to: {vehicle.type_id}")
 
-    # Камера
-    blueprint_library = world.get_blueprint_library()
-    camera_bp = blueprint_library.find('sensor.camera.rgb')
-    camera_bp.set_attribute('image_size_x', '640')
-    camera_bp.set_attribute('image_size_y', '480')
-    camera_bp.set_attribute('fov', '90')
-    camera_transform = carla.Transform(carla.Location(x=1.5, z=2.4))
-    camera = world.spawn_actor(camera_bp, camera_transform, attach_to=vehicle)
+    # Геометрия полос один раз при старте: проекция и взгляд вперёд дальше считаются в процессе
+    lanes = load_lane_geometry(map)
 
+    # Камера "lane" из CAMERA_SPECS: из шины кадров, если запущен sensor_hub.py, иначе свой сенсор
     image_data = {'image': None}
-    camera.listen(lambda image: camera_callback(image, image_data))
+    camera = attach_camera(world, vehicle, "lane", lambda image: camera_callback(image, image_data))
 
     control = carla.VehicleControl()
     lights = carla.VehicleLightState.NONE
@@ -111,7 +76,26 @@ def main():
     lane_keeping_enabled = True
     pid = PIDController(Kp=1.2, Ki=0.0, Kd=0.3)
 
-    clock = pygame.time.Clock()
+    def lane_keeping_step(tick):
+        # Модуль TickScheduler: dt — шаг симуляции, а не время кадра pygame
+        if not lane_keeping_enabled:
+            return
+        transform = vehicle.get_transform()
+        location = transform.location
+        rotation = transform.rotation
+        lane_point = lanes.project(location.x, location.y, location.z)
+        next_point = lanes.ahead(lane_point, 2.0)
+        dx = next_point.x - location.x
+        dy = next_point.y - location.y
+        yaw_rad = math.radians(rotation.yaw)
+        error = -math.sin(yaw_rad) * dx + math.cos(yaw_rad) * dy
+        steer_correction = pid.run(error, tick.delta)
+        control.steer = max(min(steer_correction, 1.0), -1.0)
+
+    # Тики задаёт панель (этот процесс — ведомый) или, при запуске отдельно, этот же планировщик
+    scheduler = TickScheduler(world, client=client)
+    scheduler.register("lka", lane_keeping_step, budget_ms=10.0)
+
     font = pygame.font.SysFont("consolas", 18)
 
     try:
@@ -121,7 +105,6 @@ def main():
                     running = False
 
             keys = pygame.key.get_pressed()
-            dt = clock.get_time() / 1000.0
 
             # Газ/тормоз
             if manual_gear:
@@ -181,20 +164,9 @@ def main():
                 elif keys[pygame.K_5]: control.gear = 5
                 elif keys[pygame.K_6]: control.gear = 6
 
-            # Lane keeping
-            if lane_keeping_enabled:
-                transform = vehicle.get_transform()
-                location = transform.location
-                rotation = transform.rotation
-                waypoint = map.get_waypoint(location, project_to_road=True, lane_type=carla.LaneType.Driving)
-                next_waypoint = waypoint.next(2.0)[0]
-                dx = next_waypoint.transform.location.x - location.x
-                dy = next_waypoint.transform.location.y - location.y
-                yaw_rad = math.radians(rotation.yaw)
-                error = -math.sin(yaw_rad) * dx + math.cos(yaw_rad) * dy
-                steer_correction = pid.run(error, dt)
-                control.steer = max(min(steer_correction, 1.0), -1.0)
-            else:
+            # Lane keeping — на тике планировщика (синхронный режим, фиксированный шаг)
+            scheduler.step()
+            if not lane_keeping_enabled:
                 control.steer = 0.0
                 if keys[pygame.K_a]: control.steer = -0.5
                 elif keys[pygame.K_d]: control.steer = 0.5
@@ -226,7 +198,6 @@ def main():
                 screen.blit(text, (10, 10 + i * 25))
 
             pygame.display.flip()
-            clock.tick(30)
 
             # Центр текущей полосы через waypoint
             lane_center_x = None
@@ -236,23 +207,26 @@ def main():
                     location = transform.location
                     forward = transform.get_forward_vector()
                     center_point = location + forward * 5.0
-                    wp = map.get_waypoint(center_point, project_to_road=True, lane_type=carla.LaneType.Driving)
+                    wp = lanes.project(center_point.x, center_point.y, center_point.z)
 
-                    dx = wp.transform.location.x - location.x
-                    dy = wp.transform.location.y - location.y
+                    dx = wp.x - location.x
+                    dy = wp.y - location.y
                     yaw = math.radians(transform.rotation.yaw)
                     rel_angle = math.atan2(dy, dx) - yaw
                     lane_center_x = int(image_data['image'].shape[1] / 2 + rel_angle * 300)
                 except:
                     pass
 
-                process_and_show_lane(image_data['image'], lane_center_x=lane_center_x)
+                tracker.process(image_data['image'], lane_center_x=lane_center_x)
 
-            if cv2.waitKey(1) & 0xFF == ord('q'):
+            if not headless and cv2.waitKey(1) & 0xFF == ord('q'):
                 running = False
 
     finally:
         print("[*] Cleaning up camera and UI...")
+        print(f"[*] {tracker}")
+        scheduler.release()
+        scheduler.print_stats()
         camera.stop()
         camera.destroy()
         pygame.quit()
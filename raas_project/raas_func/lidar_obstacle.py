@@ -0,0 +1,29 @@
+import numpy as np
+
+# Поиск препятствия в облаке точек LiDAR без CARLA: используется AutoBrakingSystem и бенчмарком
+# на сохранённых свипах (benchmarks/bench_lidar_braking.py)
+
+# Коридор перед машиной, в котором точки LiDAR считаются препятствием
+CORRIDOR_MIN_X = 0.5
+CORRIDOR_HALF_WIDTH = 2.0
+CORRIDOR_MIN_Z = -0.5
+CORRIDOR_MAX_Z = 2.0
+
+
+def lidar_points(data):
+    # raw_data — подряд идущие float32 (x, y, z, intensity), смотрим на них без копирования
+    return np.frombuffer(data.raw_data, dtype=np.float32).reshape(-1, 4)
+
+
+def find_closest_obstacle(points):
+    # points — массив (N, 4) float32, один векторный проход: маска коридора + минимум расстояния
+    x = points[:, 0]
+    y = points[:, 1]
+    z = points[:, 2]
+    mask = (x > CORRIDOR_MIN_X) & (np.abs(y) < CORRIDOR_HALF_WIDTH) & (z > CORRIDOR_MIN_Z) & (z < CORRIDOR_MAX_Z)
+    if not mask.any():
+        return False, float('inf')
+
+    xyz = points[mask, :3]
+    dist_sq = np.einsum('ij,ij->i', xyz, xyz)
+    return True, float(np.sqrt(dist_sq.min()))
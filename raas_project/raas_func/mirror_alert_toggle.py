@@ -1,39 +1,226 @@
-import carla
 import cv2
 import numpy as np
 import time
 import os
-from database_logger import DatabaseLogger
-
-def draw_alert_icon(img, icon, position="left"):
-    icon_resized = cv2.resize(icon, (130, 130))
-    h, w, _ = img.shape
-    x, y = (20, 20) if position == "left" else (w - 150, 20)
-
-    if icon.shape[2] == 4:
-        alpha = icon_resized[:, :, 3] / 255.0
-        for c in range(3):
-            img[y:y+130, x:x+130, c] = (
-                icon_resized[:, :, c] * alpha + img[y:y+130, x:x+130, c] * (1 - alpha)
-            )
-    else:
-        img[y:y+130, x:x+130] = icon_resized
-
-def camera_callback(image, store, key):
-    array = np.frombuffer(image.raw_data, dtype=np.uint8)
-    array = np.reshape(array, (image.height, image.width, 4))
-    store[key] = array[:, :, :3]
-
-def radar_callback(detections, state_dict, key):
-    danger = any(abs(d.depth) < 10 for d in detections)
-    state_dict[key] = danger
+import threading
+from database_logger import connect_logger
+from camera_frame import CameraFrame
+from perf_stats import LatencyStats
+from sensor_hub import attach_camera
+
+ICON_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "static", "photos", "alert_icon.png")
+ICON_SIZE = 130
+ICON_MARGIN = 20
+RADAR_DANGER_DEPTH_M = 10
+MIRROR_RATE_HZ = 30
+
+
+class AlertIconOverlay:
+    # Иконка готовится один раз: resize и альфа, умноженная на цвет, хранятся в uint16.
+    # Наложение — целочисленная операция над ROI кадра, на месте, без float и циклов по каналам
+    def __init__(self, icon, size=ICON_SIZE):
+        self.size = size
+        icon = cv2.resize(icon, (size, size))
+        if icon.shape[2] == 4:
+            alpha = icon[:, :, 3:4].astype(np.uint16)
+            self.premultiplied = icon[:, :, :3].astype(np.uint16) * alpha   # цвет * a, 0..255*255
+            self.inv_alpha = np.repeat(255 - alpha, 3, axis=2)             # 255 - a
+        else:
+            self.premultiplied = None
+            self.inv_alpha = None
+        self.icon_bgr = np.ascontiguousarray(icon[:, :, :3])
+        self.scratch = np.empty((size, size, 3), dtype=np.uint16)
+
+    def roi(self, img, position):
+        w = img.shape[1]
+        x = ICON_MARGIN if position == "left" else w - self.size - ICON_MARGIN
+        return img[ICON_MARGIN:ICON_MARGIN + self.size, x:x + self.size]
+
+    def draw(self, img, position="left"):
+        roi = self.roi(img, position)
+        if self.premultiplied is None:
+            roi[:] = self.icon_bgr
+            return
+        # (фон * (255 - a) + цвет * a) / 255 с округлением: деление на 255 через сдвиги
+        t = self.scratch
+        np.multiply(roi, self.inv_alpha, out=t)
+        t += self.premultiplied
+        t += 128
+        t += t >> 8
+        t >>= 8
+        roi[:] = t
+
+
+def radar_danger(data):
+    # Детекции радара CARLA: float32 (velocity, azimuth, altitude, depth)
+    points = np.frombuffer(data.raw_data, dtype=np.float32).reshape(-1, 4)
+    return bool((np.abs(points[:, 3]) < RADAR_DANGER_DEPTH_M).any())
+
+
+class MirrorAlertSystem:
+    # Боковые зеркала и предупреждения о слепых зонах внутри процесса панели.
+    # Камеры и радары зеркал создаются один раз и живут, пока работает панель; переключатель
+    # функции только меняет флаг, а кадры зеркал готовит рабочий поток
+    def __init__(self, world, vehicle, db=None, icon_path=ICON_PATH, rate_hz=MIRROR_RATE_HZ):
+        self.world = world
+        self.vehicle = vehicle
+        self.db = db
+        self.period = 1.0 / rate_hz
+        self.enabled = True
+
+        self.images = {'left': None, 'right': None}
+        self.frame_seq = {key: 0 for key in self.images}
+        self.radar_states = {'left': False, 'right': False}
+        self.logged = {'left': False, 'right': False}
+        self.sensors = []
+
+        icon = cv2.imread(icon_path, cv2.IMREAD_UNCHANGED)
+        if icon is None:
+            print(f"[!] alert_icon.png not found: {icon_path}")
+        self.overlay = AlertIconOverlay(icon) if icon is not None else None
+
+        # Последний готовый кадр (левое | правое) и его номер
+        self.frame = None
+        self.seq = 0
+        self.rendered_key = None
+
+        self.wake = threading.Event()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.toggle_requested = None
+        self.toggle_latency = LatencyStats("toggle")
+        self.render_time = LatencyStats("render", budget_ms=self.period * 1000.0)
+
+    def start(self):
+        # carla нужен только сенсорам: без них модуль (рендер, иконка) работает и без CARLA (бенчмарк)
+        import carla
+        bp_lib = self.world.get_blueprint_library()
+
+        radar_bp = bp_lib.find('sensor.other.radar')
+        radar_bp.set_attribute('horizontal_fov', '8')
+        radar_bp.set_attribute('vertical_fov', '5')
+        radar_bp.set_attribute('range', '6') #7
+        radar_transforms = {
+            'left': carla.Transform(carla.Location(x=-0.5, y=-1.0, z=1), carla.Rotation(yaw=-150)),
+            'right': carla.Transform(carla.Location(x=-0.5, y=1.0, z=1), carla.Rotation(yaw=150)),
+        }
+
+        # Камеры mirror_* из CAMERA_SPECS: из шины кадров, если запущен sensor_hub.py, иначе свои сенсоры
+        for key in ('left', 'right'):
+            cam = attach_camera(self.world, self.vehicle, f"mirror_{key}", lambda img, k=key: self.camera_callback(img, k))
+            self.sensors.append(cam)
+        for key, tf in radar_transforms.items():
+            radar = self.world.spawn_actor(radar_bp, tf, attach_to=self.vehicle)
+            radar.listen(lambda data, k=key: self.radar_callback(data, k))
+            self.sensors.append(radar)
+
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.loop, daemon=True)
+        self.thread.start()
+
+    def camera_callback(self, image, key):
+        self.frame_seq[key] += 1
+        self.images[key] = CameraFrame(image, seq=self.frame_seq[key])
+        self.wake.set()
+
+    def radar_callback(self, data, key):
+        danger = radar_danger(data)
+        if danger != self.radar_states[key]:
+            self.radar_states[key] = danger
+            self.wake.set()
+
+    def set_enabled(self, enabled):
+        # Вызывается из GUI: без запуска процессов и сенсоров, поток подхватит флаг на следующем кадре
+        self.toggle_requested = time.perf_counter()
+        self.enabled = enabled
+        self.logged = {'left': False, 'right': False}
+        self.wake.set()
+
+    def loop(self):
+        while not self.stop_event.is_set():
+            self.wake.wait(self.period)
+            self.wake.clear()
+            if self.stop_event.is_set():
+                break
+            try:
+                self.render()
+                self.log_alerts()
+            except Exception as e:
+                print(f"[!] Mirror alerts: {e}")
+
+    def render(self):
+        left, right = self.images['left'], self.images['right']
+        if left is None or right is None:
+            return
+        requested = self.toggle_requested  # раньше флага: set_enabled пишет их в обратном порядке
+        enabled = self.enabled
+        key = (left.seq, right.seq, enabled and self.radar_states['left'], enabled and self.radar_states['right'])
+        if key == self.rendered_key and requested is None:
+            return
+
+        start = time.perf_counter()
+        left_img = cv2.flip(left.bgr(), 1)
+        right_img = cv2.flip(right.bgr(), 1)
+        if self.overlay is not None:
+            if key[2]:
+                self.overlay.draw(left_img, position='left')
+            if key[3]:
+                self.overlay.draw(right_img, position='right')
+        combined = cv2.hconcat([left_img, right_img])
+
+        # Новый массив на каждый кадр: читатель держит ссылку на старый, копий под блокировкой не нужно
+        self.frame = combined
+        self.seq += 1
+        self.rendered_key = key
+        now = time.perf_counter()
+        self.render_time.add((now - start) * 1000.0)
+        if requested is not None:
+            self.toggle_requested = None
+            self.toggle_latency.add((now - requested) * 1000.0)
+            print(f"[*] Mirror alerts {'ON' if enabled else 'OFF'} on screen in {(now - requested) * 1000.0:.1f} ms")
+
+    def log_alerts(self):
+        # Одна запись в БД на каждое срабатывание, а не на каждый кадр
+        if not self.enabled or self.db is None:
+            return
+        for side in ('left', 'right'):
+            if self.radar_states[side] and not self.logged[side]:
+                self.db.log_mirror_alert(side)
+                self.logged[side] = True
+            elif not self.radar_states[side]:
+                self.logged[side] = False
+
+    def get_frame(self):
+        # (номер кадра, BGR-кадр «левое | правое») — кадр не изменяется после публикации
+        return self.seq, self.frame
+
+    def get_stats(self):
+        return {
+            "toggle": self.toggle_latency.snapshot(),
+            "render": self.render_time.snapshot(),
+            "frames": self.seq,
+        }
+
+    def stop(self):
+        self.stop_event.set()
+        self.wake.set()
+        if self.thread:
+            self.thread.join(timeout=1.0)
+            self.thread = None
+        for sensor in self.sensors:
+            sensor.stop()
+            sensor.destroy()
+        self.sensors.clear()
+        print(f"[*] Mirror alerts: {self.toggle_latency} | {self.render_time}")
+
 
 def main():
-    db = DatabaseLogger()
+    # Отдельный запуск без панели: пишем через сокет панели, если она есть, иначе напрямую в файл
+    import carla
+    db = connect_logger()
     client = carla.Client('localhost', 2000)
     client.set_timeout(5.0)
     world = client.get_world()
-    bp_lib = world.get_blueprint_library()
 
     # Выбор машины с минимальным ID
     vehicles = list(world.get_actors().filter('vehicle.*'))
@@ -43,84 +230,28 @@ def main():
     vehicle = sorted(vehicles, key=lambda v: v.id)[0]
     print(f"[+] Подключено к машине: {vehicle.type_id} (ID {vehicle.id})")
 
-    # Иконка
-    icon_path = os.path.join("..", "static", "photos", "alert_icon.png")
-    icon = cv2.imread(icon_path, cv2.IMREAD_UNCHANGED)
-    if icon is None:
-        print("alert_icon.png not found.")
-        return
-
-    # Камеры
-    cam_bp = bp_lib.find('sensor.camera.rgb')
-    cam_bp.set_attribute('image_size_x', '640')
-    cam_bp.set_attribute('image_size_y', '480')
-    cam_bp.set_attribute('fov', '90')
-    cam_tf_left = carla.Transform(carla.Location(x=0.65, y=-0.9, z=1.1), carla.Rotation(yaw=-150))
-    cam_tf_right = carla.Transform(carla.Location(x=0.65, y=0.9, z=1.1), carla.Rotation(yaw=150))
-    #x=0.8, y=-1.0, z=1.5, -150
-    #x=0.8, y=1.0, z=1.5, =150
-
-    left_cam = world.spawn_actor(cam_bp, cam_tf_left, attach_to=vehicle)
-    right_cam = world.spawn_actor(cam_bp, cam_tf_right, attach_to=vehicle)
-
-    images = {'left': None, 'right': None}
-    left_cam.listen(lambda img: camera_callback(img, images, 'left'))
-    right_cam.listen(lambda img: camera_callback(img, images, 'right'))
-
-    # Радары
-    radar_bp = bp_lib.find('sensor.other.radar')
-    radar_bp.set_attribute('horizontal_fov', '8')
-    radar_bp.set_attribute('vertical_fov', '5')
-    radar_bp.set_attribute('range', '6') #7
-
-    radar_tf_left = carla.Transform(carla.Location(x=-0.5, y=-1.0, z=1), carla.Rotation(yaw=-150))
-    radar_tf_right = carla.Transform(carla.Location(x=-0.5, y=1.0, z=1), carla.Rotation(yaw=150))
-
-    radar_states = {'left': False, 'right': False}
-    radar_left = world.spawn_actor(radar_bp, radar_tf_left, attach_to=vehicle)
-    radar_right = world.spawn_actor(radar_bp, radar_tf_right, attach_to=vehicle)
-    radar_left.listen(lambda data: radar_callback(data, radar_states, 'left'))
-    radar_right.listen(lambda data: radar_callback(data, radar_states, 'right'))
-
-    print("[*] Press Q to exit.")
+    mirrors = MirrorAlertSystem(world, vehicle, db)
+    mirrors.start()
+    print("[*] Press Q to exit, A to toggle alerts.")
 
+    shown = 0
     try:
         while True:
-            if images['left'] is not None and images['right'] is not None:
-                left_img = cv2.flip(images['left'].copy(), 1)
-                right_img = cv2.flip(images['right'].copy(), 1)
-
-                if radar_states['left']:
-                    draw_alert_icon(left_img, icon, position='left')
-                if radar_states['right']:
-                    draw_alert_icon(right_img, icon, position='right')
-
-                combined = cv2.hconcat([left_img, right_img])
-                cv2.imshow("Rear View Mirrors (Alert): Left | Right", combined)
+            seq, frame = mirrors.get_frame()
+            if frame is not None and seq != shown:
+                cv2.imshow("Rear View Mirrors (Alert): Left | Right", frame)
+                shown = seq
 
-            if cv2.waitKey(1) & 0xFF == ord('q'):
+            key = cv2.waitKey(1) & 0xFF
+            if key == ord('q'):
                 break
+            if key == ord('a'):
+                mirrors.set_enabled(not mirrors.enabled)
             time.sleep(0.03)
 
-            # === ЛОГИРУЕМ ОДИНОЧНЫЕ СРАБАТЫВАНИЯ ===
-            if radar_states['left'] and not getattr(main, "_left_logged", False):
-                db.log_mirror_alert("left")
-                main._left_logged = True
-            elif not radar_states['left']:
-                main._left_logged = False
-
-            if radar_states['right'] and not getattr(main, "_right_logged", False):
-                db.log_mirror_alert("right")
-                main._right_logged = True
-            elif not radar_states['right']:
-                main._right_logged = False
-
     finally:
         print("[*] Shutting down...")
-        left_cam.stop(), right_cam.stop()
-        radar_left.stop(), radar_right.stop()
-        left_cam.destroy(), right_cam.destroy()
-        radar_left.destroy(), radar_right.destroy()
+        mirrors.stop()
         cv2.destroyAllWindows()
 
 if __name__ == '__main__':
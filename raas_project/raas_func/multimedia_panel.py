@@ -17,32 +17,49 @@ from adaptive_cruise_control import AdaptiveCruiseControl
 from driver_fatigue_monitor import DriverFatigueMonitor
 from smart_parking import SmartParkingModule
 from emergency_braking import AutoBrakingSystem
-from database_logger import DatabaseLogger
+from database_logger import DatabaseLogger, DatabaseSinkServer, get_logger
+from database_maintenance import DatabaseMaintenance
 from camera_recorder import CameraBufferRecorder
+from mirror_alert_toggle import MirrorAlertSystem
+from tick_scheduler import TickScheduler, ControlThread
+from traffic_snapshot import TrafficSnapshot
+from vehicle_telemetry import VehicleTelemetry
 from datetime import datetime
 
 class ParkingThread(QThread):
     finished = pyqtSignal()
 
-    def __init__(self, smart_parking_module):
+    def __init__(self, smart_parking_module, scheduler=None):
         super().__init__()
         self.smart_parking_module = smart_parking_module
+        self.scheduler = scheduler
         self.stop_requested = False
 
     def run(self):
-        self.smart_parking_module.execute_parking(thread=self)
+        self.smart_parking_module.execute_parking(thread=self, scheduler=self.scheduler)
         self.finished.emit()
 
 
 class RAASPanel(QWidget):
+    # Предупреждение об усталости приходит из потока планировщика, показывается в потоке GUI
+    fatigue_warning = pyqtSignal(str)
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("RAAS Multimedia Panel")
         self.setFixedSize(1280, 720)
 
-        self.db = DatabaseLogger()
+        self.db = get_logger()
         self.db.log_system_event("start")
 
+        # Подпроцессы (например, отдельно запущенный mirror_alert_toggle.py) пишут в базу через сокет панели
+        self.db_sink = DatabaseSinkServer(self.db)
+        self.db_sink.start()
+
+        # Агрегаты, архивация старых строк и VACUUM — в фоне, не в потоке GUI
+        self.db_maintenance = DatabaseMaintenance(self.db)
+        self.db_maintenance.start()
+
         BASE_DIR = os.path.dirname(os.path.abspath(__file__))
         PARENT_DIR = os.path.dirname(BASE_DIR)
         self.static_dir = os.path.join(PARENT_DIR, "static", "photos")
@@ -84,33 +101,63 @@ class RAASPanel(QWidget):
             print("[-] Машина не найдена.")
             sys.exit()
         self.vehicle = sorted(vehicle_list, key=lambda v: v.id)[0]
-        self.cruise_control = AdaptiveCruiseControl(self.vehicle, self.world)
+        # Единые часы для ACC, AEB, контроля усталости и парковки: синхронный режим с фиксированным шагом.
+        # lane_keeping_assist.py в своём процессе подхватывает эти же тики как ведомый
+        self.scheduler = TickScheduler(self.world, client=self.client)
+        # Состояние своей машины один раз за тик: ACC, усталость, запись, экстренный вызов и AEB читают запись
+        self.telemetry = VehicleTelemetry(self.world, self.vehicle)
+        # Снимок трафика на тик для поиска машины впереди; геометрия полос догружается в фоне
+        self.traffic = TrafficSnapshot(self.world)
+        self.traffic.load_lanes(self.world.get_map())
+        self.cruise_control = AdaptiveCruiseControl(self.vehicle, self.world, self.traffic, self.telemetry)
 
         self.recorder = CameraBufferRecorder(
             camera_keys=["front", "back", "left", "right"], 
             buffer_seconds=60, 
-            post_seconds=60
+            post_seconds=60,
+            telemetry=self.telemetry
         )
         self.cam360 = Camera360(self.world, self.vehicle, recorder=self.recorder)
         self.cam360.start()
+        # Зеркала и предупреждения — в этом же процессе: сенсоры создаются один раз, переключатель только меняет флаг
+        self.mirror_alerts = MirrorAlertSystem(self.world, self.vehicle, self.db)
+        self.mirror_alerts.start()
+        self.mirror_window = QLabel()
+        self.mirror_window.setWindowTitle("Rear View Mirrors: Left | Right")
+        self.mirror_window.show()
+        self.shown_mirror_seq = 0
         self.modules = {
             "360 View": {"active": True, "object": self.cam360},
-            "Mirror Alerts": {"active": True, "proc": None}
+            "Mirror Alerts": {"active": True, "object": self.mirror_alerts}
         }
-        self.modules["Mirror Alerts"]["proc"] = subprocess.Popen(["python", "mirror_alert_toggle.py"])
 
-        self.emergency_monitor = EmergencyCallMonitor(self.world, self.vehicle, self)
+        self.emergency_monitor = EmergencyCallMonitor(self.world, self.vehicle, self, self.telemetry)
 
-        self.cruise_control = AdaptiveCruiseControl(self.vehicle, self.world)
+        self.cruise_control = AdaptiveCruiseControl(self.vehicle, self.world, self.traffic, self.telemetry)
 
-        self.fatigue_monitor = DriverFatigueMonitor(self.vehicle, self)
+        self.fatigue_warning.connect(self.show_fatigue_warning)
+        self.fatigue_monitor = DriverFatigueMonitor(self.vehicle, self, clock=self.scheduler.sim_time,
+                                                    notify=self.fatigue_warning.emit)
         self.fatigue_active = False
+        self.lane_assist_active = False
 
         self.smart_parking_module = SmartParkingModule(self.world, self.vehicle)
         self.setFocusPolicy(Qt.StrongFocus)
         self.setFocus()
 
-        self.auto_braking = AutoBrakingSystem(self.world, self.vehicle, self)
+        self.auto_braking = AutoBrakingSystem(self.world, self.vehicle, self, self.telemetry)
+
+        # AEB регистрируется при включении (toggle_auto_braking), парковка — на время манёвра
+        self.scheduler.register("telemetry", self.telemetry.on_tick, budget_ms=2.0)
+        self.scheduler.register("traffic", self.traffic.on_tick, budget_ms=5.0)
+        # ACC — в своём потоке: планировщик после снимка трафика только будит его, поэтому ни GUI,
+        # ни модули тика после него (усталость, AEB) не задерживают газ и тормоз
+        self.acc_thread = ControlThread("acc", self.cruise_control.update, self.scheduler, budget_ms=5.0)
+        self.acc_thread.start()
+        # Детектор ДТП — на каждом тике по записи телеметрии, окно вызова показывается через сигнал в GUI
+        self.scheduler.register("emergency_call", self.emergency_monitor.on_tick, budget_ms=1.0)
+        self.scheduler.register("fatigue", self.update_fatigue, budget_ms=5.0)
+        self.scheduler.start()
 
         self.timer = QTimer()
         self.timer.timeout.connect(self.update_display)
@@ -799,13 +846,15 @@ class RAASPanel(QWidget):
         self.stack.addWidget(self.view360_screen)
 
         self.selected_camera = "front"
+        self.shown_camera_frame = None  # (камера, номер кадра) уже на экране
 
 
     def set_selected_camera(self, camera_name):
         self.selected_camera = camera_name
 
     def check_reverse_gear(self):
-        control = self.vehicle.get_control()
+        record = self.telemetry.read("reverse_check")
+        control = record.control if record is not None else self.vehicle.get_control()
 
         if control.reverse:
             if self.stack.currentWidget() != self.view360_screen:
@@ -906,12 +955,9 @@ class RAASPanel(QWidget):
     def toggle_mirror_alerts(self, enabled):
         self.db.log_function_state("mirror_alerts", "ON" if enabled else "OFF")
         mod = self.modules["Mirror Alerts"]
+        mod["object"].set_enabled(enabled)
 
         if enabled:
-            if mod["proc"]:
-                mod["proc"].terminate()
-                mod["proc"].wait()
-            mod["proc"] = subprocess.Popen(["python", "mirror_alert_toggle.py"])
             mod["active"] = True
             self.mirror_btn.setText("ON")
             self.mirror_btn.setStyleSheet("""
@@ -923,10 +969,6 @@ class RAASPanel(QWidget):
                 }
             """)
         else:
-            if mod["proc"]:
-                mod["proc"].terminate()
-                mod["proc"].wait()
-            mod["proc"] = subprocess.Popen(["python", os.path.abspath(os.path.join("..", "main_func", "side_mirror_cameras.py"))])
             mod["active"] = False
             self.mirror_btn.setText("OFF")
             self.mirror_btn.setStyleSheet("""
@@ -972,55 +1014,42 @@ class RAASPanel(QWidget):
         self.confirmation_timer.stop()
 
     def update_display(self):
-        self.cruise_control.update()
         if self.modules["360 View"]["active"]:
-            surface = self.modules["360 View"]["object"].get_surface()
-            if surface:
-                raw = pygame.image.tostring(surface, "RGB")
-                w, h = surface.get_size()
-                qimg = QImage(raw, w, h, QImage.Format_RGB888)
-                if self.modules["360 View"]["active"]:
-                    cam360 = self.modules["360 View"]["object"]
-                    surface_360 = cam360.get_surface()
-                    if surface_360:
-                        raw_360 = pygame.image.tostring(surface_360, "RGB")
-                        w, h = surface_360.get_size()
-                        img_360 = QImage(raw_360, w, h, QImage.Format_RGB888)
-                        self.display_left.setPixmap(QPixmap.fromImage(img_360))
-
-                    selected = self.selected_camera
-                    surface_cam = cam360.image_data.get(selected)
-                    if surface_cam:
-                        raw_sel = pygame.image.tostring(surface_cam, "RGB")
-                        w, h = surface_cam.get_size()
-                        img_sel = QImage(raw_sel, w, h, QImage.Format_RGB888)
-                        pixmap_sel = QPixmap.fromImage(img_sel).scaled(540, 540, Qt.KeepAspectRatio)
-                        self.display_right.setPixmap(pixmap_sel)
+            cam360 = self.modules["360 View"]["object"]
+            # Композит пересобирается только при новом кадре хотя бы одной камеры
+            canvas, changed = cam360.get_composite()
+            if changed:
+                h, w = canvas.shape[:2]
+                img_360 = QImage(canvas.data, w, h, 4 * w, QImage.Format_RGB32)
+                self.display_left.setPixmap(QPixmap.fromImage(img_360))
+
+            selected = self.selected_camera
+            frame_cam = cam360.image_data.get(selected)
+            if frame_cam is not None and (selected, frame_cam.seq) != self.shown_camera_frame:
+                # BGRA-буфер CARLA совпадает с QImage.Format_RGB32 — без конвертации цвета
+                bgra = frame_cam.bgra()
+                img_sel = QImage(bgra.data, frame_cam.width, frame_cam.height, 4 * frame_cam.width, QImage.Format_RGB32)
+                pixmap_sel = QPixmap.fromImage(img_sel).scaled(540, 540, Qt.KeepAspectRatio)
+                self.display_right.setPixmap(pixmap_sel)
+                self.shown_camera_frame = (selected, frame_cam.seq)
+
+        # Кадр зеркал готовит поток MirrorAlertSystem; здесь только показываем новый
+        seq, mirror_frame = self.mirror_alerts.get_frame()
+        if mirror_frame is not None and seq != self.shown_mirror_seq:
+            h, w = mirror_frame.shape[:2]
+            img_mirror = QImage(mirror_frame.data, w, h, 3 * w, QImage.Format_RGB888).rgbSwapped()
+            self.mirror_window.setPixmap(QPixmap.fromImage(img_mirror))
+            self.shown_mirror_seq = seq
 
         if hasattr(self, "cruise_toggle_btn"):
-            if self.cruise_control.enabled:
+            # Состояние ACC — снимок, опубликованный потоком управления; блокировок нет.
+            # Кнопка и надпись берут один и тот же снимок, чтобы не расходиться между собой
+            status = self.cruise_control.status
+            if status.enabled:
                 self.cruise_toggle_btn.setText("Cruise ON")
             else:
                 self.cruise_toggle_btn.setText("Cruise OFF")
-            self.update_cruise_speed_label()
-
-        if self.fatigue_active:
-            control = self.vehicle.get_control()
-            self.fatigue_monitor.update_driver_input(
-                throttle=control.throttle,
-                brake=control.brake,
-                steer=control.steer,
-                lane_keeping_enabled=self.lane_btn.isChecked(),
-                cruise_enabled=self.cruise_control.enabled
-            )
-            lights = self.vehicle.get_light_state()
-            left_signal = bool(lights & carla.VehicleLightState.LeftBlinker)
-            right_signal = bool(lights & carla.VehicleLightState.RightBlinker)
-            if abs(control.steer) > 0.3:
-                self.fatigue_monitor.register_lane_departure(
-                    left_signal_on=left_signal,
-                    right_signal_on=right_signal
-                )
+            self.update_cruise_speed_label(status)
 
         if self.stack.currentWidget() == self.app_screens["smart_parking"]:
             images = self.smart_parking_module.get_processed_images()
@@ -1049,6 +1078,30 @@ class RAASPanel(QWidget):
                 self.park_button.setEnabled(False)
 
 
+    def update_fatigue(self, tick):
+        # Модуль TickScheduler: вызывается на каждом тике симуляции в потоке планировщика
+        if not self.fatigue_active:
+            return
+        record = self.telemetry.read("fatigue", calls=2)
+        if record is None:
+            return
+        control = record.control
+        self.fatigue_monitor.update_driver_input(
+            throttle=control.throttle,
+            brake=control.brake,
+            steer=control.steer,
+            lane_keeping_enabled=self.lane_assist_active,
+            cruise_enabled=self.cruise_control.enabled
+        )
+        lights = record.light_state
+        left_signal = bool(lights & carla.VehicleLightState.LeftBlinker)
+        right_signal = bool(lights & carla.VehicleLightState.RightBlinker)
+        if abs(control.steer) > 0.3:
+            self.fatigue_monitor.register_lane_departure(
+                left_signal_on=left_signal,
+                right_signal_on=right_signal
+            )
+
     def init_smart_parking_screen(self):
         self.smart_parking_screen = QWidget()
         self.smart_parking_screen.setStyleSheet("background-color: transparent;")
@@ -1117,7 +1170,7 @@ class RAASPanel(QWidget):
         self.park_button.setEnabled(False)
         self.stop_button.show()
 
-        self.parking_thread = ParkingThread(self.smart_parking_module)
+        self.parking_thread = ParkingThread(self.smart_parking_module, self.scheduler)
         self.parking_thread.finished.connect(self.on_parking_finished)
         self.parking_thread.start()
 
@@ -1136,6 +1189,7 @@ class RAASPanel(QWidget):
 
     def toggle_lane_assist(self, enabled):
         self.db.log_function_state("lane_assist", "ON" if enabled else "OFF")
+        self.lane_assist_active = enabled   # читается в потоке планировщика вместо self.lane_btn
         # Завершаем custom_control.py, если его окно открыто
         try:
             subprocess.run(['taskkill', '/f', '/fi', 'WINDOWTITLE eq RAAS Control Panel'], shell=True)
@@ -1257,7 +1311,7 @@ class RAASPanel(QWidget):
     def toggle_auto_braking(self, enabled):
         self.db.log_function_state("auto_braking", "ON" if enabled else "OFF")
         if enabled:
-            self.auto_braking.start()
+            self.auto_braking.start(self.scheduler)
             print("[*] Auto braking system enabled.")
             self.brake_btn.setText("ON")
             self.brake_btn.setStyleSheet("""
@@ -1365,9 +1419,10 @@ class RAASPanel(QWidget):
         else:
             self.cruise_control.disable()
             self.cruise_toggle_btn.setText("Cruise OFF")
-        self.update_cruise_speed_label()
+        status = self.cruise_control.status
+        self.update_cruise_speed_label(status)
 
-        if self.cruise_control.enabled:
+        if status.enabled:
             self.cruise_toggle_btn.setText("Cruise ON")
             self.cruise_toggle_btn.setStyleSheet("""
                 QPushButton {
@@ -1396,10 +1451,15 @@ class RAASPanel(QWidget):
         self.cruise_control.decrease_speed()
         self.update_cruise_speed_label()
 
-    def update_cruise_speed_label(self):
-        if self.cruise_control.enabled:
-            kmh = int(self.cruise_control.target_speed * 3.6)
-            self.speed_label.setText(f"Скорость удержания: {kmh} км/ч")
+    def update_cruise_speed_label(self, status=None):
+        if status is None:
+            status = self.cruise_control.status
+        if status.enabled:
+            kmh = int(status.target_speed * 3.6)
+            text = f"Скорость удержания: {kmh} км/ч"
+            if status.mode == "gap":
+                text += f"\nДистанция: {status.lead_distance:.0f} м"
+            self.speed_label.setText(text)
         else:
             self.speed_label.setText("Скорость удержания: 0 км/ч")
 
@@ -1411,13 +1471,21 @@ class RAASPanel(QWidget):
         for name, mod in self.modules.items():
             if name == "360 View" and mod["active"]:
                 mod["object"].stop()
-            if name == "Mirror Alerts" and mod["proc"]:
-                mod["proc"].terminate()
-                mod["proc"].wait()
+            if name == "Mirror Alerts":
+                mod["object"].stop()
+                self.mirror_window.close()
         self.emergency_monitor.stop()
+        self.auto_braking.stop()
+        self.acc_thread.stop()
+        self.scheduler.stop()   # вернуть асинхронный режим, иначе симулятор останется ждать тиков
+        print(f"[*] {self.traffic}")
+        print(f"[*] {self.telemetry}")
         self.stack.setCurrentWidget(self.exit_screen)
         self.exit_movie_label.movie().start()
         self.db.log_system_event("stop")
+        self.db_sink.stop()
+        self.db_maintenance.stop()
+        DatabaseLogger.shutdown_all()
         QTimer.singleShot(5000, QApplication.instance().quit)
 
     def init_app_screens(self):
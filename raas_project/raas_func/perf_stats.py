@@ -0,0 +1,76 @@
+import bisect
+import threading
+
+
+class LatencyStats:
+    # Потокобезопасный счётчик задержек одного этапа (в миллисекундах)
+    def __init__(self, name, budget_ms=None):
+        self.name = name
+        self.budget_ms = budget_ms
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.last_ms = 0.0
+        self.over_budget = 0
+
+    def add(self, value_ms):
+        with self.lock:
+            self.count += 1
+            self.total_ms += value_ms
+            self.last_ms = value_ms
+            if value_ms > self.max_ms:
+                self.max_ms = value_ms
+            if self.budget_ms is not None and value_ms > self.budget_ms:
+                self.over_budget += 1
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "count": self.count,
+                "avg_ms": self.total_ms / self.count if self.count else 0.0,
+                "max_ms": self.max_ms,
+                "last_ms": self.last_ms,
+                "over_budget": self.over_budget,
+            }
+
+    def __str__(self):
+        s = self.snapshot()
+        text = f"{self.name}: n={s['count']} avg={s['avg_ms']:.2f} ms max={s['max_ms']:.2f} ms"
+        if self.budget_ms is not None:
+            text += f" over {self.budget_ms:.0f} ms: {s['over_budget']}"
+        return text
+
+
+class Histogram:
+    # Потокобезопасная гистограмма значений (мс): edges_ms — верхние границы корзин, последняя корзина — «больше»
+    def __init__(self, name, edges_ms):
+        self.name = name
+        self.edges_ms = list(edges_ms)
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.counts = [0] * (len(self.edges_ms) + 1)
+
+    def add(self, value_ms):
+        index = bisect.bisect_left(self.edges_ms, value_ms)
+        with self.lock:
+            self.counts[index] += 1
+
+    def labels(self):
+        bounds = [0.0] + self.edges_ms
+        labels = [f"{lo:g}-{hi:g} ms" for lo, hi in zip(bounds, self.edges_ms)]
+        return labels + [f">{self.edges_ms[-1]:g} ms"]
+
+    def snapshot(self):
+        with self.lock:
+            counts = list(self.counts)
+        return dict(zip(self.labels(), counts))
+
+    def __str__(self):
+        buckets = " | ".join(f"{label}: {count}" for label, count in self.snapshot().items())
+        return f"{self.name}: {buckets}"
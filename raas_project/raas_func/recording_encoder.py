@@ -0,0 +1,263 @@
+import os
+import time
+import queue
+import threading
+import multiprocessing as mp
+from datetime import datetime
+from multiprocessing import shared_memory
+import numpy as np
+import cv2
+from frame_ring_buffer import decode_frame
+
+# spawn, а не fork: в панели работают потоки CARLA и Qt, копировать их состояние в дочерний процесс нельзя
+MP_CONTEXT = mp.get_context("spawn")
+
+DEFAULT_SLOTS = 32          # кадров «в полёте» на одну камеру
+WORKER_TIMEOUT_SEC = 10.0   # сколько ждать свободный слот, прежде чем проверить, жив ли процесс
+
+
+def draw_overlay(frame, ts, speed):
+    # Время и скорость в правом верхнем углу (мелкий шрифт)
+    h, w = frame.shape[:2]
+    dt = datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S")
+    overlay_text = f"{dt}  |  {int(speed)} km/h"
+
+    font_scale = 0.4
+    thickness = 1
+    color = (255, 255, 255)
+
+    text_size, _ = cv2.getTextSize(overlay_text, cv2.FONT_HERSHEY_SIMPLEX, font_scale, thickness)
+    text_x = w - text_size[0] - 10
+    text_y = 15
+
+    cv2.putText(frame, overlay_text, (text_x, text_y), cv2.FONT_HERSHEY_SIMPLEX, font_scale, color, thickness, cv2.LINE_AA)
+
+
+def encode_worker(jobs, free, results):
+    # Долгоживущий процесс кодирования одной камеры: запускается один раз и кодирует ролик за роликом.
+    # jobs: заголовок ролика (clip, shm_name, n_slots, frame_shape, out_path, fps), затем кадры
+    # (slot, nbytes, ts, speed, repeat) и None в конце ролика; None вместо заголовка — выход.
+    # nbytes > 0 — в слоте JPEG, 0 — сырой BGR-кадр; repeat — сколько тактов видео кадр держится на экране.
+    # free: (clip, slot) освободившихся слотов обратно продюсеру
+    while True:
+        header = jobs.get()
+        if header is None:
+            break
+        clip, shm_name, n_slots, frame_shape, out_path, fps = header
+        shm = shared_memory.SharedMemory(name=shm_name)   # слоты выделяются продюсером на каждый ролик
+        h, w = frame_shape[:2]
+        slots = np.ndarray((n_slots, h * w * 3), dtype=np.uint8, buffer=shm.buf)
+        writer = cv2.VideoWriter(out_path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (w, h))
+
+        frames = 0
+        busy = 0.0
+        frame = None
+        try:
+            while True:
+                item = jobs.get()
+                if item is None:
+                    break
+                slot, nbytes, ts, speed, repeat = item
+                start = time.perf_counter()
+                if nbytes:
+                    frame = cv2.imdecode(slots[slot, :nbytes], cv2.IMREAD_COLOR)
+                    if frame.shape[:2] != (h, w):
+                        frame = cv2.resize(frame, (w, h))
+                else:
+                    frame = slots[slot].reshape(h, w, 3)
+                draw_overlay(frame, ts, speed)
+                for _ in range(repeat):
+                    writer.write(frame)
+                busy += time.perf_counter() - start
+                frames += repeat
+                free.put((clip, slot))
+        finally:
+            writer.release()
+            frame = None
+            del slots  # виды на shm.buf должны исчезнуть до close()
+            shm.close()
+            results.put({"clip": clip, "path": out_path, "frames": frames, "encode_sec": busy})
+
+
+class EncoderWorker:
+    # Процесс кодирования одной камеры. Живёт между инцидентами: запуск интерпретатора с numpy и cv2
+    # (spawn) стоит дольше кодирования короткого ролика. Ролики одной камеры идут по очереди (self.lock)
+    def __init__(self, name):
+        self.name = name
+        self.lock = threading.Lock()
+        self.jobs = MP_CONTEXT.Queue()
+        self.free = MP_CONTEXT.Queue()
+        self.results = MP_CONTEXT.Queue()
+        self.proc = MP_CONTEXT.Process(target=encode_worker, name=f"encoder-{name}", daemon=True,
+                                       args=(self.jobs, self.free, self.results))
+        self.proc.start()
+        self.clip = 0
+
+    def is_alive(self):
+        return self.proc.is_alive()
+
+    def close(self):
+        if self.proc.is_alive():
+            self.jobs.put(None)
+            self.proc.join(WORKER_TIMEOUT_SEC)
+        if self.proc.is_alive():
+            self.proc.terminate()
+
+
+def is_raw_frame(frame):
+    # Сырой кадр — массив HxWx3; всё остальное (bytes, одномерный массив) — JPEG
+    return isinstance(frame, np.ndarray) and frame.ndim == 3
+
+
+def frame_repeats(timestamps, fps):
+    # Сколько тактов постоянного fps показывать каждый кадр, чтобы ролик шёл в реальном времени:
+    # кадр держится от своего такта до такта следующего; 0 — два кадра попали в один такт
+    ts = np.asarray(timestamps, dtype=np.float64)
+    ticks = np.floor((ts - ts[0]) * fps + 0.5).astype(np.int64)
+    ticks = np.maximum.accumulate(ticks)
+    ends = np.append(ticks[1:], ticks[-1] + 1)
+    return ends - ticks
+
+
+class RecordingEncoder:
+    # Кодирование записей вне процесса панели: по долгоживущему процессу на камеру, кадры передаются
+    # через кольцо слотов в shared memory, по очередям ходят только номера слотов
+    def __init__(self, slots=DEFAULT_SLOTS, parallel=None):
+        self.slots = slots
+        # Сколько камер кодируется одновременно: больше, чем ядер, — только переключения между процессами
+        self.parallel = threading.Semaphore(parallel or os.cpu_count() or 1)
+        self.workers = {}
+        self.workers_lock = threading.Lock()
+
+    def start(self, keys):
+        # Процессы можно поднять заранее (при запуске рекордера), чтобы первый инцидент не ждал spawn
+        for key in keys:
+            self.get_worker(key)
+
+    def get_worker(self, key):
+        with self.workers_lock:
+            worker = self.workers.get(key)
+            if worker is None or not worker.is_alive():
+                if worker is not None:
+                    print(f"[!] Encoder process for {key} exited with code {worker.proc.exitcode}, restarting")
+                    worker.close()
+                worker = EncoderWorker(key)
+                self.workers[key] = worker
+            return worker
+
+    def close(self):
+        with self.workers_lock:
+            workers, self.workers = list(self.workers.values()), {}
+        for worker in workers:
+            worker.close()
+
+    def encode_all(self, jobs):
+        # jobs: {key: (out_path, frames, fps)}, frames — список (frame, ts, speed) по возрастанию ts,
+        # frame — BGR-массив или JPEG-байты (CompressedFrameRing.snapshot()); fps — частота ролика.
+        # Камеры кодируются параллельно; возвращает {key: статистика}
+        stats = {}
+        threads = []
+        for key, (out_path, frames, fps) in jobs.items():
+            if not frames:
+                continue
+            t = threading.Thread(target=self.encode_into, args=(stats, key, out_path, frames, fps), daemon=True)
+            t.start()
+            threads.append(t)
+        for t in threads:
+            t.join()
+        return stats
+
+    def encode_into(self, stats, key, out_path, frames, fps):
+        try:
+            with self.parallel:
+                stats[key] = self.encode(out_path, frames, fps, key)
+        except Exception as e:
+            print(f"[!] Encoding {key} failed: {e}")
+
+    def encode(self, out_path, frames, fps, key="default"):
+        start = time.perf_counter()
+        first = frames[0][0]
+        if not is_raw_frame(first):
+            first = decode_frame(first)
+        h, w = first.shape[:2]
+        frame_shape = (h, w, 3)
+        slot_size = h * w * 3
+        repeats = frame_repeats([ts for _, ts, _ in frames], fps)
+        result = {"path": out_path, "frames": 0, "encode_sec": 0.0}
+
+        n_slots = min(self.slots, len(frames))
+
+        worker = self.get_worker(key)
+        with worker.lock:
+            worker.clip += 1
+            clip, proc = worker.clip, worker.proc
+            shm = shared_memory.SharedMemory(create=True, size=n_slots * slot_size)
+            slots = np.ndarray((n_slots, slot_size), dtype=np.uint8, buffer=shm.buf)
+            try:
+                worker.jobs.put((clip, shm.name, n_slots, frame_shape, out_path, fps))
+                free_slots = list(range(n_slots))
+                for (frame, ts, speed), repeat in zip(frames, repeats):
+                    if not repeat:
+                        continue
+                    if free_slots:
+                        slot = free_slots.pop()
+                    else:
+                        slot = self.wait_free_slot(worker.free, proc, clip)
+                        if slot is None:
+                            break
+                    if not is_raw_frame(frame) and len(frame) > slot_size:
+                        frame = decode_frame(frame)
+                    if is_raw_frame(frame):
+                        if frame.shape[:2] != (h, w):
+                            frame = cv2.resize(frame, (w, h))
+                        slots[slot] = frame.reshape(-1)
+                        worker.jobs.put((slot, 0, ts, speed, int(repeat)))
+                    else:
+                        # Сжатый кадр распаковывается уже в процессе кодирования
+                        n = len(frame)
+                        slots[slot, :n] = np.frombuffer(frame, dtype=np.uint8)
+                        worker.jobs.put((slot, n, ts, speed, int(repeat)))
+                worker.jobs.put(None)
+                result = self.wait_result(worker.results, proc, clip) or result
+                result.pop("clip", None)
+            finally:
+                del slots
+                shm.close()
+                shm.unlink()
+
+        result["source_frames"] = len(frames)
+        result["dropped"] = int((repeats == 0).sum())
+        result["duplicated"] = int((repeats[repeats > 1] - 1).sum())
+        result["total_sec"] = time.perf_counter() - start
+        result["fps"] = result["frames"] / result["encode_sec"] if result["encode_sec"] else 0.0
+        return result
+
+    def wait_free_slot(self, free, proc, clip):
+        # Слоты, освобождённые прошлым роликом этой камеры, пропускаем: у нового ролика свой счёт
+        while True:
+            try:
+                done_clip, slot = free.get(timeout=WORKER_TIMEOUT_SEC)
+                if done_clip == clip:
+                    return slot
+            except queue.Empty:
+                if not proc.is_alive():
+                    print(f"[!] Encoder process exited with code {proc.exitcode}")
+                    return None
+
+    def wait_result(self, results, proc, clip):
+        while True:
+            try:
+                result = results.get(timeout=1.0)
+                if result["clip"] == clip:
+                    return result
+            except queue.Empty:
+                if not proc.is_alive():
+                    # Процесс мог успеть отправить итог прямо перед выходом
+                    try:
+                        result = results.get(timeout=1.0)
+                        if result["clip"] == clip:
+                            return result
+                    except queue.Empty:
+                        pass
+                    print(f"[!] Encoder process exited with code {proc.exitcode} without a result")
+                    return None
@@ -0,0 +1,129 @@
+import sys
+import time
+import signal
+from frame_bus import FrameBusWriter, FrameBusReader, BusSubscriber, READER_TOUCH_SEC
+
+# Все камеры RAAS в одном месте: имя -> размещение и параметры.
+# Функции просят камеру по имени; если SensorHub запущен, кадры приходят из шины,
+# и симулятор рендерит каждую точку обзора один раз, сколько бы модулей её ни читали
+CAMERA_SPECS = {
+    # 360-обзор (camera_360_view.py)
+    "360_front": {"location": (2.42, 0.0, 0.9), "yaw": 0, "size": (320, 240), "fov": 120},
+    "360_back": {"location": (-2.47, 0.0, 1.15), "yaw": 180, "size": (320, 240), "fov": 120},
+    "360_left": {"location": (0.75, -1.1, 1.1), "yaw": -90, "size": (320, 240), "fov": 120},
+    "360_right": {"location": (0.75, 1.1, 1.1), "yaw": 90, "size": (320, 240), "fov": 120},
+    # Боковые зеркала (mirror_alert_toggle.py, side_mirror_cameras.py)
+    "mirror_left": {"location": (0.65, -0.9, 1.1), "yaw": -150, "size": (640, 480), "fov": 90},
+    "mirror_right": {"location": (0.65, 0.9, 1.1), "yaw": 150, "size": (640, 480), "fov": 90},
+    # Камера удержания полосы (lane_keeping_assist.py)
+    "lane": {"location": (1.5, 0.0, 2.4), "yaw": 0, "size": (640, 480), "fov": 90},
+}
+
+# Сенсор камеры снимается, если её столько секунд никто не читал
+CAMERA_IDLE_SEC = 3.0
+
+
+def spawn_camera(world, vehicle, name):
+    # carla — только здесь и в main(): модули, которые берут камеры через attach_camera, импортируются без CARLA
+    import carla
+    spec = CAMERA_SPECS[name]
+    camera_bp = world.get_blueprint_library().find('sensor.camera.rgb')
+    camera_bp.set_attribute('image_size_x', str(spec["size"][0]))
+    camera_bp.set_attribute('image_size_y', str(spec["size"][1]))
+    camera_bp.set_attribute('fov', str(spec["fov"]))
+    x, y, z = spec["location"]
+    transform = carla.Transform(carla.Location(x=x, y=y, z=z), carla.Rotation(yaw=spec["yaw"]))
+    return world.spawn_actor(camera_bp, transform, attach_to=vehicle)
+
+
+def attach_camera(world, vehicle, name, callback):
+    # Камера по имени: из шины, если продюсер её публикует, иначе свой сенсор (как раньше).
+    # Возвращает объект с stop()/destroy() в обоих случаях
+    reader = FrameBusReader.attach(name)
+    if reader is not None:
+        print(f"[*] Camera '{name}': reading from the frame bus")
+        return BusSubscriber(reader, callback)
+    camera = spawn_camera(world, vehicle, name)
+    camera.listen(callback)
+    return camera
+
+
+class SensorHub:
+    # Процесс-продюсер: владеет камерами на машине и публикует их кадры в шину.
+    # Сегменты шины создаются сразу (к ним можно подключиться), а сенсор камеры живёт, только пока
+    # её читают: выключенные функции панели не заставляют симулятор рендерить их камеры
+    def __init__(self, world, vehicle, cameras=None, idle_sec=CAMERA_IDLE_SEC):
+        self.world = world
+        self.vehicle = vehicle
+        self.names = list(cameras or CAMERA_SPECS)
+        self.idle_sec = idle_sec
+        self.writers = {}
+        self.sensors = {}
+        self.spawns = 0
+
+    def start(self):
+        for name in self.names:
+            width, height = CAMERA_SPECS[name]["size"]
+            self.writers[name] = FrameBusWriter(name, width, height)
+        print(f"[*] Sensor hub: offering {', '.join(self.names)} (cameras spawn when read)")
+
+    def update(self):
+        # Вызывается периодически: поднимает камеры, которые начали читать, и снимает забытые
+        for name, writer in self.writers.items():
+            idle = writer.reader_idle_sec()
+            sensor = self.sensors.get(name)
+            if sensor is None and idle < self.idle_sec:
+                camera = spawn_camera(self.world, self.vehicle, name)
+                camera.listen(lambda image, w=writer: w.publish(image.raw_data, image.frame, image.timestamp))
+                self.sensors[name] = camera
+                self.spawns += 1
+                print(f"[*] Sensor hub: {name} camera spawned")
+            elif sensor is not None and idle >= self.idle_sec:
+                self.destroy_sensor(name)
+                print(f"[*] Sensor hub: {name} camera removed (no readers for {idle:.0f} s)")
+
+    def destroy_sensor(self, name):
+        sensor = self.sensors.pop(name)
+        sensor.stop()
+        sensor.destroy()
+
+    def stop(self):
+        for name in list(self.sensors):
+            self.destroy_sensor(name)
+        for name, writer in self.writers.items():
+            print(f"[*] Sensor hub: {name} published {writer.published} frames")
+            writer.close()
+        self.writers.clear()
+
+
+def main():
+    # python sensor_hub.py [камера ...] — без аргументов предлагаются все камеры из CAMERA_SPECS;
+    # сенсор каждой создаётся, только когда её начинают читать
+    import carla
+    names = sys.argv[1:] or None
+    client = carla.Client('localhost', 2000)
+    client.set_timeout(10.0)
+    world = client.get_world()
+
+    vehicles = list(world.get_actors().filter('vehicle.*'))
+    if not vehicles:
+        print("[-] No vehicle found.")
+        return
+    vehicle = sorted(vehicles, key=lambda v: v.id)[0]
+    print(f"[+] Connected to: {vehicle.type_id} (ID {vehicle.id})")
+
+    running = [True]
+    signal.signal(signal.SIGINT, lambda sig, frame: running.__setitem__(0, False))
+
+    hub = SensorHub(world, vehicle, names)
+    hub.start()
+    try:
+        while running[0]:
+            hub.update()
+            time.sleep(READER_TOUCH_SEC)
+    finally:
+        hub.stop()
+
+
+if __name__ == '__main__':
+    main()
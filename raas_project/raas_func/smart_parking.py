@@ -4,11 +4,13 @@ import cv2
 import time
 import math
 import json
-from database_logger import DatabaseLogger
+from database_logger import get_logger
+from tick_scheduler import TickScheduler
+from control_replay import ControlReplay
 
 class SmartParkingModule:
     def __init__(self, world, vehicle):
-        self.db = DatabaseLogger()
+        self.db = get_logger()
         self.world = world
         self.vehicle = vehicle
         self.running = False
@@ -118,7 +120,9 @@ class SmartParkingModule:
             s.stop()
             s.destroy()
 
-    def execute_parking(self, thread=None):
+    def execute_parking(self, thread=None, scheduler=None):
+        # Манёвр — воспроизведение записанного пути по тикам планировщика (время симуляции, а не time.time()).
+        # Без общего планировщика панели поднимаем свой на время манёвра
         if not self.VALID_PARKING_POINT or not self.PARKING_SIDE:
             print("[!] No valid parking point detected.")
             return
@@ -129,58 +133,36 @@ class SmartParkingModule:
             print("[!] Path not found.")
             return
 
-        self.drive_to_start(path_data[0]['x'], path_data[0]['y'])
+        own_scheduler = scheduler is None
+        if own_scheduler:
+            scheduler = TickScheduler(self.world)
+            scheduler.start()
 
-        print("[*] Starting parking maneuver...")
-
-        start_ts = path_data[0]['timestamp']
-        for step in path_data:
-            step["timestamp"] -= start_ts
-
-        start_time = time.time()
-        i = 0
-
-        self.db.log_smart_parking("start", self.PARKING_SIDE)
-
-        while i < len(path_data):
-            if thread and getattr(thread, "stop_requested", False):
-                print("[!] Parking cancelled by user.")
-                self.vehicle.apply_control(carla.VehicleControl(throttle=0.0, brake=1.0))
-                self.world.tick()
-                self.db.log_smart_parking("stop", self.PARKING_SIDE)
-                return
-
-
-            current_time = time.time() - start_time
-            target_time = path_data[i]["timestamp"]
-
-            if current_time >= target_time:
-                step = path_data[i]
-
-                control = carla.VehicleControl(
-                    throttle=step["throttle"],
-                    steer=step["steer"],
-                    brake=step["brake"],
-                    reverse=step["reverse"],
-                    hand_brake=step.get("hand_brake", False)
-                )
-
-                if step.get("manual_gear", False):
-                    control.manual_gear_shift = True
-                    control.gear = step.get("gear", 0)
-                else:
-                    control.manual_gear_shift = False
-
-                self.vehicle.apply_control(control)
-                self.world.tick()
-                i += 1
-            else:
-                self.world.tick()
-
-        self.vehicle.apply_control(carla.VehicleControl(throttle=0.0, brake=1.0))
-        self.world.tick()
-        self.db.log_smart_parking("stop", self.PARKING_SIDE)
-        print("[*] Parking complete.")
+        try:
+            self.drive_to_start(path_data[0]['x'], path_data[0]['y'])
+
+            print("[*] Starting parking maneuver...")
+            self.db.log_smart_parking("start", self.PARKING_SIDE)
+
+            replay = ControlReplay(self.vehicle, path_data)
+            scheduler.register("parking", replay.on_tick)
+            try:
+                while not replay.done.wait(0.1):
+                    if thread and getattr(thread, "stop_requested", False):
+                        print("[!] Parking cancelled by user.")
+                        break
+            finally:
+                scheduler.unregister("parking")
+
+            self.vehicle.apply_control(carla.VehicleControl(throttle=0.0, brake=1.0))
+            self.db.log_smart_parking("stop", self.PARKING_SIDE)
+            if replay.done.is_set():
+                print("[*] Parking complete.")
+        finally:
+            if own_scheduler:
+                last = scheduler.last_tick
+                scheduler.wait_tick(last.index if last else -1)   # тормоз должен попасть в симуляцию
+                scheduler.stop()
 
     def drive_to_start(self, start_x, start_y, tolerance=1.0):
         while True:
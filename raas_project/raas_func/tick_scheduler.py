@@ -0,0 +1,375 @@
+import time
+import socket
+import threading
+import traceback
+from perf_stats import LatencyStats, Histogram
+
+FIXED_DELTA = 1.0 / 30     # шаг симуляции, с (CARLA запускается с -fps=30)
+FOLLOWER_TIMEOUT = 2.0     # сколько ведомый ждёт тика, прежде чем проверить, жив ли владелец
+TAKEOVER_TIMEOUTS = 3      # столько таймаутов подряд при включённом синхронном режиме — владелец умер
+OWNER_LOCK_ADDRESS = ("127.0.0.1", 50556)   # локальный порт-замок: кто из процессов RAAS двигает симуляцию
+JITTER_EDGES_MS = (0.5, 1.0, 2.0, 5.0, 10.0, 20.0)   # корзины гистограммы джиттера ControlThread
+
+
+class TickInfo:
+    # Один шаг симуляции: порядковый номер тика с запуска планировщика, кадр CARLA,
+    # время симуляции и шаг (с), момент начала обработки (perf_counter) и WorldSnapshot этого тика
+    def __init__(self, index, frame, sim_time, delta, wall_time, snapshot=None):
+        self.index = index
+        self.frame = frame
+        self.sim_time = sim_time
+        self.delta = delta
+        self.wall_time = wall_time
+        self.snapshot = snapshot
+
+
+class OwnerLock:
+    # Межпроцессный замок владельца тиков: занятый локальный порт. get_settings()/apply_settings() не
+    # атомарны, и два процесса, стартовавшие вместе, оба увидели бы асинхронный режим; владельцем
+    # становится только тот, кто занял порт. Порт освобождает ОС, даже если процесс упал
+    def __init__(self, address=OWNER_LOCK_ADDRESS):
+        self.address = address
+        self.sock = None
+
+    def try_acquire(self):
+        if self.sock is not None:
+            return True
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        try:
+            if hasattr(socket, "SO_EXCLUSIVEADDRUSE"):
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_EXCLUSIVEADDRUSE, 1)
+            sock.bind(self.address)
+        except OSError:
+            sock.close()
+            return False
+        self.sock = sock
+        return True
+
+    def release(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+
+class ScheduledModule:
+    def __init__(self, name, callback, budget_ms, every):
+        self.name = name
+        self.callback = callback
+        self.every = every            # вызывать раз в every тиков
+        self.stats = LatencyStats(name, budget_ms)
+        self.errors = 0
+
+
+class TickScheduler:
+    # Единые часы для контуров управления RAAS. Владелец включает синхронный режим CARLA с фиксированным
+    # шагом и сам вызывает world.tick(); если режим уже включён другим процессом, планировщик становится
+    # ведомым и получает те же тики через world.wait_for_tick(). Модули вызываются по порядку регистрации
+    # в потоке, который делает step(), с TickInfo и бюджетом; превышения бюджета считаются по модулям.
+    # При том же fixed_delta и тех же входах (см. control_replay.py) прогон повторяется тик в тик
+    def __init__(self, world, fixed_delta=FIXED_DELTA, client=None, realtime=True, lock_address=OWNER_LOCK_ADDRESS):
+        self.world = world
+        self.client = client          # нужен, чтобы перевести Traffic Manager в синхронный режим
+        self.fixed_delta = fixed_delta
+        self.realtime = realtime      # владелец выдерживает шаг по настенным часам (для водителя за рулём)
+        self.modules = []             # заменяется целиком при регистрации: step() обходит снимок списка
+        self.modules_lock = threading.Lock()
+
+        self.owner = None             # None — ещё не подключён, True — владелец, False — ведомый
+        self.owner_lock = OwnerLock(lock_address)   # у ведомого с замком — он преемник владельца
+        self.missed_ticks = 0         # таймауты ожидания тика подряд
+        self.tick_errors = 0          # ошибки world.tick() у владельца подряд
+        self.failures = 0             # всего ошибок тика (владелец и сбои потока планировщика)
+        self.reacquire = False        # владелец после сбоев: синхронный режим включён нами, применяем заново
+        self.original_settings = None
+        self.next_deadline = None
+
+        self.tick_cond = threading.Condition()
+        self.last_tick = None
+        self.index = 0
+        self.tick_time = LatencyStats("all modules", fixed_delta * 1000.0)
+
+        self.thread = None
+        self.stop_event = threading.Event()
+
+    def register(self, name, callback, budget_ms=None, every=1):
+        # callback(tick: TickInfo); budget_ms по умолчанию — весь шаг симуляции
+        budget = budget_ms if budget_ms is not None else self.fixed_delta * 1000.0
+        module = ScheduledModule(name, callback, budget, every)
+        with self.modules_lock:
+            self.modules = [m for m in self.modules if m.name != name] + [module]
+        return module
+
+    def unregister(self, name):
+        with self.modules_lock:
+            self.modules = [m for m in self.modules if m.name != name]
+
+    def acquire(self):
+        # Владельцем может стать только держатель замка; остальные процессы — ведомые
+        locked = self.owner_lock.try_acquire()
+        settings = self.world.get_settings()
+        takeover = locked and settings.synchronous_mode and (self.reacquire or self.missed_ticks >= TAKEOVER_TIMEOUTS)
+        if not locked or (settings.synchronous_mode and not takeover):
+            self.owner = False
+            if settings.fixed_delta_seconds:
+                self.fixed_delta = settings.fixed_delta_seconds
+            if self.missed_ticks == 0:
+                print(f"[*] Scheduler: following ticks of another client ({self.fixed_delta * 1000:.1f} ms step)")
+            return
+        if takeover and self.reacquire:
+            print(f"[*] Scheduler: re-applying synchronous mode after {self.tick_errors} failed ticks")
+        elif takeover:
+            # Владелец упал, не вернув настройки: тикаем сами, при выходе возвращаем асинхронный режим
+            print(f"[!] Scheduler: no ticks for {self.missed_ticks * FOLLOWER_TIMEOUT:.0f} s in synchronous mode, "
+                  f"taking over ticking")
+            settings.synchronous_mode = False
+            settings.fixed_delta_seconds = None
+        if self.original_settings is None:
+            # Повторный захват после сбоев тика: настройки до первого захвата уже сохранены
+            self.original_settings = settings
+        sync = self.world.get_settings()
+        sync.synchronous_mode = True
+        sync.fixed_delta_seconds = self.fixed_delta
+        self.world.apply_settings(sync)
+        if self.client is not None:
+            self.client.get_trafficmanager().set_synchronous_mode(True)
+        self.owner = True
+        self.missed_ticks = 0
+        self.tick_errors = 0
+        self.reacquire = False
+        self.next_deadline = None
+        print(f"[*] Scheduler: synchronous mode, fixed step {self.fixed_delta * 1000:.1f} ms")
+
+    def release(self):
+        # Владелец возвращает прежние настройки мира, иначе ведомые и симулятор останутся ждать тиков
+        if self.owner and self.original_settings is not None:
+            self.world.apply_settings(self.original_settings)
+            if self.client is not None:
+                self.client.get_trafficmanager().set_synchronous_mode(False)
+            print("[*] Scheduler: synchronous mode released")
+        self.owner_lock.release()
+        self.owner = None
+        self.missed_ticks = 0
+        self.reacquire = False
+        self.original_settings = None
+
+    def advance(self):
+        # None — планировщик остановлен, пока ведомый ждал тика
+        while True:
+            if self.owner is None:
+                self.acquire()
+            if self.owner:
+                if self.realtime:
+                    now = time.perf_counter()
+                    if self.next_deadline is None or now - self.next_deadline > self.fixed_delta:
+                        self.next_deadline = now    # сильно отстали — не догоняем пачкой тиков
+                    elif now < self.next_deadline:
+                        time.sleep(self.next_deadline - now)
+                    self.next_deadline += self.fixed_delta
+                try:
+                    self.world.tick()
+                    snapshot = self.world.get_snapshot()
+                    self.tick_errors = 0
+                    break
+                except RuntimeError as e:
+                    # Симулятор не ответил за таймаут клиента (подвис, грузит карту). Поток тиков не выходит:
+                    # иначе мир остаётся в синхронном режиме без тиков и встают все модули и ведомые.
+                    # После TAKEOVER_TIMEOUTS ошибок подряд режим мира применяется заново (его могли снять)
+                    self.tick_errors += 1
+                    self.failures += 1
+                    if self.tick_errors % TAKEOVER_TIMEOUTS == 1:
+                        print(f"[!] Scheduler: world.tick() failed ({self.tick_errors} in a row), retrying: {e}")
+                    if self.tick_errors % TAKEOVER_TIMEOUTS == 0:
+                        self.owner = None
+                        self.reacquire = True
+                    if self.stop_event.is_set():
+                        return None
+                    continue
+            try:
+                snapshot = self.world.wait_for_tick(FOLLOWER_TIMEOUT)
+                self.missed_ticks = 0
+                break
+            except RuntimeError:
+                # Тиков нет: заново решаем, кто владелец. Синхронный режим снят — станет владельцем
+                # держатель замка; не снят — тот же держатель берёт тики на себя после TAKEOVER_TIMEOUTS
+                self.missed_ticks += 1
+                if self.missed_ticks % TAKEOVER_TIMEOUTS == 1:
+                    print(f"[!] Scheduler: no tick for {self.missed_ticks * FOLLOWER_TIMEOUT:.0f} s, waiting for the owner")
+                self.owner = None
+                if self.stop_event.is_set():
+                    return None
+        ts = snapshot.timestamp
+        return TickInfo(self.index, snapshot.frame, ts.elapsed_seconds, ts.delta_seconds, time.perf_counter(),
+                        snapshot)
+
+    def step(self):
+        # Один тик: продвинуть (или дождаться) симуляцию и вызвать модули. Возвращает TickInfo
+        # (None — планировщик остановлен, пока ведомый ждал тика)
+        tick = self.advance()
+        if tick is None:
+            return None
+        start = time.perf_counter()
+        for module in self.modules:
+            if tick.index % module.every:
+                continue
+            t0 = time.perf_counter()
+            try:
+                module.callback(tick)
+            except Exception as e:
+                module.errors += 1
+                if module.errors == 1:
+                    print(f"[!] Scheduler: module '{module.name}' failed: {e}")
+                    traceback.print_exc()
+            module.stats.add((time.perf_counter() - t0) * 1000.0)
+        self.tick_time.add((time.perf_counter() - start) * 1000.0)
+
+        with self.tick_cond:
+            self.last_tick = tick
+            self.tick_cond.notify_all()
+        self.index += 1
+        return tick
+
+    def wait_tick(self, after_index=-1, timeout=1.0):
+        # Для других потоков: дождаться тика с номером больше after_index (None по таймауту)
+        with self.tick_cond:
+            ok = self.tick_cond.wait_for(
+                lambda: self.last_tick is not None and self.last_tick.index > after_index, timeout)
+            return self.last_tick if ok else None
+
+    def sim_time(self):
+        # Время симуляции последнего тика — часы для модулей, которым нужно «сейчас» вне колбэка
+        tick = self.last_tick
+        if tick is None:
+            return self.world.get_snapshot().timestamp.elapsed_seconds
+        return tick.sim_time
+
+    def run(self):
+        # Поток тиков живёт до stop(): любая ошибка (в том числе при захвате режима) считается
+        # и пишется в лог, затем владелец выясняется заново
+        while not self.stop_event.is_set():
+            try:
+                self.step()
+            except Exception as e:
+                self.failures += 1
+                print(f"[!] Scheduler: tick failed, re-acquiring the world: {e}")
+                traceback.print_exc()
+                if self.owner:
+                    self.reacquire = True    # замок наш: режим мира применяется заново сразу
+                self.owner = None
+                self.stop_event.wait(FOLLOWER_TIMEOUT)
+
+    def start(self):
+        # Тики в отдельном потоке (панель: поток GUI не должен ждать симулятор)
+        if self.thread is not None:
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout=2.0)
+            self.thread = None
+        self.release()
+        self.print_stats()
+
+    def get_stats(self):
+        stats = {m.name: dict(m.stats.snapshot(), every=m.every, errors=m.errors) for m in self.modules}
+        stats["ticks"] = self.index
+        stats["failures"] = self.failures
+        stats["all_modules"] = self.tick_time.snapshot()
+        return stats
+
+    def print_stats(self):
+        failures = f", tick failures {self.failures}" if self.failures else ""
+        print(f"[*] Scheduler: {self.index} ticks, {self.tick_time}{failures}")
+        for module in self.modules:
+            errors = f", errors {module.errors}" if module.errors else ""
+            print(f"[*] Scheduler {module.stats}{errors}")
+
+
+class ControlThread:
+    # Контур управления в своём потоке. Планировщик на тике только будит поток (модуль-«звонок» с тем же
+    # именем) и идёт дальше по модулям; callback(tick) выполняется здесь, и медленные модули после звонка
+    # его не задерживают. Если поток не успел к следующему тику, необработанный тик пропускается.
+    # Джиттер — отклонение интервала между запусками шага от номинального (шаг симуляции x число тиков)
+    def __init__(self, name, callback, scheduler, budget_ms=None):
+        self.name = name
+        self.callback = callback
+        self.scheduler = scheduler
+        budget = budget_ms if budget_ms is not None else scheduler.fixed_delta * 1000.0
+        self.stats = LatencyStats(name, budget)
+        self.wake = LatencyStats(f"{name} wake-up")       # от начала тика до запуска шага
+        self.jitter = Histogram(f"{name} period jitter", JITTER_EDGES_MS)
+        self.cond = threading.Condition()
+        self.pending = None
+        self.skipped = 0
+        self.errors = 0
+        self.running = False
+        self.thread = None
+        self.last_start = None
+        self.last_index = None
+
+    def on_tick(self, tick):
+        with self.cond:
+            if self.pending is not None:
+                self.skipped += 1
+            self.pending = tick
+            self.cond.notify()
+
+    def start(self):
+        # Звонок регистрируется сейчас: модули, зарегистрированные раньше (снимок трафика), выполнятся до него
+        if self.thread is not None:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name=self.name, daemon=True)
+        self.thread.start()
+        self.scheduler.register(self.name, self.on_tick, budget_ms=1.0)
+
+    def stop(self):
+        self.scheduler.unregister(self.name)
+        with self.cond:
+            self.running = False
+            self.cond.notify()
+        if self.thread is not None:
+            self.thread.join(timeout=2.0)
+            self.thread = None
+        self.print_stats()
+
+    def run(self):
+        while True:
+            with self.cond:
+                while self.pending is None and self.running:
+                    self.cond.wait()
+                if not self.running:
+                    return
+                tick, self.pending = self.pending, None
+
+            start = time.perf_counter()
+            self.wake.add((start - tick.wall_time) * 1000.0)
+            if self.last_start is not None:
+                expected = (tick.index - self.last_index) * self.scheduler.fixed_delta
+                self.jitter.add(abs(start - self.last_start - expected) * 1000.0)
+            self.last_start, self.last_index = start, tick.index
+            try:
+                self.callback(tick)
+            except Exception as e:
+                self.errors += 1
+                if self.errors == 1:
+                    print(f"[!] Control thread '{self.name}' failed: {e}")
+                    traceback.print_exc()
+            self.stats.add((time.perf_counter() - start) * 1000.0)
+
+    def get_stats(self):
+        return {
+            "step": self.stats.snapshot(),
+            "wake_up": self.wake.snapshot(),
+            "jitter": self.jitter.snapshot(),
+            "skipped": self.skipped,
+            "errors": self.errors,
+        }
+
+    def print_stats(self):
+        print(f"[*] Control thread {self.stats}, skipped ticks {self.skipped}, errors {self.errors}")
+        print(f"[*] Control thread {self.wake}")
+        print(f"[*] Control thread {self.jitter}")
@@ -0,0 +1,197 @@
+import math
+import time
+import threading
+import numpy as np
+from perf_stats import LatencyStats
+from lane_geometry import LaneGeometryCache, load_lane_geometry
+
+# Снимок трафика на тик: позиции, курсы и скорости всех машин одним проходом по world.get_snapshot()
+# в массивах NumPy плюс разреженная сетка по ячейкам. Поиск машины впереди в коридоре полосы идёт по
+# нескольким ячейкам вдоль полосы, без get_actors()/get_location() на каждый запрос
+CELL_SIZE_M = 10.0           # ячейка сетки; не меньше полуширины коридора плюс пол-ячейки (шаг проб вдоль пути)
+LANE_HALF_WIDTH_M = 1.75     # полуширина коридора полосы
+MAX_LEAD_DISTANCE_M = 80.0   # дальность поиска машины впереди
+STRAIGHT_STEP_M = 2.0        # шаг точек прямого коридора (без геометрии полос)
+REFRESH_TICKS = 30           # список машин перечитывается раз в столько тиков или при смене числа акторов
+KEY_STRIDE = 1 << 32         # ключ ячейки: cx * KEY_STRIDE + cy
+NEIGHBOURS = np.array([(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)], dtype=np.int64)
+
+
+class TrafficFrame:
+    # Неизменяемое состояние машин одного тика. Строки отсортированы по ячейке сетки (CSR):
+    # cell_keys — ключ ячейки каждой строки, машины одной ячейки идут подряд
+    def __init__(self, frame, ids, positions, yaws, velocities, cell_size=CELL_SIZE_M):
+        self.frame = frame
+        self.cell_size = cell_size
+        ids = np.asarray(ids, dtype=np.int64)
+        positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+        yaws = np.asarray(yaws, dtype=np.float64)
+        velocities = np.asarray(velocities, dtype=np.float64).reshape(-1, 3)
+
+        if len(ids):
+            self.origin = positions[:, :2].min(axis=0)
+            keys = self.cell_keys_of(positions[:, :2])
+            order = np.argsort(keys, kind="stable")
+        else:
+            self.origin = np.zeros(2)
+            keys = order = np.zeros(0, dtype=np.int64)
+        self.ids = ids[order]
+        self.positions = positions[order]
+        self.yaws = yaws[order]
+        self.velocities = velocities[order]
+        self.cell_keys = keys[order]
+        self.rows = dict(zip(self.ids.tolist(), range(len(self.ids))))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def cell_keys_of(self, xy):
+        cells = np.floor((xy - self.origin) / self.cell_size).astype(np.int64)
+        return cells[:, 0] * KEY_STRIDE + cells[:, 1]
+
+    def candidates(self, xy):
+        # Строки машин в ячейках вокруг точек xy (блок 3x3 каждой) — всё, что ближе cell_size к точке
+        cells = np.floor((xy - self.origin) / self.cell_size).astype(np.int64)
+        cells = (cells[:, None, :] + NEIGHBOURS).reshape(-1, 2)
+        keys = np.unique(cells[:, 0] * KEY_STRIDE + cells[:, 1])
+        lo = np.searchsorted(self.cell_keys, keys, "left")
+        hi = np.searchsorted(self.cell_keys, keys, "right")
+        # Склейка диапазонов [lo, hi) без цикла: номер внутри склейки плюс сдвиг начала своего диапазона
+        counts = hi - lo
+        total = int(counts.sum())
+        offsets = np.repeat(lo - (np.cumsum(counts) - counts), counts)
+        return offsets + np.arange(total)
+
+    def corridor(self, row, lanes, max_distance):
+        # Осевая линия коридора от машины row: по цепочке точек полосы, если есть кеш геометрии,
+        # иначе прямая по курсу. Возвращает точки (P, 2), единичные касательные (P, 2) и расстояние s (P,)
+        x, y = self.positions[row, :2].tolist()
+        if lanes is not None:
+            point = lanes.project(x, y, float(self.positions[row, 2]))
+            indices, s = lanes.path_ahead(point, max_distance)
+            if len(indices) > 1:
+                path = lanes.points[indices, :2]
+                path[0] = (point.x, point.y)      # первая точка — проекция машины, а не начало отрезка
+                s[0] = 0.0
+                return path, lanes.directions[indices], np.array(s)
+        yaw = math.radians(self.yaws[row])
+        s = np.arange(0.0, max_distance + STRAIGHT_STEP_M, STRAIGHT_STEP_M)
+        tangent = np.array((math.cos(yaw), math.sin(yaw)))
+        return np.array((x, y)) + s[:, None] * tangent, np.tile(tangent, (len(s), 1)), s
+
+    def lead_vehicle(self, actor_id, lanes=None, max_distance=MAX_LEAD_DISTANCE_M,
+                     half_width=LANE_HALF_WIDTH_M):
+        # Ближайшая машина впереди actor_id в коридоре его полосы: (id, расстояние вдоль полосы, м)
+        # или (None, inf). Расстояние — между центрами машин, как в прежнем поиске
+        row = self.rows.get(actor_id)
+        if row is None:
+            return None, float("inf")
+        path, tangents, s = self.corridor(row, lanes, max_distance)
+        # Ячейки ищутся по точкам через пол-ячейки: машина в коридоре не дальше cell_size от ближайшей из них
+        probe = np.searchsorted(s, np.arange(s[0], s[-1], self.cell_size / 2.0))
+        cand = self.candidates(path[np.append(probe, len(s) - 1)])
+        cand = cand[cand != row]
+        if not len(cand):
+            return None, float("inf")
+
+        rel = self.positions[cand, None, :2] - path[None, :, :]      # (C, P, 2)
+        k = (rel ** 2).sum(axis=2).argmin(axis=1)                    # ближайшая точка осевой линии
+        rel = rel[np.arange(len(cand)), k]
+        t = tangents[k]
+        along = s[k] + rel[:, 0] * t[:, 0] + rel[:, 1] * t[:, 1]
+        lateral = np.abs(rel[:, 0] * t[:, 1] - rel[:, 1] * t[:, 0])
+        inside = (lateral <= half_width) & (along > 0.0) & (along <= max_distance)
+        if not inside.any():
+            return None, float("inf")
+        j = int(np.where(inside, along, np.inf).argmin())
+        return int(self.ids[cand[j]]), float(along[j])
+
+    def speed(self, actor_id):
+        # Модуль скорости, м/с; None — машины нет в кадре
+        row = self.rows.get(actor_id)
+        if row is None:
+            return None
+        return float(np.linalg.norm(self.velocities[row]))
+
+
+class TrafficSnapshot:
+    # Модуль TickScheduler: на каждом тике собирает TrafficFrame из WorldSnapshot тика. Кадр заменяется
+    # целиком одной ссылкой, поэтому запросы из других потоков видят согласованное состояние без блокировок
+    def __init__(self, world, lanes=None, cell_size=CELL_SIZE_M):
+        self.world = world
+        self.lanes = lanes            # LaneGeometryCache; None — коридор прямой по курсу машины
+        self.cell_size = cell_size
+        self.current = TrafficFrame(None, [], [], [], [], cell_size)
+        self.vehicle_ids = set()
+        self.actor_count = -1
+        self.ticks_since_refresh = 0
+        self.refreshes = 0            # вызовы get_actors() — единственный RPC снимка
+        self.queries = 0
+        self.update_time = LatencyStats("traffic update")
+        self.query_time = LatencyStats("lead query")
+
+    def load_lanes(self, carla_map):
+        # Выборка геометрии полос занимает секунды — в фоне; до её окончания коридор прямой
+        def worker():
+            lanes = load_lane_geometry(carla_map)
+            if isinstance(lanes, LaneGeometryCache):
+                self.lanes = lanes
+                print("[*] Traffic: lead vehicle search follows the lane geometry")
+            else:
+                print("[!] Traffic: lane geometry unavailable, using a straight corridor")
+        thread = threading.Thread(target=worker, daemon=True)
+        thread.start()
+        return thread
+
+    def refresh_vehicle_ids(self, snapshot):
+        # Тип актора в снимке не хранится: id машин берутся из get_actors() при смене числа акторов
+        # и раз в REFRESH_TICKS тиков (машина могла смениться при неизменном числе)
+        self.vehicle_ids = {actor.id for actor in self.world.get_actors().filter('vehicle.*')}
+        self.actor_count = len(snapshot)
+        self.ticks_since_refresh = 0
+        self.refreshes += 1
+
+    def update(self, snapshot=None):
+        start = time.perf_counter()
+        if snapshot is None:
+            snapshot = self.world.get_snapshot()
+        self.ticks_since_refresh += 1
+        if len(snapshot) != self.actor_count or self.ticks_since_refresh >= REFRESH_TICKS:
+            self.refresh_vehicle_ids(snapshot)
+
+        ids, positions, yaws, velocities = [], [], [], []
+        vehicle_ids = self.vehicle_ids
+        for actor in snapshot:
+            if actor.id not in vehicle_ids:
+                continue
+            transform = actor.get_transform()
+            loc = transform.location
+            v = actor.get_velocity()
+            ids.append(actor.id)
+            positions.append((loc.x, loc.y, loc.z))
+            yaws.append(transform.rotation.yaw)
+            velocities.append((v.x, v.y, v.z))
+        self.current = TrafficFrame(snapshot.frame, ids, positions, yaws, velocities, self.cell_size)
+        self.update_time.add((time.perf_counter() - start) * 1000.0)
+        return self.current
+
+    def on_tick(self, tick):
+        self.update(tick.snapshot)
+
+    def lead_vehicle(self, actor_id, max_distance=MAX_LEAD_DISTANCE_M, half_width=LANE_HALF_WIDTH_M):
+        return self.lead_state(actor_id, max_distance, half_width)[:2]
+
+    def lead_state(self, actor_id, max_distance=MAX_LEAD_DISTANCE_M, half_width=LANE_HALF_WIDTH_M):
+        # Всё из одного кадра: (id машины впереди, дистанция, её скорость, скорость actor_id);
+        # скорости — None, если машины нет в кадре
+        frame = self.current
+        start = time.perf_counter()
+        lead_id, distance = frame.lead_vehicle(actor_id, self.lanes, max_distance, half_width)
+        self.query_time.add((time.perf_counter() - start) * 1000.0)
+        self.queries += 1
+        lead_speed = frame.speed(lead_id) if lead_id is not None else None
+        return lead_id, distance, lead_speed, frame.speed(actor_id)
+
+    def __str__(self):
+        return (f"Traffic: {len(self.current)} vehicles, {self.update_time}, {self.query_time}, "
+                f"get_actors() {self.refreshes} times for {self.queries} queries")
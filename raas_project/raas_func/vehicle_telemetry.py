@@ -0,0 +1,76 @@
+import math
+import time
+import threading
+
+# Один опрос состояния своей машины на тик симуляции. Поза и скорость берутся из WorldSnapshot тика,
+# управление и фары — одним get_control()/get_light_state() на тик. Модули панели читают готовую запись
+# вместо собственных вызовов к машине; счётчики показывают, сколько вызовов так сэкономлено
+
+
+class TelemetryRecord:
+    # Состояние машины на один тик. После создания не меняется: сэмплер заменяет ссылку целиком,
+    # поэтому читать запись можно из любого потока без блокировок
+    def __init__(self, frame, sim_time, transform, velocity, control, light_state):
+        self.frame = frame
+        self.sim_time = sim_time
+        self.transform = transform
+        self.location = transform.location
+        self.yaw = transform.rotation.yaw
+        self.velocity = velocity
+        self.speed = math.sqrt(velocity.x ** 2 + velocity.y ** 2 + velocity.z ** 2)   # м/с
+        self.speed_kmh = self.speed * 3.6
+        self.control = control
+        self.light_state = light_state
+
+
+class VehicleTelemetry:
+    # Модуль TickScheduler: регистрируется первым, чтобы остальные модули тика видели свежую запись
+    def __init__(self, world, vehicle):
+        self.world = world
+        self.vehicle = vehicle
+        self.record = None
+        self.lock = threading.Lock()
+        self.sampler_calls = 0        # вызовы к машине, сделанные самим сэмплером
+        self.reads = {}               # {модуль: сколько вызовов он сделал бы сам}
+        self.ticks = 0
+        self.started = time.perf_counter()
+
+    def on_tick(self, tick):
+        snapshot = tick.snapshot if tick.snapshot is not None else self.world.get_snapshot()
+        actor = snapshot.find(self.vehicle.id)
+        if actor is None:
+            return
+        control = self.vehicle.get_control()
+        light_state = self.vehicle.get_light_state()
+        self.record = TelemetryRecord(snapshot.frame, tick.sim_time, actor.get_transform(), actor.get_velocity(),
+                                      control, light_state)
+        with self.lock:
+            self.sampler_calls += 2
+            self.ticks += 1
+
+    def read(self, consumer, calls=1):
+        # Последняя запись (None до первого тика); calls — сколько вызовов к машине модуль делал бы без неё
+        record = self.record
+        if record is not None:
+            with self.lock:
+                self.reads[consumer] = self.reads.get(consumer, 0) + calls
+        return record
+
+    def get_stats(self):
+        elapsed = max(time.perf_counter() - self.started, 1e-6)
+        with self.lock:
+            direct = sum(self.reads.values())
+            stats = {
+                "ticks": self.ticks,
+                "sampler_calls_per_sec": self.sampler_calls / elapsed,
+                "direct_calls_per_sec": direct / elapsed,
+                "saved_calls_per_sec": (direct - self.sampler_calls) / elapsed,
+                "by_module_per_sec": {name: n / elapsed for name, n in self.reads.items()},
+            }
+        return stats
+
+    def __str__(self):
+        s = self.get_stats()
+        modules = ", ".join(f"{name} {rate:.0f}/s" for name, rate in sorted(s["by_module_per_sec"].items()))
+        return (f"Telemetry: {s['ticks']} ticks, vehicle calls {s['sampler_calls_per_sec']:.0f}/s instead of "
+                f"{s['direct_calls_per_sec']:.0f}/s (saved {s['saved_calls_per_sec']:.0f}/s; {modules})")
@@ -3,6 +3,10 @@ chcp 65001 >nul
 
 echo [RAAS Launcher] Запуск основных модулей...
 
+:: 0. raas_func: database_maintenance.py (разовый перевод system_data.db в incremental auto_vacuum:
+::    полный VACUUM, пока базу не открыл ни один модуль; дальше ничего не делает)
+pushd C:\Proj\raas_project\raas_func && python database_maintenance.py & popd
+
 :: 1. world_setup: spawn_vehicle.py
 start cmd /k "cd /d C:\Proj\raas_project\world_setup && python spawn_vehicle.py"
 
@@ -18,7 +22,12 @@ start cmd /k "cd /d C:\Proj\raas_project\main_func && python custom_control.py"
 
 timeout /t 5 /nobreak >nul
 
-:: 4. raas_func: multimedia_panel.py
+:: 4. raas_func: sensor_hub.py (общие камеры; сенсор камеры создаётся, только пока её читают)
+start cmd /k "cd /d C:\Proj\raas_project\raas_func && python sensor_hub.py"
+
+timeout /t 5 /nobreak >nul
+
+:: 5. raas_func: multimedia_panel.py
 start cmd /k "cd /d C:\Proj\raas_project\raas_func && python multimedia_panel.py"
 
 echo Все модули RAAS запущены.